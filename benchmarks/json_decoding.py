@@ -0,0 +1,103 @@
+"""
+Benchmark of the JSON decoding backends of `sumeripy.jsonio`, for each type
+of file the loaders read: catalogue.json, the corpusjson/ texts, and the
+ePSD2 files of the glossary (gloss-sux.json, epsd2-sl.json, the indexes...).
+
+Each backend decodes the same bytes (files are read once, beforehand), and
+its results are compared with those of the standard library.
+
+Run from the directory holding .corpusdata/ (extracted corpora only):
+    python benchmarks/json_decoding.py [--repeat N] [--max-texts N]
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from sumeripy import jsonio  # noqa: E402
+
+_GLOSSARY_JSON_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "sumeripy", "glossary", "json"
+)
+
+
+def _read(paths: List[str]) -> List[bytes]:
+    documents = []
+    for path in paths:
+        with open(path, "rb") as f:
+            documents.append(f.read())
+    return documents
+
+
+def _file_types(max_texts: int) -> Dict[str, List[bytes]]:
+    """The documents of each file type found, keyed by type"""
+    catalogues = glob.glob(
+        os.path.join(".corpusdata", "**", "catalogue.json"), recursive=True
+    )
+    texts = glob.glob(
+        os.path.join(".corpusdata", "**", "corpusjson", "*.json"), recursive=True
+    )
+    file_types = {
+        "catalogue.json": _read(sorted(catalogues)),
+        "corpusjson": _read(sorted(texts)[:max_texts]),
+    }
+    for path in sorted(glob.glob(os.path.join(_GLOSSARY_JSON_DIR, "*.json"))):
+        file_types[os.path.basename(path)] = _read([path])
+    return {name: documents for name, documents in file_types.items() if documents}
+
+
+def _time(loads: Callable, documents: List[bytes], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for data in documents:
+            loads(data)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=5, help="Best of N runs")
+    parser.add_argument(
+        "--max-texts",
+        type=int,
+        default=10_000,
+        help="Number of corpusjson files decoded",
+    )
+    args = parser.parse_args()
+
+    backends = jsonio.available_backends()
+    file_types = _file_types(args.max_texts)
+    if not file_types:
+        sys.exit("No JSON files found: run from the directory holding .corpusdata/")
+
+    header = f"{'file type':<22} {'files':>6} {'MB':>8}"
+    for backend in backends:
+        header += f" {backend + ' (s)':>14}"
+    print(header + f" {'speedup':>8}")
+
+    for name, documents in file_types.items():
+        reference = [jsonio._stdlib_loads(data) for data in documents]
+        times = {}
+        for backend in backends:
+            jsonio.set_backend(backend)
+            if [jsonio.loads(data) for data in documents] != reference:
+                raise AssertionError(f"{backend} decodes {name} differently")
+            times[backend] = _time(jsonio.loads, documents, args.repeat)
+
+        size = sum(len(data) for data in documents) / 1e6
+        row = f"{name:<22} {len(documents):>6} {size:>8.1f}"
+        for backend in backends:
+            row += f" {times[backend]:>14.3f}"
+        # The fastest backend against the standard library
+        print(row + f" {times['json'] / min(times.values()):>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
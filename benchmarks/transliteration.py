@@ -0,0 +1,191 @@
+"""
+Benchmark of `TextBase.transliteration()` against the previous implementation,
+which crawled the CDL tree recursively and normalised whitespace with regexes.
+
+Both are run on two synthetic texts, then on every text of each corpus,
+and their outputs are compared:
+    - a long composite: 30k nodes in nested chunks, as in literary composites;
+    - a long flat text: 20k lines of two words each.
+
+Run from the directory holding .corpusdata/:
+    python benchmarks/transliteration.py [corpus ...] [--repeat N]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from sumeripy import corpora  # noqa: E402
+from sumeripy.corpora.text import Chunk, parse_cdl_node  # noqa: E402
+from sumeripy.corpora.text.text_base import (  # noqa: E402
+    SpecialToken,
+    _extract_lang_from_node,
+    _extract_text_from_node,
+    render_transliteration,
+    special_token_format,
+)
+
+
+def _legacy_crawl(cdl) -> Tuple[List[str], set]:
+    current_tokens: List[str] = []
+    langs = set()
+    for node in cdl:
+        if type(node) == Chunk:
+            tokens, langs_ = _legacy_crawl(node.cdl)
+            current_tokens += tokens
+            langs |= langs_
+        else:
+            text = _extract_text_from_node(node)
+            lang = _extract_lang_from_node(node)
+            if text:
+                current_tokens.append(text)
+            if lang:
+                langs.add(lang)
+    return current_tokens, langs
+
+
+def legacy_transliteration(cdl) -> Tuple[str, set]:
+    """The previous implementation of `TextBase.transliteration()`"""
+
+    def _without_special_tokens(text: str) -> str:
+        text = re.sub(special_token_format, "", text)
+        text = text.replace("\n", "")
+        text = text.replace(" ", "")
+        return text
+
+    tokens, langs = _legacy_crawl(cdl)
+    text = " ".join(tokens)
+
+    surfaces = text.split(SpecialToken.SURFACE.value)
+    surfaces = [surface.strip() for surface in surfaces]
+    surfaces = [surface for surface in surfaces if _without_special_tokens(surface)]
+
+    text = ""
+    if surfaces:
+        join_with = f"\n{SpecialToken.SURFACE.value}\n"
+        text = f"{SpecialToken.SURFACE.value}\n" + join_with.join(surfaces)
+
+    text = re.sub(r"\ *\n\ *", "\n", text)
+    text = re.sub(r"\n+", "\n", text)
+    text = re.sub(r"\ +", " ", text)
+    return text.strip(), langs
+
+
+_FRAGS = ["lugal", "dumu-ni", "[x]", "e2-gal", "a-ša3 gal", "#x#"]
+_DISCONTINUITIES = [
+    {"type": "surface"},
+    {"type": "line-start"},
+    {"type": "column"},
+    {"type": "object"},
+    {"type": "nonx", "state": "missing"},
+    {"type": "nonx", "state": "blank", "scope": "line"},
+    {"type": "nonx", "state": "blank", "scope": "space"},
+    {"type": "nonx", "state": "ruling"},
+]
+
+
+def _lemma(rnd: random.Random, i: int) -> Dict[str, Any]:
+    return {
+        "node": "l",
+        "id": str(i),
+        "ref": f"X000001.{i}.1",
+        "inst": "",
+        "frag": rnd.choice(_FRAGS),
+        "f": {"lang": rnd.choice(["sux", "akk"]), "form": "x"},
+        "props": [],
+    }
+
+
+def _chunk(rnd: random.Random, depth: int, size: int) -> List[Dict[str, Any]]:
+    nodes: List[Dict[str, Any]] = []
+    for i in range(size):
+        r = rnd.random()
+        if r < 0.4:
+            nodes.append(_lemma(rnd, i))
+        elif r < 0.8:
+            nodes.append({"node": "d", **rnd.choice(_DISCONTINUITIES)})
+        elif depth < 4:
+            cdl = _chunk(rnd, depth + 1, rnd.randint(0, 6))
+            nodes.append({"node": "c", "type": "sentence", "id": "c", "cdl": cdl})
+    return nodes
+
+
+def _synthetic_texts() -> Dict[str, list]:
+    """A long composite and a long flat text, as parsed CDL trees"""
+    rnd = random.Random(0)
+    discourses = [
+        {"node": "c", "type": "discourse", "id": "d", "cdl": _chunk(rnd, 1, 3000)}
+        for _ in range(10)
+    ]
+    composite = {"node": "c", "type": "text", "id": "t", "cdl": discourses}
+    flat = [
+        node
+        for i in range(20_000)
+        for node in (
+            {"node": "d", "type": "line-start"},
+            _lemma(rnd, i),
+            _lemma(rnd, i),
+        )
+    ]
+    # One text each
+    return {
+        "long composite": [[parse_cdl_node(composite)]],
+        "long flat text": [[parse_cdl_node(node) for node in flat]],
+    }
+
+
+def _compare(name: str, trees: list, repeat: int) -> None:
+    for cdl in trees:
+        if legacy_transliteration(cdl) != render_transliteration(cdl):
+            raise AssertionError(f"Outputs differ on a text of {name}")
+
+    legacy = _time(legacy_transliteration, trees, repeat)
+    new = _time(render_transliteration, trees, repeat)
+    print(
+        f"{name:<20} {len(trees):>7} {legacy:>11.3f} {new:>9.3f} {legacy / new:>7.2f}x"
+    )
+
+
+def _time(render, trees, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for cdl in trees:
+            render(cdl)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "corpora", nargs="*", help="Defaults to every downloaded corpus"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Best of N runs")
+    args = parser.parse_args()
+
+    names = args.corpora or [
+        name
+        for name in corpora.list()
+        if os.path.exists(os.path.join(".corpusdata", name))
+        or os.path.exists(os.path.join(".corpusdata", f"{name}.zip"))
+    ]
+
+    print(
+        f"{'corpus':<20} {'texts':>7} {'legacy (s)':>11} {'new (s)':>9} {'speedup':>8}"
+    )
+    for name, trees in _synthetic_texts().items():
+        _compare(name, trees, args.repeat)
+    for name in names:
+        corpus = corpora.load(name, contents=True)
+        _compare(name, [text.cdl for text in corpus.texts], args.repeat)
+
+
+if __name__ == "__main__":
+    main()
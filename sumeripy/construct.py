@@ -0,0 +1,167 @@
+"""
+Instances of pydantic models built without validation, for trusted data.
+
+`BaseModel.model_construct` walks the fields of the model in Python for
+every instance, which makes it slower than validating small models.
+The constructors made here do the same work with that walk done once per
+model, and set the state of the instance the way `model_construct` does.
+
+That state is private to pydantic. Each constructor is checked against
+`model_construct` when it is made, and `model_construct` is used instead
+(with a warning) if they disagree, e.g. after a pydantic upgrade.
+
+Functions:
+    make_constructor
+    new_instance
+"""
+
+import warnings
+from typing import Any, Callable, Dict, Optional, Set, Type, TypeVar
+
+from pydantic import BaseModel
+from pydantic_core import PydanticUndefined
+
+M = TypeVar("M", bound=BaseModel)
+
+_MISSING = object()
+
+
+def new_instance(
+    model: Type[M],
+    values: Dict[str, Any],
+    fields_set: Set[str],
+    private: Optional[Dict[str, Any]] = None,
+) -> M:
+    """
+    Create an instance of `model` holding `values`, without validation or defaults.
+
+    Args:
+        model (Type[BaseModel]): The model.
+        values (Dict[str, Any]): The values of the fields, keyed by name. Kept, not copied.
+        fields_set (Set[str]): The names of the fields that were explicitly set.
+        private (Optional[Dict[str, Any]]): The values of the private attributes, if any.
+
+    Returns:
+        BaseModel: The instance.
+    """
+    instance = object.__new__(model)
+    object.__setattr__(instance, "__dict__", values)
+    object.__setattr__(instance, "__pydantic_fields_set__", fields_set)
+    object.__setattr__(instance, "__pydantic_extra__", None)
+    object.__setattr__(instance, "__pydantic_private__", private)
+    return instance
+
+
+def make_constructor(model: Type[M]) -> Callable[[Dict[str, Any]], M]:
+    """
+    Returns a function building `model` from a dict of values keyed by alias
+    (or by name), like `model.model_construct(**data)`.
+
+    Default values are shared between instances rather than copied, so
+    mutable values that are modified later must be passed explicitly.
+    Private attributes can be passed by name, as to `model_construct`.
+    Keys that are not fields or private attributes of the model are dropped,
+    as `model_construct` does. Models with extra fields, a `model_post_init`
+    or private attributes with a default factory are built with
+    `model_construct`.
+
+    Args:
+        model (Type[BaseModel]): The model.
+
+    Returns:
+        Callable[[Dict[str, Any]], BaseModel]: The constructor.
+    """
+    if (
+        model.model_config.get("extra") == "allow"
+        or _has_own_post_init(model)
+        or any(
+            attr.default_factory is not None
+            for attr in model.__private_attributes__.values()
+        )
+    ):
+        return lambda data: model.model_construct(**data)
+
+    renames = [
+        (field.alias, name)
+        for name, field in model.model_fields.items()
+        if field.alias and field.alias != name
+    ]
+    template = {
+        name: field.default
+        for name, field in model.model_fields.items()
+        if not field.is_required()
+    }
+    private_names = list(model.__private_attributes__)
+    private_template = (
+        {
+            name: attr.default
+            for name, attr in model.__private_attributes__.items()
+            if attr.default is not PydanticUndefined
+        }
+        if private_names
+        else None
+    )
+    keys = (
+        frozenset(model.model_fields)
+        | {alias for alias, _ in renames}
+        | set(private_names)
+    )
+
+    def construct(data: Dict[str, Any]) -> M:
+        if not keys.issuperset(data):
+            data = {key: value for key, value in data.items() if key in keys}
+        values = template.copy()
+        values.update(data)
+        fields_set = set(data)
+        for alias, name in renames:
+            if alias in values:
+                values[name] = values.pop(alias)
+                fields_set.discard(alias)
+                fields_set.add(name)
+        private = None
+        if private_template is not None:
+            private = private_template.copy()
+            for name in private_names:
+                if name in values:
+                    private[name] = values.pop(name)
+                    fields_set.discard(name)
+        return new_instance(model, values, fields_set, private)
+
+    if not _same_as_model_construct(model, construct):
+        warnings.warn(
+            f"Building {model.__name__} with model_construct(): this version "
+            "of pydantic doesn't lay out instances as expected"
+        )
+        return lambda data: model.model_construct(**data)
+    return construct
+
+
+def _has_own_post_init(model: Type[BaseModel]) -> bool:
+    """Whether `model_post_init` does more than set the defaults of the private attributes"""
+    if model.__pydantic_post_init__ is None:
+        return False
+    # Otherwise it's pydantic's, or a user's wrapped by pydantic
+    return not model.model_post_init.__module__.startswith("pydantic.")
+
+
+def _same_as_model_construct(
+    model: Type[BaseModel], construct: Callable[[Dict[str, Any]], BaseModel]
+) -> bool:
+    """Whether `construct` sets the same instance state as `model_construct`"""
+    # Every field and private attribute set (fields by alias), then none,
+    # then an unknown key
+    samples = [
+        {
+            **{field.alias or name: name for name, field in model.model_fields.items()},
+            **{name: name for name in model.__private_attributes__},
+        },
+        {},
+        {"__unknown__": None},
+    ]
+    for data in samples:
+        expected = model.model_construct(**data)
+        actual = construct(dict(data))
+        for slot in BaseModel.__slots__:
+            if getattr(actual, slot, _MISSING) != getattr(expected, slot, _MISSING):
+                return False
+    return True
@@ -1,10 +1,34 @@
-from .main import list, download, load
+from .main import (
+    list,
+    download,
+    download_many,
+    load,
+    iter_texts,
+    export_transliterations,
+)
+from .lemma_index import LemmaIndex, SearchHit
+from .concordance import ConcordanceLine
+from .ngrams import Collocation, NgramCounter
+from .sign_sequences import SignSequences
+from .vocabulary import TokenArrays, Vocabulary, export_token_arrays
 from . import corpus, text
 
 __all__ = [
     "list",
     "download",
+    "download_many",
     "load",
+    "iter_texts",
+    "export_transliterations",
+    "LemmaIndex",
+    "SearchHit",
+    "ConcordanceLine",
+    "Collocation",
+    "NgramCounter",
+    "SignSequences",
+    "Vocabulary",
+    "TokenArrays",
+    "export_token_arrays",
     "corpus",
     "text",
 ]
@@ -0,0 +1,153 @@
+"""
+Reading corpus files straight out of their .zip archive.
+
+Paths inside an archive are written as `<archive>.zip/<member>`,
+e.g. `.corpusdata/admin_ed3b.zip/epsd2/admin/ed3b/corpusjson/P010055.json`,
+so that the rest of the library can treat them like regular paths.
+
+read_bytes()
+archive_file()
+find_members()
+close_archive()
+"""
+
+import os
+import threading
+import zipfile
+from typing import Dict, List, Optional, Tuple
+
+_ARCHIVE_SUFFIX = ".zip"
+
+
+class CorpusArchive:
+    """
+    A .zip archive opened once and shared by every reader in the process.
+
+    The central directory is indexed when the archive is opened, so that
+    looking up a member is a dict access. Reads are serialised with a lock,
+    which makes it safe for several threads to share one handle.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._zip = zipfile.ZipFile(path, "r")
+        self._members: Dict[str, zipfile.ZipInfo] = {
+            info.filename: info for info in self._zip.infolist()
+        }
+        self._lock = threading.Lock()
+
+    def names(self) -> List[str]:
+        """Returns the names of the members of the archive."""
+        return list(self._members)
+
+    def read(self, name: str) -> bytes:
+        """Returns the decompressed contents of a member."""
+        info = self._get_info(name)
+        with self._lock:
+            return self._zip.read(info)
+
+    def close(self) -> None:
+        """Closes the archive."""
+        with self._lock:
+            self._zip.close()
+
+    def _get_info(self, name: str) -> zipfile.ZipInfo:
+        try:
+            return self._members[name]
+        except KeyError:
+            raise FileNotFoundError(f"{name} not found in {self.path}") from None
+
+
+# Open archives, by path. Tagged with the pid that opened them:
+# a forked worker must not share the file offset of its parent's handle.
+_archives: Dict[str, Tuple[int, CorpusArchive]] = {}
+
+# The lock of each archive path, so that opening one archive doesn't hold up
+# readers of the others. Also tagged with their pid: a lock held by another
+# thread when the process forked would never be released in the child.
+_archive_locks: Dict[str, Tuple[int, threading.Lock]] = {}
+
+
+def _archive_lock(path: str) -> threading.Lock:
+    pid = os.getpid()
+    entry = _archive_locks.get(path)
+    if entry is None or entry[0] != pid:
+        # setdefault() is atomic: racing threads end up with the same lock
+        entry = _archive_locks.setdefault(path, (pid, threading.Lock()))
+        if entry[0] != pid:
+            entry = _archive_locks[path] = (pid, threading.Lock())
+    return entry[1]
+
+
+def _open_archive(path: str) -> CorpusArchive:
+    path = os.path.normpath(path)
+    pid = os.getpid()
+    entry = _archives.get(path)
+    if entry is not None and entry[0] == pid:
+        return entry[1]
+    with _archive_lock(path):
+        entry = _archives.get(path)
+        if entry is None or entry[0] != pid:
+            entry = (pid, CorpusArchive(path))
+            _archives[path] = entry
+        return entry[1]
+
+
+def _split_archive_path(path: str) -> Optional[Tuple[str, str]]:
+    """Splits `<archive>.zip/<member>` into the archive path and the member name"""
+    marker = f"{_ARCHIVE_SUFFIX}/"
+    index = path.find(marker)
+    if index == -1:
+        return None
+    archive_path = os.path.normpath(path[: index + len(_ARCHIVE_SUFFIX)])
+    # Archives that are already open don't need to be looked up on disk again
+    if archive_path not in _archives and not os.path.isfile(archive_path):
+        return None
+    return archive_path, path[index + len(marker) :]
+
+
+def archive_file(path: str) -> Optional[str]:
+    """Returns the path of the archive that `path` points inside, if any."""
+    split = _split_archive_path(path)
+    return split[0] if split else None
+
+
+def read_bytes(path: str) -> bytes:
+    """
+    Read a file, either from disk or from inside an archive.
+
+    Args:
+        path (str): A regular path, or a path of the form `<archive>.zip/<member>`.
+
+    Returns:
+        bytes: The contents of the file.
+    """
+    split = _split_archive_path(path)
+    if split is None:
+        with open(path, "rb") as f:
+            return f.read()
+    archive_path, name = split
+    return _open_archive(archive_path).read(name)
+
+
+def find_members(archive_path: str, filename: str) -> List[str]:
+    """
+    Returns:
+        List[str]: The paths (as `<archive>.zip/<dir>`) of the directories
+            of the archive that contain a file named `filename`.
+    """
+    archive = _open_archive(archive_path)
+    return [
+        f"{archive_path}/{os.path.dirname(name)}".rstrip("/")
+        for name in archive.names()
+        if os.path.basename(name) == filename
+    ]
+
+
+def close_archive(path: str) -> None:
+    """Forget an open archive, e.g. because it was replaced by a new download."""
+    path = os.path.normpath(path)
+    with _archive_lock(path):
+        entry = _archives.pop(path, None)
+    if entry is not None and entry[0] == os.getpid():
+        entry[1].close()
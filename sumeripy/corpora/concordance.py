@@ -0,0 +1,102 @@
+"""
+Keyword-in-context (KWIC) concordances over the lemmas of a corpus.
+
+A text is read as the sequence of its lemmas, in document order. Each lemma
+is a token, shown by its form (`f["form"]`), belonging to the line of its
+ref ("P010055.4.1" is in line "P010055.4"). Lines are labelled by their
+line-start discontinuity (e.g. "o 4"). A query is a term as in
+`LemmaIndex` (`cf:lugal`, `form:lugal-ra`, `value:ra`...), and each token
+matching it gives one concordance line, with `width` tokens of context on
+each side.
+
+Classes:
+    ConcordanceLine
+
+Functions:
+    concordance_lines
+    catalogue_sort_key
+"""
+
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+from .lemma_index import check_term, lemma_terms
+from .text import CDLNode, Discontinuity, DiscontinuityType, LemmaView, iter_lemmas
+
+
+class ConcordanceLine(NamedTuple):
+    """An occurrence of a query, in context."""
+
+    text_id: str
+    line_ref: str
+    line_label: str
+    position: int
+    left: Tuple[str, ...]
+    keyword: str
+    right: Tuple[str, ...]
+
+    def __str__(self) -> str:
+        left, right = " ".join(self.left), " ".join(self.right)
+        line = self.line_label or self.line_ref
+        return f"{self.text_id} {line}: {left} [{self.keyword}] {right}"
+
+
+def concordance_lines(
+    text_id: str, cdl: List[CDLNode], query: str, width: int
+) -> List[ConcordanceLine]:
+    """
+    Find the occurrences of a query in a text.
+
+    Args:
+        text_id (str): The id of the text.
+        cdl (List[CDLNode]): The contents of the text.
+        query (str): A term, as `field:value`.
+        width (int): The number of tokens of context on each side.
+
+    Returns:
+        List[ConcordanceLine]: The occurrences, in document order.
+
+    Raises:
+        ValueError: If the field of the query can't be searched.
+    """
+    check_term(query)
+    line_refs: List[str] = []
+    forms: List[str] = []
+    matches: List[int] = []
+    labels: Dict[str, str] = {}
+
+    for node in iter_lemmas(cdl, discontinuities=True):
+        if isinstance(node, Discontinuity):
+            if node.type_ == DiscontinuityType.LINE_START:
+                labels[node.ref] = node.label
+            continue
+        if query in lemma_terms(node):
+            matches.append(len(forms))
+        line_refs.append(node.ref.rsplit(".", 1)[0])
+        # `LemmaView.form` doesn't decode `f`
+        form = node.form if type(node) == LemmaView else node.f.get("form", "")
+        forms.append(form)
+
+    return [
+        ConcordanceLine(
+            text_id,
+            line_refs[position],
+            labels.get(line_refs[position], ""),
+            position,
+            tuple(forms[max(0, position - width) : position]),
+            forms[position],
+            tuple(forms[position + 1 : position + 1 + width]),
+        )
+        for position in matches
+    ]
+
+
+def catalogue_sort_key(text: Any, fields: Tuple[str, ...]) -> Tuple[Any, ...]:
+    """The values of catalogue fields of a text, comparable across texts."""
+    values = []
+    for field in fields:
+        # Fields of projected texts that are not decoded yet are not in __dict__
+        value = text.__dict__[field] if field in text.__dict__ else getattr(text, field)
+        # Enum members are ordered by their value
+        value = getattr(value, "value", value)
+        values.append(tuple(value) if isinstance(value, list) else value)
+    return tuple(values)
@@ -0,0 +1,246 @@
+"""
+A columnar view of the catalogue of a corpus.
+
+Each catalogue field of the texts is stored as one dictionary-encoded column:
+the distinct values of the field, plus an array of small ints giving the
+code of the value of each text. The rows of each value are also kept
+together (sorted by code), so that filters and counts are slices and set
+operations on arrays rather than Python loops over the models.
+
+Classes:
+    Column
+    CatalogueColumns
+"""
+
+from array import array
+from enum import Enum
+from operator import is_
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Type
+
+from pydantic import BaseModel
+
+# Fields that are not part of the catalogue
+_EXCLUDED_FIELDS = {"cdl"}
+
+
+def _typecode(num_values: int) -> str:
+    """The smallest unsigned array type that can hold the codes"""
+    if num_values <= 0xFF:
+        return "B"
+    if num_values <= 0xFFFF:
+        return "H"
+    return "I"
+
+
+def _value(text: BaseModel, field: str) -> Any:
+    values = text.__dict__
+    # Fields of projected texts that are not decoded yet are not in __dict__
+    return values[field] if field in values else getattr(text, field)
+
+
+class Column:
+    """
+    A dictionary-encoded catalogue field.
+
+    Attributes:
+        values (List[Any]): The distinct values, in order of first appearance.
+            Lists are stored as tuples.
+        codes (array): The index in `values` of the value of each row.
+    """
+
+    __slots__ = ("values", "codes", "_codes_by_value", "_rows", "_offsets")
+
+    def __init__(self, raw_values: List[Any]):
+        codes_by_value: Dict[Any, int] = {}
+        codes = []
+        for value in raw_values:
+            if isinstance(value, list):
+                value = tuple(value)
+            code = codes_by_value.get(value)
+            if code is None:
+                code = codes_by_value[value] = len(codes_by_value)
+            codes.append(code)
+
+        self.values: List[Any] = list(codes_by_value)
+        self.codes = array(_typecode(len(self.values)), codes)
+        self._codes_by_value = codes_by_value
+
+        # Counting sort of the rows by code: the rows of code `c`
+        # are `_rows[_offsets[c] : _offsets[c + 1]]`, in ascending order
+        offsets = [0] * (len(self.values) + 1)
+        for code in codes:
+            offsets[code + 1] += 1
+        for code in range(len(self.values)):
+            offsets[code + 1] += offsets[code]
+        rows = array("I", bytes(4 * len(codes)))
+        next_slot = offsets[:-1]
+        for row, code in enumerate(codes):
+            rows[next_slot[code]] = row
+            next_slot[code] += 1
+        self._rows = rows
+        self._offsets = array("I", offsets)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def rows(self, value: Any) -> array:
+        """Returns the rows holding `value`, in ascending order."""
+        if isinstance(value, list):
+            value = tuple(value)
+        code = self._codes_by_value.get(value)
+        if code is None:
+            return array("I")
+        return self._rows[self._offsets[code] : self._offsets[code + 1]]
+
+    def counts(self) -> Dict[Any, int]:
+        """Returns the number of rows holding each distinct value."""
+        offsets = self._offsets
+        return {
+            value: offsets[code + 1] - offsets[code]
+            for code, value in enumerate(self.values)
+        }
+
+    def num_filled(self) -> int:
+        """Returns the number of rows with a non-empty value."""
+        return sum(count for value, count in self.counts().items() if len(value))
+
+
+class CatalogueColumns:
+    """
+    The catalogue fields of the texts of a corpus, one `Column` per field.
+
+    Rows are the texts, in catalogue order. The columns are a snapshot:
+    they don't follow later changes to the fields of the texts
+    (see `CorpusBase.build_catalogue`).
+    The columns of fields that are not decoded yet (see `CorpusBase.load_fields`)
+    are built on first use, decoding the field of every text.
+    """
+
+    def __init__(self, text_model: Type[BaseModel], texts: Sequence[BaseModel]):
+        self._enum_types: Dict[str, Type[Enum]] = {}
+        self.columns: Dict[str, Column] = {}
+        self._pending: List[str] = []
+
+        for field, info in text_model.model_fields.items():
+            if field in _EXCLUDED_FIELDS:
+                continue
+            if isinstance(info.annotation, type) and issubclass(info.annotation, Enum):
+                self._enum_types[field] = info.annotation
+            if texts and field not in texts[0].__dict__:
+                self._pending.append(field)
+                continue
+            # The values are in __dict__; this skips pydantic's attribute lookup
+            self.columns[field] = Column([_value(text, field) for text in texts])
+
+        # A copy, to tell whether the texts of the corpus have changed since
+        self._texts = list(texts)
+        self._num_rows = len(texts)
+
+    def __len__(self) -> int:
+        return self._num_rows
+
+    def built_from(self, texts: Sequence[BaseModel]) -> bool:
+        """
+        Returns:
+            bool: Whether the rows are the texts of `texts`, in the same order.
+                The values of their fields are not compared.
+        """
+        return len(texts) == self._num_rows and all(map(is_, texts, self._texts))
+
+    def column(self, field: str) -> Column:
+        """
+        Raises:
+            ValueError: If the field is not a catalogue field.
+        """
+        try:
+            return self.columns[field]
+        except KeyError:
+            if field in self._pending:
+                return self._build_pending(field)
+            raise ValueError(
+                f"Invalid field: {field}. "
+                f"Valid options: {list(self.columns) + self._pending}"
+            ) from None
+
+    def _build_pending(self, field: str) -> Column:
+        column = self.columns[field] = Column(
+            [getattr(text, field) for text in self._texts]
+        )
+        self._pending.remove(field)
+        return column
+
+    def where(self, **conditions: Any) -> List[int]:
+        """
+        Find the rows matching every condition.
+
+        Args:
+            **conditions: Field names mapped to a value, or to a list, tuple or set
+                of accepted values. Enum fields also accept the string values.
+
+        Returns:
+            List[int]: The matching rows, in ascending order.
+
+        Raises:
+            ValueError: If a field is not a catalogue field, or a value is not valid for an enum field.
+        """
+        matches: Optional[Set[int]] = None
+        # Start from the most selective condition, so that the sets stay small
+        selections = sorted(
+            (self._select(field, accepted) for field, accepted in conditions.items()),
+            key=len,
+        )
+        for rows in selections:
+            matches = set(rows) if matches is None else matches.intersection(rows)
+            if not matches:
+                return []
+        if matches is None:
+            return list(range(self._num_rows))
+        return sorted(matches)
+
+    def _select(self, field: str, accepted: Any) -> array:
+        column = self.column(field)
+        if not isinstance(accepted, (list, tuple, set, frozenset)):
+            accepted = [accepted]
+        # The rows of different values are disjoint, so they can simply be concatenated
+        rows = array("I")
+        for value in accepted:
+            rows.extend(column.rows(self._normalize(field, value)))
+        return rows
+
+    def _normalize(self, field: str, value: Any) -> Any:
+        # Accept the string values of enum fields, and reject invalid ones
+        enum_type = self._enum_types.get(field)
+        if enum_type is None or isinstance(value, enum_type):
+            return value
+        try:
+            return enum_type(value)
+        except ValueError:
+            raise ValueError(
+                f"Invalid value for {field}: {value!r}. "
+                f"Valid options: {[member.value for member in enum_type]}"
+            ) from None
+
+    def unique_values(self, fields: Iterable[str]) -> Dict[str, Set[Any]]:
+        """
+        Returns:
+            Dict[str, Set[Any]]: The distinct values of each of `fields` that is a catalogue field.
+        """
+        return {
+            field: set(self.column(field).values)
+            for field in fields
+            if field in self.columns or field in self._pending
+        }
+
+    def fill_rates(self) -> Dict[str, float]:
+        """
+        Returns:
+            Dict[str, float]: The percentage of rows with a non-empty value, per field.
+        """
+        for field in list(self._pending):
+            self._build_pending(field)
+        if not self._num_rows:
+            return {field: 0.0 for field in self.columns}
+        return {
+            field: (column.num_filled() / self._num_rows) * 100
+            for field, column in self.columns.items()
+        }
@@ -8,6 +8,9 @@ Example usage:
     corpus = Corpus.load(CorpusType.ADMIN_ED3A, "/path/to/corpus")
     unique_values = corpus.get_unique_values({"field1", "field2"})
     summary = corpus.summarize_corpus_properties()
+    texts = corpus.where(period=Period.UR_III, provenience=["Girsu", "Umma"])
+    lines = list(corpus.concordance("cf:lugal", width=3))
+    sequences = corpus.sign_sequences(SignResolver.load(), path="signs/")
 
 
     # catalogue.json # TODO
@@ -40,14 +43,47 @@ Example usage:
 
 """
 
-from typing import Dict, Generic, List, Set, TypeVar
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    get_args,
+)
 
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 
-from ..text import Text
+from ...projection import project_all
+
+from .catalogue_columns import CatalogueColumns
+from ..concordance import ConcordanceLine, catalogue_sort_key, concordance_lines
+from ..ngrams import NgramCounter, check_token_type, text_ngrams
+from ..lemma_index import LemmaIndex, SearchHit, check_term, lemma_entries
+from ..pool import error_message, map_texts, tree_task
+from ..sign_sequences import Encoder, SignEncoder, SignSequences, write_sequences
+from ..text import CDLNode, Text, parse_cdl_node, read_cdl
+from ..text.cdl_cache import CDLCache
+from ..text.lemma_store import LemmaStore
+
+if TYPE_CHECKING:
+    from ...glossary.sign_resolver import SignResolver
 
 T = TypeVar("T", bound=Text)
 
+# Needed to find the file of a text
+_ALWAYS_LOADED_FIELDS = {"id_text", "dir_path"}
+
 
 class CorpusBase(BaseModel, Generic[T]):
     """
@@ -59,6 +95,15 @@ class CorpusBase(BaseModel, Generic[T]):
 
     texts: List[T] = []
 
+    # Only set for lazily-loaded corpora
+    _cdl_cache: Optional[CDLCache] = PrivateAttr(None)
+
+    # Built on first use, or by `build_catalogue`
+    _catalogue: Optional[CatalogueColumns] = PrivateAttr(None)
+
+    # Set by `build_lemma_index` or `use_lemma_index`
+    _lemma_index: Optional[LemmaIndex] = PrivateAttr(None)
+
     # def __init__(self, texts: List[TextType]):
     # self.texts = TextType()
 
@@ -82,48 +127,504 @@ class CorpusBase(BaseModel, Generic[T]):
     #            for text_data in catalogue["members"].values()
     #        ])
 
+    def load_fields(self, texts: List[Dict[str, Any]], fields: Iterable[str]) -> None:
+        """
+        Like `load`, but only validate some of the catalogue fields of each text.
+
+        The other fields are validated from the catalogue record the first time
+        they are read (see `sumeripy.projection`). `id_text` and `dir_path`
+        are always validated.
+
+        Args:
+            texts (List[Dict[str, Any]]): The catalogue members, with `dir_path`.
+            fields (Iterable[str]): The names of the fields to validate, e.g. {"period", "genre"}.
+
+        Raises:
+            ValueError: If a field is not a field of the text model.
+        """
+        self.texts = project_all(
+            self._text_model(), set(fields) | _ALWAYS_LOADED_FIELDS, texts
+        )
+
+    @property
+    def cdl_cache(self) -> Optional[CDLCache]:
+        """The cache backing `text.contents()` when the corpus is lazily loaded."""
+        return self._cdl_cache
+
+    def enable_lazy_contents(
+        self,
+        max_entries: Optional[int] = 256,
+        max_bytes: Optional[int] = None,
+        trusted: bool = False,
+    ) -> CDLCache:
+        """
+        Load the contents of each text on first call to `text.contents()`,
+        keeping at most `max_entries` trees / `max_bytes` bytes in memory.
+        `text.cdl` is left empty.
+
+        Evicted trees are re-parsed from corpusjson/ when accessed again.
+
+        Args:
+            max_entries (Optional[int]): Maximum number of parsed trees to keep.
+            max_bytes (Optional[int]): Maximum size of the parsed trees to keep,
+                measured as the size of their corpusjson files.
+            trusted (bool): If True, skip validation when parsing (see `construct_cdl_node`).
+
+        Returns:
+            CDLCache: The cache shared by the texts of the corpus.
+        """
+        cache = CDLCache(max_entries=max_entries, max_bytes=max_bytes)
+        for text in self.texts:
+            text.use_cdl_cache(cache, trusted)
+        self._cdl_cache = cache
+        return cache
+
+    def cache_stats(self) -> Dict[str, int]:
+        """
+        Returns:
+            Dict[str, int]: Hit/miss/eviction counters of the CDL cache.
+                Empty if the corpus is not lazily loaded.
+        """
+        if self._cdl_cache is None:
+            return {}
+        return self._cdl_cache.stats()
+
+    def load_all_contents(
+        self, workers: Optional[int] = None, chunksize: int = 16, trusted: bool = False
+    ) -> Dict[str, str]:
+        """
+        Load the contents of every text, reading corpusjson files across a process pool.
+
+        Workers only decode the JSON, and send back the raw nodes: the models
+        are built here, as results are assigned in catalogue order, so the
+        outcome does not depend on the number of workers. In lazy mode, only
+        the trees that the cache can keep are built (the last ones that fit
+        its budget), so invalid contents of the other texts are only reported
+        when they are accessed. A text that fails to load is reported and
+        skipped; the rest of the batch carries on.
+
+        Args:
+            workers, chunksize, trusted: See `sumeripy.corpora.pool`.
+
+        Returns:
+            Dict[str, str]: Error messages of the texts that failed to load, keyed by file id.
+        """
+        jobs = [text.file_path for text in self.texts]
+
+        if workers == 1:
+            results = map(_load_contents_worker, jobs)
+            return self._assign_contents(results, trusted)
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(_load_contents_worker, jobs, chunksize=chunksize)
+            return self._assign_contents(results, trusted)
+
+    def _assign_contents(self, results, trusted: bool) -> Dict[str, str]:
+        failures = {}
+
+        def _parse(file_id: str, nodes) -> Optional[List[CDLNode]]:
+            try:
+                return [parse_cdl_node(node, trusted) for node in nodes]
+            except Exception as e:
+                failures[file_id] = error_message(e)
+                return None
+
+        cache = self._cdl_cache
+        # Lazy mode: the nodes of the most recent texts that fit in the cache
+        kept: deque = deque()
+        kept_bytes = 0
+        for text, (nodes, size, error) in zip(self.texts, results):
+            if error is not None:
+                failures[text.file_id] = error
+            elif cache is None:
+                cdl = _parse(text.file_id, nodes)
+                if cdl is not None:
+                    text.cdl = cdl
+            else:
+                kept.append((text.file_id, nodes, size))
+                kept_bytes += size
+                while len(kept) > 1 and not cache.fits(len(kept), kept_bytes):
+                    kept_bytes -= kept.popleft()[2]
+
+        if cache is not None:
+            for file_id, nodes, size in kept:
+                cdl = _parse(file_id, nodes)
+                if cdl is not None:
+                    cache.put(file_id, cdl, size)
+        return failures
+
+    def compact_lemmas(self) -> LemmaStore:
+        """
+        Move the lemmas of every text with loaded contents into one `LemmaStore`
+        shared by the corpus, replacing them by `LemmaView`s.
+
+        Strings repeated across texts are then only kept once.
+
+        Returns:
+            LemmaStore: The store holding the lemmas.
+
+        Raises:
+            ValueError: If the corpus is lazily loaded: its trees are not kept around.
+        """
+        if self._cdl_cache is not None:
+            raise ValueError(
+                "The lemmas of a lazily-loaded corpus can't be compacted. "
+                "Load it with load(..., lazy=False, contents=True)."
+            )
+        store = LemmaStore()
+        for text in self.texts:
+            text.compact_lemmas(store)
+        return store
+
+    @property
+    def lemma_index(self) -> Optional[LemmaIndex]:
+        """The index used by `search`, if any."""
+        return self._lemma_index
+
+    def use_lemma_index(self, index: LemmaIndex) -> None:
+        """
+        Use a previously built index (see `read_index`) for `search`.
+
+        Args:
+            index (LemmaIndex): The index of the corpus.
+        """
+        self._lemma_index = index
+
+    def build_lemma_index(
+        self, workers: Optional[int] = None, chunksize: int = 16, trusted: bool = False
+    ) -> Dict[str, str]:
+        """
+        Build the inverted index over the lemmas of every text used by `search`.
+
+        Texts with loaded contents are indexed from memory, the others across
+        a process pool (see `sumeripy.corpora.pool`). A text that fails to load
+        is left out of the index.
+
+        Args:
+            workers, chunksize, trusted: See `sumeripy.corpora.pool`.
+
+        Returns:
+            Dict[str, str]: Error messages of the texts that failed to load, keyed by file id.
+        """
+        # Only `cdl` is read, not `contents()`: in lazy mode, going through
+        # the cache would evict useful trees
+        failures: Dict[str, str] = {}
+        results = map_texts(
+            self.texts, tree_task(lemma_entries), workers, chunksize, trusted, failures
+        )
+        self._lemma_index = LemmaIndex.build(
+            (text.file_id, entries) for text, entries in results
+        )
+        return failures
+
+    def search(
+        self,
+        all_of: Iterable[str] = (),
+        any_of: Iterable[str] = (),
+        phrase: Iterable[str] = (),
+    ) -> Dict[str, List[SearchHit]]:
+        """
+        Search the lemmas of the corpus, using the index rather than corpusjson/.
+
+        Terms are written `field:value`, with field one of `cf` (citation form),
+        `gw` (guide word), `pos`, `sig`, `form` or `value` (sign value or sign name).
+
+        Example usage:
+            corpus.search(all_of=["cf:lugal", "cf:dumu"])
+            corpus.search(any_of=["gw:king", "gw:lady"])
+            corpus.search(phrase=["cf:dumu", "cf:lugal"])
+
+        Args:
+            all_of (Iterable[str]): Terms that must all occur in the text.
+            any_of (Iterable[str]): Terms of which at least one must occur in the text.
+            phrase (Iterable[str]): Terms that must occur on consecutive tokens of one line,
+                in this order.
+
+        Returns:
+            Dict[str, List[SearchHit]]: The ids of the matching texts, in corpus order,
+                with the tokens (text id, line ref, token position) that matched.
+
+        Raises:
+            ValueError: If the corpus has no index, or the query is invalid.
+        """
+        if self._lemma_index is None:
+            raise ValueError(
+                "The corpus has no lemma index. Call build_lemma_index() "
+                "or load it with load(..., index=True)."
+            )
+        return self._lemma_index.search(all_of=all_of, any_of=any_of, phrase=phrase)
+
+    def concordance(
+        self,
+        query: str,
+        width: int = 5,
+        sort_by: Iterable[str] = ("period", "provenience"),
+        workers: Optional[int] = None,
+        chunksize: int = 16,
+        trusted: bool = False,
+        failures: Optional[Dict[str, str]] = None,
+    ) -> Iterator[ConcordanceLine]:
+        """
+        Keyword-in-context view of every occurrence of a query.
+
+        Texts are visited in order of the `sort_by` catalogue fields (then in
+        catalogue order), and their lines are yielded as soon as they are found,
+        so that a large corpus never has to be held in memory (see `sumeripy.corpora.pool`).
+        With a lemma index (see `build_lemma_index`), texts without the
+        query are skipped without being read.
+
+        Example usage:
+            for line in corpus.concordance("cf:lugal", width=3):
+                print(line)
+
+        Args:
+            query (str): A term, as `field:value` (see `search`).
+            width (int): The number of tokens of context on each side.
+            sort_by (Iterable[str]): Catalogue fields to order the texts by.
+            workers, chunksize, trusted, failures: See `sumeripy.corpora.pool`.
+
+        Returns:
+            Iterator[ConcordanceLine]: The occurrences, text by text.
+
+        Raises:
+            ValueError: If the query is invalid, or a `sort_by` field is not a catalogue field.
+        """
+        # Validate now rather than on the first iteration
+        check_term(query)
+        sort_by = tuple(sort_by)
+        for field in sort_by:
+            self.catalogue.column(field)
+
+        texts = self.texts
+        if self._lemma_index is not None:
+            matching = {hit.text_id for hit in self._lemma_index.postings(query)}
+            texts = [text for text in texts if text.file_id in matching]
+        texts = sorted(texts, key=lambda text: catalogue_sort_key(text, sort_by))
+
+        task = partial(concordance_lines, query=query, width=width)
+        results = map_texts(texts, task, workers, chunksize, trusted, failures)
+        return (line for _, lines in results for line in lines)
+
+    def count_ngrams(
+        self,
+        token_type: str = "form",
+        orders: Iterable[int] = (1, 2, 3),
+        group_by: Optional[str] = "period",
+        workers: Optional[int] = None,
+        chunksize: int = 16,
+        trusted: bool = False,
+        max_entries: int = 2_000_000,
+        spill_dir: Optional[str] = None,
+        failures: Optional[Dict[str, str]] = None,
+    ) -> NgramCounter:
+        """
+        Count the n-grams of every text, summed per value of a catalogue field.
+
+        Texts are read across a process pool (see `sumeripy.corpora.pool`).
+        Counts past `max_entries` distinct n-grams are spilled to disk (see `NgramCounter`).
+
+        Example usage:
+            with corpus.count_ngrams("cf", orders=(1, 2), group_by="genre") as counts:
+                counts.most_common(10, n=2)
+                counts.collocations(k=20, measure="pmi")
+
+        Args:
+            token_type (str): `form`, `cf`, `pos`, `value` (sign values) or `transliteration`.
+            orders (Iterable[int]): The lengths of n-grams to count.
+                Collocations need bigrams.
+            group_by (Optional[str]): The catalogue field to group the counts by
+                (e.g. `period`, `genre`). None to count the corpus as a whole.
+            max_entries (int): The number of distinct n-grams kept in memory.
+            spill_dir (Optional[str]): Where to spill counts. Defaults to the temp directory.
+            workers, chunksize, trusted, failures: See `sumeripy.corpora.pool`.
+
+        Returns:
+            NgramCounter: The counts. Close it to delete spilled counts.
+
+        Raises:
+            ValueError: If the token type, an order, or the `group_by` field is invalid.
+        """
+        check_token_type(token_type)
+        orders = tuple(orders)
+        if not orders or any(n < 1 for n in orders):
+            raise ValueError(f"Invalid orders: {orders}. Expected positive lengths")
+        if group_by is not None:
+            self.catalogue.column(group_by)
+
+        groups = {text.file_id: "" for text in self.texts}
+        if group_by is not None:
+            for text in self.texts:
+                (value,) = catalogue_sort_key(text, (group_by,))
+                groups[text.file_id] = (
+                    ", ".join(value) if isinstance(value, tuple) else str(value)
+                )
+
+        counter = NgramCounter(max_entries=max_entries, spill_dir=spill_dir)
+        task = partial(text_ngrams, token_type=token_type, orders=orders, groups=groups)
+        for _, counts in map_texts(
+            self.texts, task, workers, chunksize, trusted, failures
+        ):
+            counter.add(counts)
+        return counter
+
+    def sign_sequences(
+        self,
+        resolver: "SignResolver",
+        path: Optional[str] = None,
+        workers: Optional[int] = None,
+        chunksize: int = 16,
+        trusted: bool = False,
+        failures: Optional[Dict[str, str]] = None,
+    ) -> SignSequences:
+        """
+        Encode every text as the sequence of the sign names of its lemmas
+        (see `sign_sequences.lemma_signs`), with one vocabulary for the corpus.
+
+        Example usage:
+            resolver = SignResolver.load()
+            sequences = corpus.sign_sequences(resolver, path="signs/")
+            sequences.decode("P010156")
+
+        Args:
+            resolver (SignResolver): Resolves values to sign names.
+            path (Optional[str]): If given, the directory to save the sequences to
+                (see `write_sequences`).
+            workers, chunksize, trusted, failures: See `sumeripy.corpora.pool`.
+
+        Returns:
+            SignSequences: The codes of each text, in corpus order, and the vocabulary.
+        """
+        encoder = SignEncoder(resolver)
+        sequences = self.encode_texts(encoder, workers, chunksize, trusted, failures)
+        result = SignSequences(encoder.vocabulary, sequences)
+        if path is not None:
+            write_sequences(path, result)
+        return result
+
+    def encode_texts(
+        self,
+        encoder: Encoder,
+        workers: Optional[int] = None,
+        chunksize: int = 16,
+        trusted: bool = False,
+        failures: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, array]:
+        """
+        Encode every text as integer codes into the vocabulary of an encoder,
+        which grows with the tokens it hasn't seen yet.
+
+        Texts are read across a process pool (see `sumeripy.corpora.pool`), where
+        each worker encodes with its own copy of the encoder (see `Encoder.recode`).
+
+        Args:
+            encoder (Encoder): e.g. a `SignEncoder` or a `TokenEncoder`.
+            workers, chunksize, trusted, failures: See `sumeripy.corpora.pool`.
+
+        Returns:
+            Dict[str, array]: The codes of each text, keyed by file id, in corpus order.
+        """
+        task = tree_task(encoder.encode_with_tokens)
+        return {
+            text.file_id: encoder.recode(tokens, codes)
+            for text, (tokens, codes) in map_texts(
+                self.texts, task, workers, chunksize, trusted, failures
+            )
+        }
+
+    @property
+    def catalogue(self) -> CatalogueColumns:
+        """
+        The columnar view of the catalogue fields of the texts (see `build_catalogue`).
+        Rebuilt if texts were added, removed or replaced since.
+        """
+        if self._catalogue is None or not self._catalogue.built_from(self.texts):
+            self.build_catalogue()
+        return self._catalogue  # type: ignore
+
+    def build_catalogue(self) -> CatalogueColumns:
+        """
+        Build the columnar view of the catalogue used by `where`.
+
+        `load()` builds it once, and it is rebuilt when `texts` changes. It does not
+        follow later changes to the fields of the texts (including `langs`, which is
+        set by `transliteration()`): call this again after modifying them.
+
+        Returns:
+            CatalogueColumns: The catalogue, one dictionary-encoded column per field.
+        """
+        self._catalogue = CatalogueColumns(self._text_model(), self.texts)
+        return self._catalogue
+
+    def where(self, **conditions: Any) -> List[T]:
+        """
+        Find the texts whose catalogue fields match every condition.
+
+        Example usage:
+            corpus.where(period=Period.UR_III, genre=["Legal", "Letter"])
+
+        Args:
+            **conditions: Field names mapped to a value, or to a list, tuple or set
+                of accepted values. Enum fields also accept the string values.
+
+        Returns:
+            List[T]: The matching texts, in catalogue order.
+
+        Raises:
+            ValueError: If a field is not a catalogue field, or a value is not valid for an enum field.
+        """
+        texts = self.texts
+        return [texts[row] for row in self.catalogue.where(**conditions)]
+
     def get_unique_values(self, whitelist) -> Dict[str, Set[str]]:
         """
         Useful for getting a list of all the unique values for a given field or fields.
+        Read from `catalogue`.
 
         Args:
             whitelist (Set[str]): A set of field names to include in the unique values.
 
         Returns:
             Dict[str, Set[str]]: A dictionary where the keys are field names and the values are sets of unique values for each field.
+                List fields have their values as tuples.
         """
-        unique_values = {}
-        for text in self.texts:
-            for field in text.model_fields:
-                if field not in whitelist:
-                    continue
-                if field not in unique_values:
-                    unique_values[field] = set()
-                unique_values[field].add(getattr(text, field))
-        return unique_values
+        if not self.texts:
+            return {}
+        return self.catalogue.unique_values(whitelist)
 
     def summarize_corpus_properties(self):
         """Summarizes the properties of the corpus.
+        Read from `catalogue`, except for `cdl`.
 
         Returns:
             dict: A dictionary where the key is the property name and the value is the percentage of texts that have a non-empty value for that property.
         """
-        num_texts = len(self.texts)
+        if not self.texts:
+            return {}
+        fill_rates = self.catalogue.fill_rates()
 
-        # Dict where key is property name and
-        # value is number of texts that have a non-empty value for that property
-        property_counts = {}
-        for text in self.texts:
-            for field in text.model_fields:
-                if field not in property_counts:
-                    property_counts[field] = 0
+        # Only the contents pinned on the texts are counted (`cdl` is empty for
+        # lazily-loaded corpora), so that they are not read in full
+        num_filled = sum(1 for text in self.texts if len(text.cdl))
+        fill_rates["cdl"] = (num_filled / len(self.texts)) * 100
+
+        return {
+            field: fill_rates[field]
+            for field in self._text_model().model_fields
+            if field in fill_rates
+        }
 
-                value = getattr(text, field)
-                if len(value):
-                    property_counts[field] += 1
+    def _text_model(self):
+        # e.g. List[TextAdminEd3b] for CorpusBase[TextAdminEd3b]
+        (text_model,) = get_args(self.model_fields["texts"].annotation)
+        return text_model
 
-        # Now format it a percentage of the overall number of texts
-        for property_name, count in property_counts.items():
-            property_counts[property_name] = (count / num_texts) * 100
 
-        return property_counts
+def _load_contents_worker(
+    text_path: str,
+) -> Tuple[Optional[List[Dict[str, Any]]], int, Optional[str]]:
+    """Sends back the raw nodes, which are much cheaper to pickle than the models."""
+    try:
+        nodes, size = read_cdl(text_path)
+        return nodes, size, None
+    except Exception as e:
+        return None, 0, error_message(e)
@@ -20,6 +20,21 @@ from .corpus_other import (
     CorpusUdughul,
     CorpusVaria,
 )
+from ..text import (
+    TextAdminEd1and2,
+    TextAdminEd3a,
+    TextAdminEd3b,
+    TextAdminLagash2,
+    TextAdminOldAkk,
+    TextAdminUr3,
+    TextIncantations,
+    TextLiteraryEarly,
+    TextLiteraryOldBab,
+    TextLiturgies,
+    TextRoyal,
+    TextUdughul,
+    TextVaria,
+)
 
 
 class CorpusType(str, Enum):
@@ -136,3 +151,24 @@ class CorpusType(str, Enum):
         if self in type_to_model:
             return type_to_model[self]
         raise ValueError("Invalid corpus")
+
+    @property
+    def text_model(self):
+        type_to_text_model = {
+            CorpusType.ADMIN_ED_1_2: TextAdminEd1and2,
+            CorpusType.ADMIN_ED_3A: TextAdminEd3a,
+            CorpusType.ADMIN_ED_3B: TextAdminEd3b,
+            CorpusType.ADMIN_OAKK: TextAdminOldAkk,
+            CorpusType.ADMIN_LAGASH2: TextAdminLagash2,
+            CorpusType.ADMIN_UR3: TextAdminUr3,
+            CorpusType.LITERARY_EARLY: TextLiteraryEarly,
+            CorpusType.LITERARY_OLDBAB: TextLiteraryOldBab,
+            CorpusType.ROYAL: TextRoyal,
+            CorpusType.INCANTATIONS: TextIncantations,
+            CorpusType.UDUGHUL: TextUdughul,
+            CorpusType.LITURGIES: TextLiturgies,
+            CorpusType.PRACTICAL_VARIA: TextVaria,
+        }
+        if self in type_to_text_model:
+            return type_to_text_model[self]
+        raise ValueError("Invalid corpus")
@@ -0,0 +1,247 @@
+"""
+Incremental downloads of corpus archives.
+
+The state of each download (validators of the archive and the CRC of each
+extracted member) is saved next to the corpus, so that later downloads can:
+    - skip archives that have not changed (`If-None-Match` / `If-Modified-Since`);
+    - resume interrupted downloads (`Range` / `If-Range`);
+    - only re-extract the members whose CRC changed.
+
+fetch_archive()
+extract_changed()
+load_state()
+save_state()
+"""
+
+import json
+import os
+import zipfile
+import zlib
+from typing import Any, Callable, Dict, Optional
+
+import requests
+
+from ..fileio import atomic_write
+
+_CHUNK_SIZE = 64 * 1024
+
+# (downloaded bytes, total bytes or None if unknown)
+ProgressCallback = Callable[[int, Optional[int]], None]
+
+
+def load_state(state_path: str, mode: str) -> Dict[str, Any]:
+    """
+    Returns the saved state of a download, or an empty state.
+
+    Args:
+        state_path (str): The state file of the corpus.
+        mode (str): "extract" or "archive". Extracted corpora and kept archives
+            are updated independently, so each has its own state.
+    """
+    return _read_states(state_path).get(mode, {})
+
+
+def save_state(state_path: str, state: Dict[str, Any], mode: str) -> None:
+    """Saves the state of a download, next to the state of the other mode."""
+    states = _read_states(state_path)
+    states[mode] = state
+    with atomic_write(state_path, "w") as f:
+        json.dump(states, f)
+
+
+def _read_states(state_path: str) -> Dict[str, Dict[str, Any]]:
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            states = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(states, dict):
+        return {}
+    if states and not states.keys() <= {"extract", "archive"}:
+        # Saved by an older version, with one state for both modes
+        states = {"extract" if "extracted" in states else "archive": states}
+    return states
+
+
+def fetch_archive(
+    url: str,
+    zip_path: str,
+    state: Dict[str, Any],
+    check_unchanged: bool,
+    session: Optional[requests.Session] = None,
+    timeout: float = 240,
+    progress: Optional[ProgressCallback] = None,
+) -> bool:
+    """
+    Stream an archive to disk, resuming a previous partial download if possible.
+
+    Chunks are written to `<zip_path>.part`, which is renamed to `zip_path` once complete.
+    If the server can't resume from the end of the partial file (416), the file
+    is kept if it already holds the whole archive, and downloaded again otherwise.
+    `state` is updated in place with the validators of the archive
+    (it must be saved by the caller, including when this raises).
+
+    Args:
+        url (str): The URL of the archive.
+        zip_path (str): Where to save the archive.
+        state (Dict[str, Any]): The saved state of the download.
+        check_unchanged (bool): If True, ask the server whether the archive
+            changed since the last complete download.
+        session (Optional[requests.Session]): The session to use. Defaults to `requests`.
+        timeout (float): Timeout of the connection and of each read, in seconds.
+        progress (Optional[ProgressCallback]): Called after each chunk.
+
+    Returns:
+        bool: False if the server reported the archive as unchanged, True otherwise.
+
+    Raises:
+        requests.RequestException: If the download fails.
+    """
+    http = session if session is not None else requests
+    part_path = f"{zip_path}.part"
+    headers = {}
+
+    if check_unchanged and state.get("url") == url:
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+
+    # Only resume if we know which version of the archive the partial file belongs to
+    partial = state.get("partial", {})
+    validator = partial.get("etag") or partial.get("last_modified")
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    if offset and validator and partial.get("url") == url:
+        headers["Range"] = f"bytes={offset}-"
+        headers["If-Range"] = validator
+
+    with http.get(url, headers=headers, stream=True, timeout=timeout) as response:
+        if response.status_code == 304:
+            return False
+        if response.status_code == 416 and "Range" in headers:
+            # The partial file is complete (the rename was interrupted), or it
+            # is longer than the archive: either keep it or start over
+            complete = _unsatisfied_range_size(response) == offset
+        else:
+            response.raise_for_status()
+            complete = None
+
+        if complete is None:
+            _stream_to(response, part_path, offset, state, url, progress)
+
+    if complete is False:
+        os.remove(part_path)
+        state.pop("partial", None)
+        return fetch_archive(
+            url, zip_path, state, check_unchanged, session, timeout, progress
+        )
+
+    os.replace(part_path, zip_path)
+    partial = state.pop("partial")
+    state.update(partial)
+    return True
+
+
+def _stream_to(
+    response: requests.Response,
+    part_path: str,
+    offset: int,
+    state: Dict[str, Any],
+    url: str,
+    progress: Optional[ProgressCallback],
+) -> None:
+    """Write the body of `response` to the partial file, appending to it if it is a range"""
+
+    if response.status_code == 206:
+        mode = "ab"
+    else:
+        # The server ignored the range (or the archive changed): start over
+        mode = "wb"
+        offset = 0
+
+    state["partial"] = {
+        "url": url,
+        "etag": response.headers.get("ETag", ""),
+        "last_modified": response.headers.get("Last-Modified", ""),
+    }
+
+    total = _total_size(response, offset)
+    downloaded = offset
+    with open(part_path, mode) as f:
+        for chunk in response.iter_content(_CHUNK_SIZE):
+            f.write(chunk)
+            downloaded += len(chunk)
+            if progress is not None:
+                progress(downloaded, total)
+
+
+def extract_changed(zip_path: str, dest: str, state: Dict[str, Any]) -> int:
+    """
+    Extract the members of an archive whose CRC differs from the extracted copy.
+
+    Members that are no longer in the archive are deleted.
+    `state["crcs"]` is updated in place.
+
+    Args:
+        zip_path (str): The archive.
+        dest (str): The directory to extract to.
+        state (Dict[str, Any]): The saved state of the download.
+
+    Returns:
+        int: The number of extracted members.
+
+    Raises:
+        zipfile.BadZipFile: If the archive is corrupt.
+    """
+    old_crcs: Dict[str, int] = state.get("crcs", {})
+    new_crcs: Dict[str, int] = {}
+    num_extracted = 0
+
+    with zipfile.ZipFile(zip_path, "r") as zip_ref:
+        for info in zip_ref.infolist():
+            if info.is_dir():
+                continue
+            new_crcs[info.filename] = info.CRC
+            target = os.path.join(dest, info.filename)
+            if _crc_of(target, old_crcs.get(info.filename)) == info.CRC:
+                continue
+            zip_ref.extract(info, dest)
+            num_extracted += 1
+
+    for filename in old_crcs.keys() - new_crcs.keys():
+        target = os.path.join(dest, filename)
+        if os.path.exists(target):
+            os.remove(target)
+
+    state["crcs"] = new_crcs
+    return num_extracted
+
+
+def _crc_of(path: str, known_crc: Optional[int]) -> Optional[int]:
+    """The CRC of an extracted file, trusting the recorded one if the file is still there"""
+    if not os.path.exists(path):
+        return None
+    if known_crc is not None:
+        return known_crc
+
+    # Extracted by an older version, without recorded CRCs
+    crc = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def _unsatisfied_range_size(response: requests.Response) -> Optional[int]:
+    """The size of the archive sent with a 416 (`Content-Range: bytes */<size>`), if any"""
+    total = response.headers.get("Content-Range", "").rsplit("/", 1)[-1]
+    return int(total) if total.isdigit() else None
+
+
+def _total_size(response: requests.Response, offset: int) -> Optional[int]:
+    content_range = response.headers.get("Content-Range", "")
+    if response.status_code == 206 and "/" in content_range:
+        total = content_range.rsplit("/", 1)[1]
+        return int(total) if total.isdigit() else None
+    length = response.headers.get("Content-Length")
+    return offset + int(length) if length and length.isdigit() else None
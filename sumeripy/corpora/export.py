@@ -0,0 +1,186 @@
+"""
+Export of the transliterations of a corpus to sharded JSONL or Parquet files.
+
+The texts are split into contiguous shards, in catalogue order, and each
+shard is written by one worker. Shards are written to a temporary file and
+renamed once complete, so a shard file that exists is always complete and an
+interrupted export can be resumed by skipping them. The texts of a shard that
+failed to load are saved next to it (`<shard>.failures.json`) beforehand, so
+that they can still be reported when the shard is skipped.
+
+split_into_shards()
+shard_path()
+check_format()
+export_shard()
+read_failures()
+remove_shards()
+read_manifest()
+write_manifest()
+"""
+
+import importlib.util
+import json
+import os
+import re
+from typing import IO, Any, Dict, List, Optional, Tuple
+
+from ..fileio import atomic_write
+from .corpus import CorpusType
+from .pool import error_message
+
+FORMATS = ("jsonl", "parquet")
+
+_MANIFEST_FILENAME = "manifest.json"
+
+# Shards and their failures, whatever the number of shards and the format
+_SHARD_FILENAME = re.compile(r"part-\d{5}-of-\d{5}\.")
+
+# (corpus name, catalogue members of the texts, shard path, format, trusted)
+ShardJob = Tuple[str, List[Dict[str, Any]], str, str, bool]
+
+
+def split_into_shards(items: List[Any], num_shards: int) -> List[List[Any]]:
+    """
+    Split a list into `num_shards` contiguous parts of (almost) equal size.
+
+    The split only depends on the number of items, so it is the same on every run.
+    """
+    size, remainder = divmod(len(items), num_shards)
+    shards = []
+    start = 0
+    for i in range(num_shards):
+        end = start + size + (1 if i < remainder else 0)
+        shards.append(items[start:end])
+        start = end
+    return shards
+
+
+def shard_path(out_dir: str, index: int, num_shards: int, format: str) -> str:
+    """Returns the path of a shard, e.g. `<out_dir>/part-00003-of-00016.jsonl`."""
+    return os.path.join(out_dir, f"part-{index:05d}-of-{num_shards:05d}.{format}")
+
+
+def check_format(format: str) -> None:
+    """
+    Raises:
+        ValueError: If the format is not supported.
+        ImportError: If the format needs a package that is not installed.
+    """
+    if format not in FORMATS:
+        raise ValueError(f"Invalid format: {format}. Valid options: {FORMATS}")
+    if format == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        raise ImportError("Exporting to Parquet requires pyarrow: pip install pyarrow")
+
+
+def export_shard(job: ShardJob) -> Dict[str, str]:
+    """
+    Write the transliterations of the texts of one shard.
+
+    Runs in a worker process. A text that fails to load is left out of the
+    shard and reported, so that one bad text can't stop the export. The failures
+    are also saved for `read_failures`, before the shard is renamed into place.
+
+    Args:
+        job (ShardJob): The corpus name, the catalogue members of the texts
+            (with their `dir_path`), the path of the shard, the format and
+            whether to skip validation when parsing.
+
+    Returns:
+        Dict[str, str]: Error messages of the texts that failed to load, keyed by file id.
+    """
+    corpus_name, texts_data, path, format, trusted = job
+    text_model = CorpusType(corpus_name).text_model
+
+    records = []
+    failures = {}
+    for text_data in texts_data:
+        try:
+            text = text_model(**text_data)
+            text.load_contents(trusted=trusted)
+            transliteration = text.transliteration()
+        except Exception as e:
+            failures[_member_id(text_data)] = error_message(e)
+            continue
+        # `langs` is set by transliteration()
+        record = text.model_dump(mode="json", exclude={"cdl", "dir_path"})
+        record["transliteration"] = transliteration
+        records.append(record)
+
+    if format == "parquet":
+        with atomic_write(path) as f:
+            _write_parquet(f, records)
+            _write_failures(path, failures)
+    else:
+        with atomic_write(path, "w") as f:
+            _write_jsonl(f, records)
+            _write_failures(path, failures)
+    return failures
+
+
+def _member_id(text_data: Dict[str, Any]) -> str:
+    """Returns the file id of a catalogue member, even one that isn't a valid text"""
+    return str(text_data.get("id_text") or text_data.get("id_composite") or "")
+
+
+def read_failures(path: str) -> Dict[str, str]:
+    """
+    Returns:
+        Dict[str, str]: Error messages of the texts left out of a shard
+            written by `export_shard`, keyed by file id.
+    """
+    try:
+        with open(_failures_path(path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def remove_shards(out_dir: str) -> None:
+    """Removes the shards (and their failures) of a previous export to `out_dir`."""
+    for filename in os.listdir(out_dir):
+        if _SHARD_FILENAME.match(filename):
+            os.remove(os.path.join(out_dir, filename))
+
+
+def read_manifest(out_dir: str) -> Optional[Dict[str, Any]]:
+    """Returns the manifest of a previous export to `out_dir`, if any."""
+    try:
+        with open(
+            os.path.join(out_dir, _MANIFEST_FILENAME), "r", encoding="utf-8"
+        ) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(out_dir: str, manifest: Dict[str, Any]) -> None:
+    """Saves the manifest of an export, which identifies the corpus and the sharding."""
+    path = os.path.join(out_dir, _MANIFEST_FILENAME)
+    with atomic_write(path, "w") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+
+def _failures_path(path: str) -> str:
+    return f"{path}.failures.json"
+
+
+def _write_failures(path: str, failures: Dict[str, str]) -> None:
+    failures_path = _failures_path(path)
+    if not failures:
+        if os.path.exists(failures_path):
+            os.remove(failures_path)
+        return
+    with atomic_write(failures_path, "w") as f:
+        json.dump(failures, f, ensure_ascii=False)
+
+
+def _write_jsonl(f: IO[str], records: List[Dict[str, Any]]) -> None:
+    for record in records:
+        f.write(json.dumps(record, ensure_ascii=False))
+        f.write("\n")
+
+
+def _write_parquet(f: IO[bytes], records: List[Dict[str, Any]]) -> None:
+    pa = importlib.import_module("pyarrow")
+    pq = importlib.import_module("pyarrow.parquet")
+    pq.write_table(pa.Table.from_pylist(records), f)
@@ -0,0 +1,370 @@
+"""
+An inverted index over the lemmas of a corpus, so that texts can be
+searched without reading corpusjson/.
+
+Each term is a field and a value, written `field:value`
+(e.g. `cf:lugal`, `gw:king`, `pos:N`, `value:lugal`), and maps to the
+list of tokens where it occurs, as (text, line, token position) triples.
+Token positions count the lemmas of a text in document order, so that
+phrases can be matched as runs of consecutive positions on one line.
+
+On disk, the index is a small JSON header (the text ids, line refs and
+the location of the postings of each term) followed by every posting list
+as one array of little-endian uint32 triples.
+
+Classes:
+    SearchHit
+    LemmaIndex
+
+Functions:
+    check_term
+    lemma_terms
+    lemma_entries
+    read_index
+    write_index
+"""
+
+import os
+import struct
+import sys
+from array import array
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from ..fileio import atomic_write, read_keyed_json, write_keyed_json
+from .text import CDLNode, iter_lemmas
+
+# Fields that can be searched. All but `sig` and `value` come from `Lemma.f`
+_F_TERM_FIELDS = ("cf", "gw", "pos", "form")
+TERM_FIELDS = ("cf", "gw", "pos", "sig", "form", "value")
+
+_MAGIC = b"SPYLIDX1"
+_HEADER_LENGTH = struct.Struct("<I")
+
+# Bump when the format of the index changes
+_INDEX_VERSION = 1
+
+# The text id, line ref and terms of each lemma of a text, in document order
+LemmaEntries = List[Tuple[str, List[str]]]
+
+
+class SearchHit(NamedTuple):
+    """A token matching a query."""
+
+    text_id: str
+    line_ref: str
+    position: int
+
+
+class LemmaIndex:
+    """
+    Posting lists of every term of a corpus.
+
+    Built with `LemmaIndex.build()` from the lemmas of each text
+    (see `CorpusBase.build_lemma_index`), then saved with `write_index()`.
+    """
+
+    def __init__(
+        self,
+        text_ids: List[str],
+        line_refs: List[str],
+        terms: Dict[str, Tuple[int, int]],
+        postings: array,
+    ):
+        self._text_ids = text_ids
+        self._line_refs = line_refs
+        # Term -> (first triple, number of triples) in `postings`
+        self._terms = terms
+        self._postings = postings
+
+    def __len__(self) -> int:
+        """The number of distinct terms."""
+        return len(self._terms)
+
+    def __contains__(self, term: str) -> bool:
+        return term in self._terms
+
+    @property
+    def text_ids(self) -> List[str]:
+        """The ids of the indexed texts."""
+        return self._text_ids
+
+    @property
+    def line_refs(self) -> List[str]:
+        """The refs of the indexed lines, by line number."""
+        return self._line_refs
+
+    @property
+    def term_spans(self) -> Mapping[str, Tuple[int, int]]:
+        """The first triple and number of triples of each term in `flat_postings`."""
+        return self._terms
+
+    @property
+    def flat_postings(self) -> array:
+        """The postings of every term, as flat (text, line, position) triples."""
+        return self._postings
+
+    @classmethod
+    def build(cls, texts: Iterable[Tuple[str, LemmaEntries]]) -> "LemmaIndex":
+        """
+        Build an index.
+
+        Args:
+            texts (Iterable[Tuple[str, LemmaEntries]]): The id of each text with
+                the entries of its lemmas (see `lemma_entries`).
+
+        Returns:
+            LemmaIndex: The index.
+        """
+        text_ids: List[str] = []
+        line_refs: List[str] = []
+        line_ids: Dict[str, int] = {}
+        postings_by_term: Dict[str, array] = {}
+
+        for text_index, (text_id, entries) in enumerate(texts):
+            text_ids.append(text_id)
+            for position, (line_ref, token_terms) in enumerate(entries):
+                line_id = line_ids.get(line_ref)
+                if line_id is None:
+                    line_id = len(line_refs)
+                    line_refs.append(line_ref)
+                    line_ids[line_ref] = line_id
+                # A term can occur twice in a token (e.g. a repeated sign value)
+                for term in dict.fromkeys(token_terms):
+                    postings = postings_by_term.get(term)
+                    if postings is None:
+                        postings = postings_by_term[term] = array("I")
+                    postings.extend((text_index, line_id, position))
+
+        terms: Dict[str, Tuple[int, int]] = {}
+        all_postings = array("I")
+        for term in sorted(postings_by_term):
+            postings = postings_by_term[term]
+            terms[term] = (len(all_postings) // 3, len(postings) // 3)
+            all_postings.extend(postings)
+
+        return cls(text_ids, line_refs, terms, all_postings)
+
+    def postings(self, term: str) -> List[SearchHit]:
+        """
+        Args:
+            term (str): A term, as `field:value`.
+
+        Returns:
+            List[SearchHit]: Every token where the term occurs, in corpus order.
+
+        Raises:
+            ValueError: If the field of the term can't be searched.
+        """
+        check_term(term)
+        return [
+            SearchHit(self._text_ids[t], self._line_refs[line], position)
+            for t, line, position in self._triples(term)
+        ]
+
+    def search(
+        self,
+        all_of: Iterable[str] = (),
+        any_of: Iterable[str] = (),
+        phrase: Iterable[str] = (),
+    ) -> Dict[str, List[SearchHit]]:
+        """
+        Find the texts matching a query. The conditions that are given must all hold.
+
+        Args:
+            all_of (Iterable[str]): Terms that must all occur in the text.
+            any_of (Iterable[str]): Terms of which at least one must occur in the text.
+            phrase (Iterable[str]): Terms that must occur on consecutive tokens
+                of one line, in this order. Each term matches one token.
+
+        Returns:
+            Dict[str, List[SearchHit]]: The matching texts, in corpus order,
+                with the tokens that matched the query.
+
+        Raises:
+            ValueError: If no condition is given, or a term can't be searched.
+        """
+        all_of, any_of, phrase = list(all_of), list(any_of), list(phrase)
+        if not (all_of or any_of or phrase):
+            raise ValueError("Empty query: pass all_of, any_of or phrase")
+        for term in all_of + any_of + phrase:
+            check_term(term)
+
+        # Matching tokens of each text, as (text, line, position) triples
+        conditions: List[Dict[int, List[Tuple[int, int, int]]]] = []
+        for term in all_of:
+            conditions.append(self._group_by_text(self._triples(term)))
+        if any_of:
+            triples = [t for term in any_of for t in self._triples(term)]
+            conditions.append(self._group_by_text(sorted(triples, key=_token_order)))
+        if phrase:
+            conditions.append(self._group_by_text(self._phrase_triples(phrase)))
+
+        # Start from the condition matching the fewest texts
+        conditions.sort(key=len)
+        texts: Set[int] = set(conditions[0])
+        for condition in conditions[1:]:
+            texts &= condition.keys()
+
+        results: Dict[str, List[SearchHit]] = {}
+        for text_index in sorted(texts):
+            triples = sorted(
+                {t for c in conditions for t in c[text_index]}, key=_token_order
+            )
+            results[self._text_ids[text_index]] = [
+                SearchHit(self._text_ids[t], self._line_refs[line], position)
+                for t, line, position in triples
+            ]
+        return results
+
+    def _triples(self, term: str) -> List[Tuple[int, int, int]]:
+        start, count = self._terms.get(term, (0, 0))
+        flat = self._postings[start * 3 : (start + count) * 3]
+        return list(zip(flat[0::3], flat[1::3], flat[2::3]))
+
+    def _phrase_triples(self, phrase: List[str]) -> List[Tuple[int, int, int]]:
+        """The tokens of every occurrence of the phrase, which can't run over a line start"""
+        starts = self._triples(phrase[0])
+        lines_by_token: List[Dict[Tuple[int, int], int]] = [
+            {(t, position): line for t, line, position in self._triples(term)}
+            for term in phrase[1:]
+        ]
+
+        triples = []
+        for t, line, position in starts:
+            following = []
+            for offset, lines in enumerate(lines_by_token, 1):
+                if lines.get((t, position + offset)) != line:
+                    break
+                following.append((t, line, position + offset))
+            else:
+                triples.append((t, line, position))
+                triples.extend(following)
+        return triples
+
+    @staticmethod
+    def _group_by_text(
+        triples: Iterable[Tuple[int, int, int]],
+    ) -> Dict[int, List[Tuple[int, int, int]]]:
+        grouped: Dict[int, List[Tuple[int, int, int]]] = {}
+        for triple in triples:
+            grouped.setdefault(triple[0], []).append(triple)
+        return grouped
+
+
+def lemma_terms(lemma: Any) -> List[str]:
+    """
+    Returns:
+        List[str]: The searchable terms of a `Lemma` or `LemmaView`.
+    """
+    f = lemma.f
+    terms = [f"{field}:{f[field]}" for field in _F_TERM_FIELDS if f.get(field)]
+    if lemma.sig:
+        terms.append(f"sig:{lemma.sig}")
+
+    # Sign values (`v`) and sign names (`s`) of the graphemes, which can be nested
+    stack = [f.get("gdl", [])]
+    while stack:
+        for item in stack.pop():
+            if not isinstance(item, dict):
+                continue
+            for key in ("v", "s"):
+                if item.get(key):
+                    terms.append(f"value:{item[key]}")
+            for value in item.values():
+                if isinstance(value, list):
+                    stack.append(value)
+    return terms
+
+
+def lemma_entries(cdl: List[CDLNode]) -> LemmaEntries:
+    """
+    Returns:
+        LemmaEntries: The line ref and terms of each lemma of a CDL tree, in document order.
+    """
+    # "P010055.4.1" is the first word of line "P010055.4"
+    return [
+        (node.ref.rsplit(".", 1)[0], lemma_terms(node)) for node in iter_lemmas(cdl)
+    ]
+
+
+def read_index(index_path: str, key: Any) -> Optional[LemmaIndex]:
+    """
+    Load an index, if it was written with the same key.
+
+    Args:
+        index_path (str): The index file.
+        key (Any): Identifies the version of the corpus the index must have been built from.
+
+    Returns:
+        Optional[LemmaIndex]: The index, or None if it is missing or stale.
+    """
+    try:
+        with open(index_path, "rb") as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                return None
+            header = read_keyed_json(f, _INDEX_VERSION, key, _HEADER_LENGTH)
+            if header is None:
+                return None
+            postings = array("I")
+            postings.frombytes(f.read())
+    except (OSError, ValueError, KeyError, struct.error):
+        return None
+
+    if sys.byteorder != "little":
+        postings.byteswap()
+    terms = {term: (start, count) for term, (start, count) in header["terms"].items()}
+    return LemmaIndex(header["texts"], header["lines"], terms, postings)
+
+
+def write_index(index_path: str, key: Any, index: LemmaIndex) -> None:
+    """
+    Save an index.
+
+    Args:
+        index_path (str): The index file.
+        key (Any): JSON-serialisable. Identifies the version of the corpus
+            the index was built from (see `read_index`).
+        index (LemmaIndex): The index to save.
+    """
+    header = {
+        "texts": index.text_ids,
+        "lines": index.line_refs,
+        "terms": index.term_spans,
+    }
+
+    postings = index.flat_postings
+    if sys.byteorder != "little":
+        postings = array("I", postings)
+        postings.byteswap()
+
+    os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+    with atomic_write(index_path) as f:
+        f.write(_MAGIC)
+        write_keyed_json(f, _INDEX_VERSION, key, header, _HEADER_LENGTH)
+        f.write(postings.tobytes())
+
+
+def _token_order(triple: Tuple[int, int, int]) -> Tuple[int, int]:
+    return triple[0], triple[2]
+
+
+def check_term(term: str) -> None:
+    """
+    Raises:
+        ValueError: If `term` is not a valid search term (`field:value`).
+    """
+    field, sep, _ = term.partition(":")
+    if not sep or field not in TERM_FIELDS:
+        raise ValueError(
+            f"Invalid search term: {term}. Expected `field:value`, with field one of {TERM_FIELDS}"
+        )
@@ -1,21 +1,50 @@
 """
 list()
 download()
+download_many()
 load()
+iter_texts()
+export_transliterations()
 """
 
-import json
 import os
+import warnings
 import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import partial
 from pathlib import Path
-from typing import List
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from ..exceptions import DownloadError, ExtractionError
+from ..jsonio import loads
+from .archive import close_archive, find_members, read_bytes
 from .corpus import Corpus, CorpusType
+from .downloader import (
+    ProgressCallback,
+    extract_changed,
+    fetch_archive,
+    load_state,
+    save_state,
+)
+from .export import (
+    check_format,
+    export_shard,
+    read_failures,
+    read_manifest,
+    remove_shards,
+    shard_path,
+    split_into_shards,
+    write_manifest,
+)
+from .lemma_index import read_index, write_index
+from .text import Text
+from .snapshot import read_snapshot, snapshot_key, write_snapshot
 
 _CORPUS_DOWNLOAD_PATH = "./.corpusdata"
+_LEMMA_INDEX_FILENAME = "lemma-index.bin"
 
 
 def list() -> List[str]:
@@ -26,12 +55,33 @@ def list() -> List[str]:
     return [corpus.value for corpus in CorpusType]
 
 
-def download(corpus_name: str) -> None:
+def download(
+    corpus_name: str,
+    url: Optional[str] = None,
+    session: Optional[requests.Session] = None,
+    progress: Optional[ProgressCallback] = None,
+    extract: bool = True,
+) -> None:
     """
     Downloads and extracts a corpus from the Oracc website.
 
+    Downloads are incremental:
+        - if the corpus was already downloaded, the server is asked whether
+          the archive changed (ETag / Last-Modified), and nothing is done if not;
+        - the archive is streamed to disk, and an interrupted download
+          is resumed where it stopped on the next call;
+        - only the files whose CRC changed are re-extracted.
+
+    With `extract=False`, the archive is kept as `.corpusdata/<corpus>.zip`
+    instead, and `load()` reads the corpus straight out of it.
+
     Args:
         corpus_name (str): The corpus to download.
+        url (Optional[str]): Download the archive from this URL instead of Oracc.
+        session (Optional[requests.Session]): The HTTP session to use.
+        progress (Optional[ProgressCallback]): Called with the number of bytes
+            downloaded so far and the total size (None if unknown).
+        extract (bool): If False, keep the archive rather than extracting it.
 
     Raises:
         DownloadError: If the download fails.
@@ -50,86 +100,438 @@ def download(corpus_name: str) -> None:
     # Make the download directory if it doesn't exist
     os.makedirs(_CORPUS_DOWNLOAD_PATH, exist_ok=True)
 
+    url = url or corpus_type.url
     zip_file_name = os.path.basename(corpus_type.url)
     zip_file_path = os.path.join(_CORPUS_DOWNLOAD_PATH, zip_file_name)
     extracted_folder_path = os.path.join(_CORPUS_DOWNLOAD_PATH, corpus_type.value)
+    archive_path = _archive_path(corpus_type)
+    state_path = os.path.join(
+        _CORPUS_DOWNLOAD_PATH, f"{corpus_type.value}.download.json"
+    )
+    mode = "extract" if extract else "archive"
+    state = load_state(state_path, mode)
 
-    if os.path.exists(extracted_folder_path):
-        print(f"Corpus {corpus_name} has already been downloaded.")
-        return
+    if extract:
+        extracted = os.path.exists(extracted_folder_path) and state.get(
+            "extracted", False
+        )
+        # An archive kept after a failed extraction is only downloaded again if it changed
+        up_to_date = extracted or os.path.exists(zip_file_path)
+    else:
+        zip_file_path = archive_path
+        extracted = True
+        up_to_date = os.path.exists(archive_path)
 
     # Download the .zip
+    changed = False
     try:
-        response = requests.get(corpus_type.url, timeout=240)
-        response.raise_for_status()  # Raise HTTPError for bad responses
-
-        with open(zip_file_path, "wb") as f:
-            f.write(response.content)
+        changed = fetch_archive(
+            url,
+            zip_file_path,
+            state,
+            check_unchanged=up_to_date,
+            session=session,
+            progress=progress,
+        )
     except requests.RequestException as e:
         raise DownloadError(
             f"Failed to download .zip for {corpus_name}. Reason: {str(e)}"
         ) from e
+    finally:
+        # Saved along with the validators of the new archive, so that an
+        # interrupted extraction isn't mistaken for an up-to-date corpus
+        if changed and extract:
+            state["extracted"] = False
+        # Keep track of partial downloads so that they can be resumed
+        save_state(state_path, state, mode)
+
+    if not changed and extracted:
+        print(f"Corpus {corpus_name} is already up to date.")
+        return
+
+    if not extract:
+        # Readers may still hold the previous version open
+        close_archive(archive_path)
+        try:
+            with zipfile.ZipFile(archive_path, "r"):
+                pass
+        except zipfile.BadZipFile as e:
+            os.remove(archive_path)
+            raise ExtractionError(
+                f"Invalid .zip for {corpus_name}. Reason: {str(e)}"
+            ) from e
+        return
 
-    # Extract the .zip
+    # Extract the .zip, which is kept until then so that a failed extraction
+    # can be retried without downloading it again
     try:
-        with zipfile.ZipFile(zip_file_path, "r") as zip_ref:
-            zip_ref.extractall(extracted_folder_path)
+        extract_changed(zip_file_path, extracted_folder_path, state)
     except zipfile.BadZipFile as e:
+        os.remove(zip_file_path)
         raise ExtractionError(
             f"Failed to extract .zip for {corpus_name}. Reason: {str(e)}"
         ) from e
 
-    # Remove the .zip
+    state["extracted"] = True
+    save_state(state_path, state, mode)
     os.remove(zip_file_path)
 
 
-def load(corpus_name: str) -> Corpus:
+def download_many(
+    corpus_names: Optional[List[str]] = None,
+    max_concurrency: int = 4,
+    progress: Optional[Callable[[str, int, Optional[int]], None]] = None,
+    urls: Optional[Dict[str, str]] = None,
+    extract: bool = True,
+) -> Dict[str, Optional[Exception]]:
+    """
+    Downloads and extracts several corpora concurrently.
+
+    Each corpus is handled by its own worker thread, so some corpora are
+    being extracted while others are still downloading. All workers share
+    one pooled HTTP session. A failure only affects its own corpus.
+
+    Args:
+        corpus_names (Optional[List[str]]): The corpora to download. Defaults to all of them.
+            Duplicates are only downloaded once.
+        max_concurrency (int): Maximum number of corpora handled at once.
+        progress (Optional[Callable]): Called with the corpus name, the number of
+            bytes downloaded so far and the total size (None if unknown).
+        urls (Optional[Dict[str, str]]): Download some corpora from these URLs instead of Oracc.
+        extract (bool): If False, keep the archives rather than extracting them.
+
+    Returns:
+        Dict[str, Optional[Exception]]: The error of each corpus, or None if it succeeded.
+    """
+    corpus_names = corpus_names if corpus_names is not None else list()
+    # Two workers must not write the same files
+    corpus_names = [*dict.fromkeys(corpus_names)]
+    urls = urls or {}
+
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=max_concurrency, pool_maxsize=max_concurrency
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    def _download(corpus_name: str) -> Optional[Exception]:
+        corpus_progress = None
+        if progress is not None:
+            corpus_progress = partial(progress, corpus_name)
+        try:
+            download(
+                corpus_name,
+                url=urls.get(corpus_name),
+                session=session,
+                progress=corpus_progress,
+                extract=extract,
+            )
+        except Exception as e:
+            return e
+        return None
+
+    with session, ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        errors = executor.map(_download, corpus_names)
+        return dict(zip(corpus_names, errors))
+
+
+def load(
+    corpus_name: str,
+    lazy: bool = False,
+    cache_entries: Optional[int] = 256,
+    cache_bytes: Optional[int] = None,
+    contents: bool = False,
+    workers: Optional[int] = None,
+    snapshot: bool = True,
+    trusted: bool = False,
+    index: bool = False,
+    fields: Optional[Iterable[str]] = None,
+) -> Corpus:
     """
     Load a corpus by its name.
 
     Args:
         corpus_name (str): The name of the corpus to load.
+        lazy (bool): If True, the contents of each text are loaded from corpusjson/
+            on first call to `text.contents()`, and kept in a per-corpus LRU cache
+            (see `CorpusBase.enable_lazy_contents`).
+        cache_entries (Optional[int]): Lazy mode only. Maximum number of parsed texts to keep.
+        cache_bytes (Optional[int]): Lazy mode only. Maximum size of the parsed texts to keep,
+            measured as the size of their corpusjson files.
+        contents (bool): If True, also load the contents of every text
+            (see `CorpusBase.load_all_contents`). Texts that fail to load are skipped with a warning.
+        workers (Optional[int]): Number of processes used to load the contents.
+            None for one per CPU.
+        snapshot (bool): If True, save the loaded corpus as a binary snapshot in
+            the corpus directory and reuse it on later loads, as long as
+            catalogue.json (and corpusjson/, with `contents`) are unchanged.
+        trusted (bool): If True, build the CDL models of the contents without validating
+            them, which is faster. Only use with unmodified Oracc dumps. Their snapshot
+            is kept apart from that of validated contents, which is the only one
+            used when `trusted` is False.
+        index (bool): If True, load the lemma index used by `Corpus.search`.
+            It is built (reading every corpusjson file once) and saved
+            in the corpus directory the first time, and rebuilt when corpusjson/ changes.
+        fields (Optional[Iterable[str]]): If given, only validate these catalogue fields
+            (e.g. {"id_text", "period", "genre"}), which is much faster. The other
+            fields are validated when first read (see `CorpusBase.load_fields`).
+            Snapshots are not used.
 
     Returns:
         Corpus: The loaded corpus.
 
+    Raises:
+        ValueError: If the specified corpus is invalid or has not been downloaded yet,
+            or one of `fields` is not a field of its texts.
+    """
+    corpus = _get_corpus_type(corpus_name)
+    extracted_folder_path, path = _get_corpus_paths(corpus)
+
+    # Contents are only snapshotted when they are pinned on the texts
+    snapshot_contents = contents and not lazy
+
+    # A snapshot holds every field, validated
+    if fields is not None:
+        snapshot = False
+
+    model = None
+    if snapshot:
+        cached = read_snapshot(
+            extracted_folder_path, path, snapshot_contents, trusted
+        )
+        if cached is not None:
+            model, failures = cached
+            # The texts that failed to load are still missing their contents
+            _warn_failures(failures)
+
+    if model is None:
+        model = corpus.model()
+        if fields is not None:
+            model.load_fields(_read_catalogue_members(path), fields)
+        else:
+            model.load(_read_catalogue_members(path))
+        model.build_catalogue()
+        failures = {}
+        if snapshot_contents:
+            failures = model.load_all_contents(workers=workers, trusted=trusted)
+            _warn_failures(failures)
+        if snapshot:
+            write_snapshot(
+                extracted_folder_path,
+                path,
+                snapshot_contents,
+                model,
+                failures,
+                trusted,
+            )
+
+    if lazy:
+        model.enable_lazy_contents(
+            max_entries=cache_entries, max_bytes=cache_bytes, trusted=trusted
+        )
+        if contents:
+            _warn_failures(model.load_all_contents(workers=workers, trusted=trusted))
+
+    if index:
+        index_path = os.path.join(extracted_folder_path, _LEMMA_INDEX_FILENAME)
+        index_key = snapshot_key(path, True)
+        lemma_index = read_index(index_path, index_key)
+        if lemma_index is not None:
+            model.use_lemma_index(lemma_index)
+        else:
+            _warn_failures(model.build_lemma_index(workers=workers, trusted=trusted))
+            lemma_index = model.lemma_index
+            if lemma_index is not None:
+                write_index(index_path, index_key, lemma_index)
+    return model
+
+
+def iter_texts(
+    corpus_name: str,
+    with_contents: bool = True,
+    filter: Optional[Callable[[Text], bool]] = None,
+    trusted: bool = False,
+) -> Iterator[Text]:
+    """
+    Stream the texts of a corpus one at a time, in catalogue order.
+
+    Unlike `load()`, no list of texts is built: each text is created
+    (and its contents loaded) only when it is reached, and is not referenced
+    any more once the caller moves on. Only the catalogue is kept in memory.
+
+    Args:
+        corpus_name (str): The name of the corpus.
+        with_contents (bool): If True, `text.cdl` is loaded before the text is yielded.
+        filter (Optional[Callable[[Text], bool]]): Called with each text before its
+            contents are loaded. Texts for which it returns False are skipped.
+        trusted (bool): If True, build the CDL models without validating them.
+
+    Yields:
+        Text: The texts of the corpus.
+
     Raises:
         ValueError: If the specified corpus is invalid or has not been downloaded yet.
     """
+    corpus = _get_corpus_type(corpus_name)
+    _, path = _get_corpus_paths(corpus)
+    text_model = corpus.text_model
+
+    for text_data in _read_catalogue_members(path):
+        text = text_model(**text_data)
+        if filter is not None and not filter(text):
+            continue
+        if with_contents:
+            text.load_contents(trusted=trusted)
+        yield text
+
+
+def export_transliterations(
+    corpus_name: str,
+    out_dir: str,
+    shards: int = 16,
+    workers: Optional[int] = None,
+    format: str = "jsonl",
+    trusted: bool = False,
+) -> Dict[str, str]:
+    """
+    Export the transliteration of every text of a corpus to sharded files.
+
+    Each record holds the catalogue metadata of a text (including `id_text`),
+    the languages detected in its lemmas (`langs`) and its `transliteration`.
+    Shards are split in catalogue order and written by a pool of worker processes
+    as they complete, as `<out_dir>/part-<i>-of-<shards>.<format>`.
+
+    Exports are resumable: shards already written by a previous run with the
+    same corpus data and settings are skipped. Otherwise, the shards of the
+    previous run are removed first.
+
+    Args:
+        corpus_name (str): The name of the corpus.
+        out_dir (str): The directory to write the shards to.
+        shards (int): The number of shards.
+        workers (Optional[int]): Number of worker processes.
+            None for one per CPU; 1 to export in the current process.
+        format (str): "jsonl" or "parquet" (which requires pyarrow).
+        trusted (bool): If True, build the CDL models without validating them.
+
+    Returns:
+        Dict[str, str]: Error messages of the texts that failed to load
+            (and were left out), keyed by file id. Includes those of the shards
+            written by a previous run and skipped.
+
+    Raises:
+        ValueError: If the corpus is invalid or has not been downloaded yet, or the format is invalid.
+        ImportError: If the format needs a package that is not installed.
+    """
+    check_format(format)
+    if shards < 1:
+        raise ValueError(f"Invalid number of shards: {shards}")
+
+    corpus = _get_corpus_type(corpus_name)
+    _, path = _get_corpus_paths(corpus)
+    os.makedirs(out_dir, exist_ok=True)
+
+    # Shards of a previous run can only be reused if they were cut the same way from the same data.
+    # The key's tuples are stored as lists, so they are compared as such
+    source = {
+        name: [*value] if type(value) == tuple else value
+        for name, value in snapshot_key(path, True).items()
+    }
+    manifest = {
+        "corpus": corpus.value,
+        "shards": shards,
+        "format": format,
+        "source": source,
+    }
+    resume = read_manifest(out_dir) == manifest
+    if not resume:
+        # Stale shards would be taken for complete ones if this run is interrupted
+        remove_shards(out_dir)
+    write_manifest(out_dir, manifest)
+
+    jobs = []
+    failures: Dict[str, str] = {}
+    for index, texts_data in enumerate(
+        split_into_shards(_read_catalogue_members(path), shards)
+    ):
+        output_path = shard_path(out_dir, index, shards, format)
+        if resume and os.path.exists(output_path):
+            failures.update(read_failures(output_path))
+            continue
+        jobs.append((corpus.value, texts_data, output_path, format, trusted))
+
+    if workers == 1:
+        for job in jobs:
+            failures.update(export_shard(job))
+        return failures
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for future in as_completed([executor.submit(export_shard, j) for j in jobs]):
+            failures.update(future.result())
+    return failures
+
+
+def _get_corpus_type(corpus_name: str) -> CorpusType:
     try:
-        corpus = CorpusType(corpus_name)
+        return CorpusType(corpus_name)
     except ValueError:
         corpus_names = list()
         raise ValueError(
             f"Invalid corpus: {corpus_name}. Valid options: {corpus_names}"
         ) from None
 
+
+def _get_corpus_paths(corpus: CorpusType):
+    """
+    Returns the dir where snapshots of the corpus are kept and the dir containing catalogue.json.
+
+    Extracted corpora take precedence over archives kept with `download(extract=False)`,
+    in which case the second path points inside the archive.
+    """
     extracted_folder_path = os.path.join(_CORPUS_DOWNLOAD_PATH, corpus.value)
+    dirs = []
+    if os.path.exists(extracted_folder_path):
+        dirs = _find_corpusjson_dirs(extracted_folder_path)
+    if dirs:
+        return extracted_folder_path, dirs[0]
 
-    if not os.path.exists(extracted_folder_path):
-        raise ValueError(f"Corpus {corpus} has not been downloaded yet.")
+    archive_path = _archive_path(corpus)
+    if os.path.exists(archive_path):
+        dirs = find_members(archive_path, "catalogue.json")
+    if dirs:
+        return f"{archive_path}.snapshots", dirs[0]
 
-    dirs = _find_corpusjson_dirs(extracted_folder_path)
-    path = dirs[0]
-    catalogue_path = Path(path) / "catalogue.json"
+    raise ValueError(f"Corpus {corpus} has not been downloaded yet.")
 
-    with open(catalogue_path, "r", encoding="utf-8") as f:
-        catalogue = json.load(f)
+
+def _archive_path(corpus: CorpusType) -> str:
+    return os.path.join(_CORPUS_DOWNLOAD_PATH, f"{corpus.value}.zip")
+
+
+def _read_catalogue_members(path: str) -> List[Dict[str, Any]]:
+    """Returns the catalogue members, with the `dir_path` expected by the text models"""
+    catalogue = loads(read_bytes(str(Path(path) / "catalogue.json")))
 
     texts_path = str(Path(path) / "corpusjson/")
-    texts = [
+    return [
         {"dir_path": texts_path, **text_data}
         for text_data in catalogue["members"].values()
     ]
-    model = corpus.model()
-    model.load(texts)
-    return model
+
+
+def _warn_failures(failures: Dict[str, str]) -> None:
+    for file_id, error in failures.items():
+        warnings.warn(f"Failed to load contents of {file_id}: {error}")
 
 
 def _find_corpusjson_dirs(root_dir: str):
     """Search for the 'corpusjson' dir paths"""
-    return [
-        root
-        for root, _, filenames in os.walk(root_dir)
-        if "catalogue.json" in filenames
-    ]
+    dirs = []
+    for root, dirnames, filenames in os.walk(root_dir):
+        if "catalogue.json" in filenames:
+            dirs.append(root)
+        # Don't list the (possibly tens of thousands of) text files
+        if "corpusjson" in dirnames:
+            dirnames.remove("corpusjson")
+    return dirs
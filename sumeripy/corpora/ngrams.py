@@ -0,0 +1,379 @@
+"""
+N-gram counts and collocation statistics over the texts of a corpus.
+
+Each text is turned into a sequence of tokens of one type:
+    - `form`, `cf` or `pos`: one token per lemma, from `Lemma.f`
+      (`#MISSING#` when the lemma has no such value);
+    - `value`: one token per sign value (or sign name) of each lemma;
+    - `transliteration`: the words of `Text.transliteration()`.
+N-grams are counted within each text, and the counts of all texts are
+summed per group (e.g. per `period`).
+
+`NgramCounter` sums the counts sent back by the workers. When it holds
+more than `max_entries` distinct n-grams, it writes them to a sorted run
+file and starts over; the runs are merged on the fly when reading the
+counts, so memory use stays bounded whatever the size of the corpus.
+
+Classes:
+    Collocation
+    NgramCounter
+
+Functions:
+    check_token_type
+    text_tokens
+    text_ngrams
+    count_ngrams
+    write_table
+"""
+
+import heapq
+import json
+import math
+import os
+import shutil
+import tempfile
+import weakref
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from .text import CDLNode, LemmaView, iter_lemmas
+from .text.text_base import SpecialToken, render_transliteration
+
+TOKEN_TYPES = ("form", "cf", "pos", "value", "transliteration")
+
+MEASURES = ("pmi", "log_likelihood")
+
+# (group, n-gram) -> count
+NgramCounts = Dict[Tuple[str, Tuple[str, ...]], int]
+
+
+class Collocation(NamedTuple):
+    """A bigram with its number of occurrences (`frequency`) and association scores."""
+
+    group: str
+    first: str
+    second: str
+    frequency: int
+    pmi: float
+    log_likelihood: float
+
+
+def check_token_type(token_type: str) -> None:
+    """
+    Raises:
+        ValueError: If `token_type` is not one of `TOKEN_TYPES`.
+    """
+    if token_type not in TOKEN_TYPES:
+        raise ValueError(
+            f"Invalid token type: {token_type}. Valid options: {TOKEN_TYPES}"
+        )
+
+
+def text_tokens(cdl: List[CDLNode], token_type: str) -> List[str]:
+    """
+    Args:
+        cdl (List[CDLNode]): The contents of a text.
+        token_type (str): One of `TOKEN_TYPES`.
+
+    Returns:
+        List[str]: The tokens of the text, in document order.
+
+    Raises:
+        ValueError: If the token type is invalid.
+    """
+    check_token_type(token_type)
+    if token_type == "transliteration":
+        return render_transliteration(cdl)[0].split()
+
+    tokens: List[str] = []
+    missing = SpecialToken.MISSING.value
+    for node in iter_lemmas(cdl):
+        if token_type == "form" and type(node) == LemmaView:
+            # Doesn't decode `f`
+            tokens.append(node.form or missing)
+        elif token_type == "value":
+            tokens.extend(_sign_values(node.f.get("gdl", [])))
+        else:
+            tokens.append(node.f.get(token_type) or missing)
+    return tokens
+
+
+def _sign_values(gdl: List[Any]) -> Iterator[str]:
+    """The sign values (or sign names) of a lemma, in order, including nested graphemes"""
+    stack = [iter(gdl)]
+    while stack:
+        item = next(stack[-1], None)
+        if item is None:
+            stack.pop()
+            continue
+        if not isinstance(item, dict):
+            continue
+        value = item.get("v") or item.get("s")
+        if value:
+            yield value
+        # Siblings of `item` wait until its children are done
+        children = [child for child in item.values() if isinstance(child, list)]
+        stack.extend(iter(child) for child in reversed(children))
+
+
+def count_ngrams(
+    tokens: List[str],
+    orders: Iterable[int],
+    group: str = "",
+    counts: Optional[NgramCounts] = None,
+) -> NgramCounts:
+    """
+    Count the n-grams of a token sequence.
+
+    Args:
+        tokens (List[str]): The tokens of a text.
+        orders (Iterable[int]): The lengths of n-grams to count, e.g. (1, 2, 3).
+        group (str): The group the counts belong to.
+        counts (Optional[NgramCounts]): Counts to add to, instead of a new dict.
+
+    Returns:
+        NgramCounts: The counts, keyed by (group, n-gram).
+    """
+    if counts is None:
+        counts = {}
+    for n in orders:
+        for i in range(len(tokens) - n + 1):
+            key = (group, tuple(tokens[i : i + n]))
+            counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def text_ngrams(
+    text_id: str,
+    cdl: List[CDLNode],
+    token_type: str,
+    orders: Iterable[int],
+    groups: Dict[str, str],
+) -> NgramCounts:
+    """
+    Count the n-grams of a text (e.g. as a task of `pool.map_texts`).
+
+    Args:
+        text_id (str): The id of the text.
+        cdl (List[CDLNode]): The contents of the text.
+        token_type (str): One of `TOKEN_TYPES`.
+        orders (Iterable[int]): The lengths of n-grams to count.
+        groups (Dict[str, str]): The group of each text, keyed by id.
+
+    Returns:
+        NgramCounts: The counts, keyed by (group, n-gram).
+    """
+    return count_ngrams(text_tokens(cdl, token_type), orders, groups[text_id])
+
+
+class NgramCounter:
+    """
+    Sums n-gram counts, spilling them to disk past `max_entries` distinct n-grams.
+
+    Can be used as a context manager; the run files are deleted on `close()`
+    (or when the counter is garbage-collected).
+
+    Args:
+        max_entries (int): The number of distinct n-grams kept in memory.
+        spill_dir (Optional[str]): Where to write the run files. Defaults to the temp directory.
+    """
+
+    def __init__(self, max_entries: int = 2_000_000, spill_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self._spill_dir = spill_dir
+        self._dir: Optional[str] = None
+        self._finalizer: Optional[weakref.finalize] = None
+        self._counts: NgramCounts = {}
+        self._runs: List[str] = []
+
+    def __enter__(self) -> "NgramCounter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def num_runs(self) -> int:
+        """The number of run files written so far."""
+        return len(self._runs)
+
+    def add(self, counts: NgramCounts) -> None:
+        """Add counts (e.g. of one batch of texts)."""
+        own = self._counts
+        for key, count in counts.items():
+            own[key] = own.get(key, 0) + count
+        if len(own) > self.max_entries:
+            self._spill()
+
+    def items(self) -> Iterator[Tuple[Tuple[str, Tuple[str, ...]], int]]:
+        """
+        Yield the summed counts, sorted by group then n-gram.
+
+        Yields:
+            Tuple[Tuple[str, Tuple[str, ...]], int]: (group, n-gram) and its count.
+        """
+        streams = [self._read_run(path) for path in self._runs]
+        streams.append(iter(sorted(self._counts.items())))
+        current_key, current_count = None, 0
+        for key, count in heapq.merge(*streams, key=lambda item: item[0]):
+            if key == current_key:
+                current_count += count
+                continue
+            if current_key is not None:
+                yield current_key, current_count
+            current_key, current_count = key, count
+        if current_key is not None:
+            yield current_key, current_count
+
+    def groups(self) -> List[str]:
+        """The groups with counts."""
+        return sorted({group for (group, _), _ in self.items()})
+
+    def most_common(
+        self, k: int = 20, n: Optional[int] = None, group: Optional[str] = None
+    ) -> List[Tuple[str, Tuple[str, ...], int]]:
+        """
+        Returns:
+            List[Tuple[str, Tuple[str, ...], int]]: The `k` most frequent
+                (group, n-gram, count), optionally of one length and of one group.
+        """
+        selected = (
+            (key[0], key[1], count)
+            for key, count in self.items()
+            if (n is None or len(key[1]) == n) and (group is None or key[0] == group)
+        )
+        return heapq.nlargest(k, selected, key=lambda row: row[2])
+
+    def collocations(
+        self,
+        k: int = 50,
+        measure: str = "log_likelihood",
+        min_count: int = 5,
+        group: Optional[str] = None,
+    ) -> Dict[str, List[Collocation]]:
+        """
+        Score the bigrams of each group by how strongly their tokens are associated.
+
+        The marginal counts are those of the bigrams of the group, so
+        bigrams must have been counted (`2` in `orders`).
+
+        Args:
+            k (int): The number of bigrams to keep per group.
+            measure (str): The score to rank by: `pmi` (pointwise mutual information)
+                or `log_likelihood` (Dunning's G²).
+            min_count (int): Leave out rarer bigrams, whose PMI is unreliable.
+            group (Optional[str]): Only score this group.
+
+        Returns:
+            Dict[str, List[Collocation]]: The top `k` bigrams of each group, best first.
+
+        Raises:
+            ValueError: If the measure is invalid.
+        """
+        if measure not in MEASURES:
+            raise ValueError(f"Invalid measure: {measure}. Valid options: {MEASURES}")
+
+        # First pass: marginals of each group
+        firsts: Dict[str, Counter] = {}
+        seconds: Dict[str, Counter] = {}
+        totals: Counter = Counter()
+        for (key_group, ngram), count in self._bigrams(group):
+            firsts.setdefault(key_group, Counter())[ngram[0]] += count
+            seconds.setdefault(key_group, Counter())[ngram[1]] += count
+            totals[key_group] += count
+
+        # Second pass: scores, keeping the top k of each group
+        top: Dict[str, List[Tuple[float, Collocation]]] = {}
+        for (key_group, ngram), count in self._bigrams(group):
+            if count < min_count:
+                continue
+            collocation = _score(
+                key_group,
+                ngram,
+                count,
+                firsts[key_group][ngram[0]],
+                seconds[key_group][ngram[1]],
+                totals[key_group],
+            )
+            heap = top.setdefault(key_group, [])
+            entry = (getattr(collocation, measure), collocation)
+            if len(heap) < k:
+                heapq.heappush(heap, entry)
+            elif entry[0] > heap[0][0]:
+                heapq.heapreplace(heap, entry)
+
+        return {
+            key_group: [c for _, c in sorted(heap, key=lambda e: e[0], reverse=True)]
+            for key_group, heap in sorted(top.items())
+        }
+
+    def close(self) -> None:
+        """Delete the run files."""
+        self._runs = []
+        if self._finalizer is not None:
+            self._finalizer()
+
+    def _bigrams(self, group: Optional[str]):
+        for key, count in self.items():
+            if len(key[1]) == 2 and (group is None or key[0] == group):
+                yield key, count
+
+    def _spill(self) -> None:
+        if self._dir is None:
+            self._dir = tempfile.mkdtemp(prefix="sumeripy-ngrams-", dir=self._spill_dir)
+            self._finalizer = weakref.finalize(self, shutil.rmtree, self._dir, True)
+        path = os.path.join(self._dir, f"run-{len(self._runs):05d}.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for (group, ngram), count in sorted(self._counts.items()):
+                f.write(json.dumps([group, ngram, count], ensure_ascii=False))
+                f.write("\n")
+        self._runs.append(path)
+        self._counts = {}
+
+    @staticmethod
+    def _read_run(path: str) -> Iterator[Tuple[Tuple[str, Tuple[str, ...]], int]]:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                group, ngram, count = json.loads(line)
+                yield (group, tuple(ngram)), count
+
+
+def _score(
+    group: str, ngram: Tuple[str, ...], count: int, first: int, second: int, total: int
+) -> Collocation:
+    """PMI and log-likelihood of a bigram, from its 2x2 contingency table"""
+    pmi = math.log2(count * total / (first * second))
+
+    observed = (
+        count,
+        first - count,
+        second - count,
+        total - first - second + count,
+    )
+    expected = (
+        first * second / total,
+        first * (total - second) / total,
+        (total - first) * second / total,
+        (total - first) * (total - second) / total,
+    )
+    log_likelihood = 2 * sum(
+        o * math.log(o / e) for o, e in zip(observed, expected) if o > 0
+    )
+    return Collocation(group, ngram[0], ngram[1], count, pmi, log_likelihood)
+
+
+def write_table(path: str, collocations: Dict[str, List[Collocation]]) -> None:
+    """
+    Save collocation tables as tab-separated values, with a header row.
+
+    Args:
+        path (str): The file to write.
+        collocations (Dict[str, List[Collocation]]): As returned by `NgramCounter.collocations`.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\t".join(Collocation._fields))
+        f.write("\n")
+        for rows in collocations.values():
+            for row in rows:
+                f.write("\t".join(str(value) for value in row))
+                f.write("\n")
@@ -0,0 +1,193 @@
+"""
+Runs a task on the tree of every text of a corpus, across a process pool.
+
+Texts whose contents are pinned on the model (`text.cdl`) are handled in
+the calling process. The others are sent to worker processes in batches of
+`chunksize` texts, parsed there from corpusjson/, and only the results of
+the task come back, never the trees. Batches are submitted a few at a time
+ahead of the consumer, so that results are consumed in corpus order without
+piling up in memory. The task is sent once to each worker, and kept there
+across batches (e.g. for the memo of an encoder).
+
+A text that fails to load (or whose task raises) doesn't stop its batch:
+its error message is recorded in `failures`, and it is left out of the results.
+
+The methods of `CorpusBase` built on `map_texts` pass these arguments on:
+    workers (Optional[int]): Number of worker processes.
+        None for one per CPU; 1 to parse in the current process.
+    chunksize (int): Number of texts sent to a worker at a time.
+    trusted (bool): If True, skip validation when parsing (see `construct_cdl_node`).
+    failures (Optional[Dict[str, str]]): If given, filled with the error
+        messages of the texts that failed, keyed by file id.
+
+Functions:
+    map_texts
+    tree_task
+    imap_ordered
+    error_message
+"""
+
+import os
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+from .text import CDLNode, Text, load_cdl
+
+T = TypeVar("T", bound=Text)
+R = TypeVar("R")
+
+# A task: the file id and tree of a text -> its result
+Task = Callable[[str, List[CDLNode]], Any]
+
+# A batch result: the result of each text, or None and its error message
+_Results = List[Tuple[Any, Optional[str]]]
+
+# The task and `trusted` of a worker process, kept across batches
+_worker_task: Optional[Tuple[Task, bool]] = None
+
+
+def map_texts(
+    texts: Sequence[T],
+    task: Callable[[str, List[CDLNode]], R],
+    workers: Optional[int] = None,
+    chunksize: int = 16,
+    trusted: bool = False,
+    failures: Optional[Dict[str, str]] = None,
+) -> Iterator[Tuple[T, R]]:
+    """
+    Run a task on the tree of every text, in worker processes for the texts
+    whose contents are not loaded (see the module docstring).
+
+    Args:
+        texts (Sequence[Text]): The texts, e.g. `corpus.texts`.
+        task (Callable[[str, List[CDLNode]], R]): Called with the file id and
+            the tree of each text. Must be picklable, e.g. a module-level
+            function or a `functools.partial` of one.
+        workers, chunksize, trusted, failures: See the module docstring.
+
+    Yields:
+        Tuple[Text, R]: Each text that didn't fail and its result, in the order of `texts`.
+    """
+    if failures is None:
+        failures = {}
+    batches = [texts[i : i + chunksize] for i in range(0, len(texts), chunksize)]
+    jobs = [
+        [(text.file_id, text.file_path) for text in batch if not text.cdl]
+        for batch in batches
+    ]
+
+    if workers == 1 or not any(jobs):
+        # One text at a time, so that the task sees the texts in corpus order
+        for text in texts:
+            try:
+                cdl = text.cdl or load_cdl(text.file_path, trusted)[0]
+                result = task(text.file_id, cdl)
+            except Exception as e:
+                failures[text.file_id] = error_message(e)
+            else:
+                yield text, result
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(task, trusted)
+    ) as executor:
+        window = 2 * (workers or os.cpu_count() or 1)
+        results = imap_ordered(executor, _worker, jobs, window)
+        yield from _merge(batches, results, task, failures)
+
+
+def tree_task(fn: Callable[[List[CDLNode]], R]) -> Callable[[str, List[CDLNode]], R]:
+    """Returns a task for `map_texts` calling `fn` with the tree of each text only."""
+    return partial(_call_with_tree, fn)
+
+
+def imap_ordered(
+    executor: Executor, fn: Callable[[Any], Any], jobs: List[Any], window: int
+) -> Iterator[Any]:
+    """
+    Like `executor.map`, but with at most `window` jobs submitted ahead of
+    the consumer, so that results don't pile up in memory.
+    """
+    pending: deque = deque()
+    jobs_iter = iter(jobs)
+    try:
+        for job in jobs_iter:
+            pending.append(executor.submit(fn, job))
+            if len(pending) >= window:
+                break
+        while pending:
+            result = pending.popleft().result()
+            for job in jobs_iter:
+                pending.append(executor.submit(fn, job))
+                break
+            yield result
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def error_message(error: Exception) -> str:
+    """The message recorded in `failures` for a text, e.g. "KeyError: 'cdl'"."""
+    return f"{type(error).__name__}: {error}"
+
+
+def _merge(
+    batches: List[Sequence[T]],
+    results: Iterator[_Results],
+    task: Callable[[str, List[CDLNode]], R],
+    failures: Dict[str, str],
+) -> Iterator[Tuple[T, R]]:
+    """Interleaves the results of the workers with those of the loaded texts"""
+    for batch, batch_results in zip(batches, results):
+        batch_results = iter(batch_results)
+        for text in batch:
+            if not text.cdl:
+                result, error = next(batch_results)
+                if error is not None:
+                    failures[text.file_id] = error
+                else:
+                    yield text, result
+                continue
+            try:
+                result = task(text.file_id, text.cdl)
+            except Exception as e:
+                failures[text.file_id] = error_message(e)
+            else:
+                yield text, result
+
+
+def _run_batch(task: Task, trusted: bool, texts: List[Tuple[str, str]]) -> _Results:
+    results: _Results = []
+    for file_id, text_path in texts:
+        try:
+            cdl, _ = load_cdl(text_path, trusted)
+            results.append((task(file_id, cdl), None))
+        except Exception as e:
+            results.append((None, error_message(e)))
+    return results
+
+
+def _init_worker(task: Task, trusted: bool) -> None:
+    global _worker_task
+    _worker_task = (task, trusted)
+
+
+def _worker(texts: List[Tuple[str, str]]) -> _Results:
+    assert _worker_task is not None
+    return _run_batch(*_worker_task, texts)
+
+
+def _call_with_tree(fn: Callable[[List[CDLNode]], Any], _: str, cdl: List[CDLNode]):
+    return fn(cdl)
@@ -0,0 +1,353 @@
+"""
+The texts of a corpus as sequences of sign names, integer-encoded.
+
+Each lemma is read from the graphemes of its `f["gdl"]`, and each grapheme
+is resolved to the name of its sign with a `SignResolver` (e.g. "kas" and
+"kaskal" are both KASKAL), so that homophones written with different signs
+stay apart and different readings of the same sign come together:
+    - values and sign names resolve to their sign; those the sign list
+      doesn't know are kept as they are (e.g. "x");
+    - number graphemes (e.g. "3(diš)") and compound signs (e.g. "|GIŠ.LU₂|")
+      that the sign list knows are one sign; other compounds are read
+      from their components.
+The signs of a form are resolved once and memoised, since most forms
+occur many times in a corpus.
+
+Sign names are encoded as integer codes into a vocabulary shared by all the
+texts, in order of first occurrence (see `Encoder`, which the encoders of
+other token types build on too). On disk, the sequences are a directory with
+one file per text holding the raw codes (the smallest unsigned type that
+fits the vocabulary, in the byte order recorded in the header), and a JSON
+header (`signs.json`) with the vocabulary and the files.
+
+Classes:
+    Encoder
+    SignEncoder
+    SignSequences
+
+Functions:
+    lemma_signs
+    read_sequences
+    write_sequences
+"""
+
+import json
+import os
+import sys
+from abc import ABC, abstractmethod
+from array import array
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from ..fileio import atomic_write
+from .text import CDLNode, CompactLemma, Lemma, LemmaView, iter_lemmas
+
+if TYPE_CHECKING:
+    from ..glossary.sign_resolver import SignResolver
+
+_HEADER_FILE = "signs.json"
+
+# Bump when the file layout changes
+_SEQUENCES_VERSION = 1
+
+
+def lemma_signs(gdl: List[Any], resolver: "SignResolver") -> List[str]:
+    """
+    Args:
+        gdl (List[Any]): The `gdl` of a lemma's `f`.
+        resolver (SignResolver): Resolves values to sign names.
+
+    Returns:
+        List[str]: The sign names of the lemma, in order, including nested graphemes.
+    """
+    resolve = resolver.resolve
+    signs: List[str] = []
+    stack = [iter(gdl)]
+    while stack:
+        item = next(stack[-1], None)
+        if item is None:
+            stack.pop()
+            continue
+        if not isinstance(item, dict):
+            continue
+        form = item.get("form")
+        if form and ("n" in item or "c" in item):
+            # A number or compound grapheme, e.g. "3(diš)" or "|GIŠ.LU₂|"
+            sign = resolve(form)
+            if sign is not None or "n" in item:
+                signs.append(sign or form)
+                continue
+        value = item.get("v") or item.get("s")
+        if value:
+            signs.append(resolve(value) or value)
+        # Siblings of `item` wait until its children are done
+        children = [child for child in item.values() if isinstance(child, list)]
+        stack.extend(iter(child) for child in reversed(children))
+    return signs
+
+
+class Encoder(ABC):
+    """
+    Encodes texts as integer codes into a vocabulary, which grows with the
+    tokens it hasn't seen yet (in order of first occurrence).
+
+    Subclasses define the tokens of a text (see `encode`).
+
+    Args:
+        vocabulary (Optional[List[str]]): Tokens already encoded, to carry on from.
+    """
+
+    def __init__(self, vocabulary: Optional[List[str]] = None):
+        self.vocabulary: List[str] = list(vocabulary or [])
+        self._codes = {token: code for code, token in enumerate(self.vocabulary)}
+
+    def code(self, token: str) -> int:
+        """Returns the code of a token, adding it to the vocabulary if it is new."""
+        code = self._codes.get(token)
+        if code is None:
+            code = self._codes[token] = len(self.vocabulary)
+            self.vocabulary.append(token)
+        return code
+
+    def share_vocabulary(self, other: "Encoder") -> None:
+        """
+        Encode into the vocabulary of `other` from now on, so that both encoders
+        give the same codes to the same tokens, and see each other's new tokens.
+        """
+        self.vocabulary = other.vocabulary
+        self._codes = other._codes
+
+    @abstractmethod
+    def encode(self, cdl: List[CDLNode]) -> array:
+        """
+        Args:
+            cdl (List[CDLNode]): The contents of a text.
+
+        Returns:
+            array: The codes of the tokens of the text, in document order.
+        """
+
+    def encode_with_tokens(self, cdl: List[CDLNode]) -> Tuple[List[str], array]:
+        """
+        Encode a text independently of the vocabulary, e.g. in a worker process
+        holding a copy of the encoder (see `recode`).
+
+        Args:
+            cdl (List[CDLNode]): The contents of a text.
+
+        Returns:
+            Tuple[List[str], array]: The tokens of the text, in order of first
+                occurrence, and its codes as positions in this list.
+        """
+        local_codes: Dict[int, int] = {}
+        codes = array(
+            "I", [local_codes.setdefault(c, len(local_codes)) for c in self.encode(cdl)]
+        )
+        vocabulary = self.vocabulary
+        return [vocabulary[code] for code in local_codes], codes
+
+    def recode(self, tokens: List[str], codes: array) -> array:
+        """
+        Returns:
+            array: The codes of a text encoded by `encode_with_tokens`, in this vocabulary.
+        """
+        code = self.code
+        remap = [code(token) for token in tokens]
+        return array("I", [remap[c] for c in codes])
+
+
+class SignEncoder(Encoder):
+    """
+    Encodes texts as sign-name codes, with a memo of the codes of each form.
+
+    Args:
+        resolver (SignResolver): Resolves values to sign names.
+        vocabulary (Optional[List[str]]): Sign names already encoded, to carry on from.
+    """
+
+    def __init__(
+        self, resolver: "SignResolver", vocabulary: Optional[List[str]] = None
+    ):
+        super().__init__(vocabulary)
+        self.resolver = resolver
+        # Form -> codes of its signs
+        self._forms: Dict[str, Tuple[int, ...]] = {}
+
+    def encode(self, cdl: List[CDLNode]) -> array:
+        """
+        Args:
+            cdl (List[CDLNode]): The contents of a text.
+
+        Returns:
+            array: The codes of the signs of the text, in document order.
+        """
+        codes = array("I")
+        for node in iter_lemmas(cdl):
+            codes.extend(self.lemma_codes(node))
+        return codes
+
+    def share_vocabulary(self, other: Encoder) -> None:
+        super().share_vocabulary(other)
+        # The memoised codes are those of the previous vocabulary
+        self._forms = {}
+
+    def lemma_codes(self, node: Union[Lemma, CompactLemma]) -> Tuple[int, ...]:
+        """Returns the codes of the signs of a lemma, memoised by form."""
+        forms = self._forms
+        # `LemmaView.form` doesn't decode `f`
+        form = node.form if type(node) == LemmaView else node.f.get("form", "")
+        codes = forms.get(form) if form else None
+        if codes is None:
+            signs = lemma_signs(node.f.get("gdl", []), self.resolver)
+            codes = tuple(self.code(sign) for sign in signs)
+            if form:
+                if len(forms) >= self.resolver.cache_size:
+                    forms.clear()
+                forms[form] = codes
+        return codes
+
+
+class SignSequences:
+    """
+    The sign-name codes of each text, with their vocabulary.
+
+    Args:
+        vocabulary (List[str]): The sign names, by code.
+        sequences (Dict[str, array]): The codes of each text, keyed by file id.
+    """
+
+    def __init__(self, vocabulary: List[str], sequences: Dict[str, array]):
+        self.vocabulary = vocabulary
+        self.sequences = sequences
+
+    def __len__(self) -> int:
+        """The number of texts."""
+        return len(self.sequences)
+
+    def __contains__(self, file_id: str) -> bool:
+        return file_id in self.sequences
+
+    def __getitem__(self, file_id: str) -> array:
+        return self.sequences[file_id]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.sequences)
+
+    def decode(self, file_id: str) -> List[str]:
+        """Returns the sign names of a text, in document order."""
+        vocabulary = self.vocabulary
+        return [vocabulary[code] for code in self.sequences[file_id]]
+
+    def counts(self) -> List[int]:
+        """Returns the number of occurrences of each sign, by code."""
+        counts = [0] * len(self.vocabulary)
+        for codes in self.sequences.values():
+            for code in codes:
+                counts[code] += 1
+        return counts
+
+
+def _typecode(size: int) -> str:
+    """The smallest unsigned array type that can hold `size` codes"""
+    for typecode in ("B", "H", "I"):
+        if size <= 1 << (8 * array(typecode).itemsize):
+            return typecode
+    return "L"
+
+
+def write_sequences(path: str, sequences: SignSequences) -> None:
+    """
+    Save sign sequences to a directory (see the module docstring).
+
+    Each file is written to a temporary file first, and the header last,
+    so that readers never see a partial text. The files listed in the previous
+    header that the new one no longer lists are then removed; other files of
+    the directory are left alone.
+
+    Args:
+        path (str): The directory, created if needed.
+        sequences (SignSequences): The sequences to save.
+    """
+    os.makedirs(path, exist_ok=True)
+    previous_files = _listed_files(path)
+    typecode = _typecode(len(sequences.vocabulary))
+    texts = {}
+    for file_id, codes in sequences.sequences.items():
+        file_name = f"{file_id}.bin"
+        with atomic_write(os.path.join(path, file_name)) as f:
+            array(typecode, codes).tofile(f)
+        texts[file_id] = [file_name, len(codes)]
+
+    header = json.dumps(
+        {
+            "version": _SEQUENCES_VERSION,
+            "byteorder": sys.byteorder,
+            "typecode": typecode,
+            "vocabulary": sequences.vocabulary,
+            "texts": texts,
+        },
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+    with atomic_write(os.path.join(path, _HEADER_FILE)) as f:
+        f.write(header)
+
+    file_names = {file_name for file_name, _ in texts.values()}
+    for file_name in previous_files - file_names:
+        try:
+            os.remove(os.path.join(path, file_name))
+        except FileNotFoundError:
+            pass
+
+
+def _listed_files(path: str) -> Set[str]:
+    """The files of the texts listed in the header of a directory, if any"""
+    try:
+        with open(os.path.join(path, _HEADER_FILE), "rb") as f:
+            header = json.loads(f.read())
+        return {
+            os.path.basename(file_name) for file_name, _ in header["texts"].values()
+        }
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return set()
+
+
+def read_sequences(path: str) -> SignSequences:
+    """
+    Load sign sequences saved with `write_sequences`.
+
+    Args:
+        path (str): The directory.
+
+    Returns:
+        SignSequences: The sequences.
+
+    Raises:
+        ValueError: If the directory was written by another version of this module.
+    """
+    with open(os.path.join(path, _HEADER_FILE), "rb") as f:
+        header = json.loads(f.read())
+    if header.get("version") != _SEQUENCES_VERSION:
+        raise ValueError(
+            f"Invalid sign sequences version: {header.get('version')}. "
+            f"Valid options: {[_SEQUENCES_VERSION]}"
+        )
+
+    sequences = {}
+    for file_id, (file_name, count) in header["texts"].items():
+        codes = array(header["typecode"])
+        with open(os.path.join(path, file_name), "rb") as f:
+            codes.fromfile(f, count)
+        if header["byteorder"] != sys.byteorder:
+            codes.byteswap()
+        sequences[file_id] = codes
+    return SignSequences(header["vocabulary"], sequences)
@@ -0,0 +1,169 @@
+"""
+Binary snapshots of loaded corpora, so that later runs can skip
+reading and validating catalogue.json and corpusjson/.
+
+A snapshot is only reused if it was written for the same catalogue
+(`UTC-timestamp`, size and mtime) and, for snapshots with contents,
+the same corpusjson/ files (count and latest mtime). For corpora read
+from an archive, the size and mtime of the archive are used instead.
+
+Snapshots with contents also keep the errors of the texts that failed
+to load, so that they can be reported again when the snapshot is reused.
+Contents built without validation (`trusted`) go to a separate snapshot,
+which validated loads never read.
+
+read_snapshot()
+write_snapshot()
+snapshot_key()
+"""
+
+import os
+import pickle
+import re
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from ..fileio import atomic_write
+from .archive import archive_file
+from .corpus import Corpus
+
+# Bump when the models change in a way that breaks old pickles
+_SNAPSHOT_VERSION = 5
+
+# The header of catalogue.json is small and comes before the members,
+# so we can find the timestamp without decoding the whole file
+_TIMESTAMP_PATTERN = re.compile(rb'"UTC-timestamp"\s*:\s*"([^"]*)"')
+_TIMESTAMP_SEARCH_BYTES = 4096
+
+
+def read_snapshot(
+    snapshot_dir: str, corpus_path: str, contents: bool, trusted: bool = False
+) -> Optional[Tuple[Corpus, Dict[str, str]]]:
+    """
+    Load a corpus from its snapshot, if there is an up-to-date one.
+
+    Args:
+        snapshot_dir (str): The directory holding the snapshots of the corpus.
+        corpus_path (str): The directory holding catalogue.json and corpusjson/.
+        contents (bool): Whether the snapshot should include the contents of the texts.
+        trusted (bool): Whether contents built without validation are acceptable.
+            Snapshots of validated contents are used too.
+
+    Returns:
+        Optional[Tuple[Corpus, Dict[str, str]]]: The corpus, and the error messages
+            of the texts whose contents failed to load, keyed by file id.
+            None if there is no usable snapshot.
+    """
+    for snapshot_trusted in (True, False) if trusted and contents else (False,):
+        snapshot_path = _snapshot_path(snapshot_dir, contents, snapshot_trusted)
+        if os.path.exists(snapshot_path):
+            cached = _read_snapshot_file(snapshot_path, corpus_path, contents)
+            if cached is not None:
+                return cached
+    return None
+
+
+def _read_snapshot_file(
+    snapshot_path: str, corpus_path: str, contents: bool
+) -> Optional[Tuple[Corpus, Dict[str, str]]]:
+    key = snapshot_key(corpus_path, contents)
+    try:
+        with open(snapshot_path, "rb") as f:
+            # The key is stored first, so a stale snapshot is rejected
+            # without unpickling the corpus
+            if pickle.load(f) != key:
+                return None
+            failures = pickle.load(f)
+            return pickle.load(f), failures
+    except Exception:
+        # Truncated or written by an incompatible version. Rebuild it.
+        return None
+
+
+def write_snapshot(
+    snapshot_dir: str,
+    corpus_path: str,
+    contents: bool,
+    corpus: Corpus,
+    failures: Optional[Dict[str, str]] = None,
+    trusted: bool = False,
+) -> None:
+    """
+    Write a snapshot of a loaded corpus.
+
+    Args:
+        snapshot_dir (str): The directory holding the snapshots of the corpus.
+        corpus_path (str): The directory holding catalogue.json and corpusjson/.
+        contents (bool): Whether the corpus includes the contents of the texts.
+        corpus (Corpus): The corpus to save.
+        failures (Optional[Dict[str, str]]): The error messages of the texts
+            whose contents failed to load, keyed by file id.
+        trusted (bool): Whether the contents were built without validation.
+    """
+    snapshot_path = _snapshot_path(snapshot_dir, contents, contents and trusted)
+    key = snapshot_key(corpus_path, contents)
+    os.makedirs(snapshot_dir, exist_ok=True)
+
+    with atomic_write(snapshot_path) as f:
+        pickle.dump(key, f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(failures or {}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(corpus, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _snapshot_path(snapshot_dir: str, contents: bool, trusted: bool) -> str:
+    if not contents:
+        filename = "snapshot.pickle"
+    elif trusted:
+        filename = "snapshot-contents-trusted.pickle"
+    else:
+        filename = "snapshot-contents.pickle"
+    return os.path.join(snapshot_dir, filename)
+
+
+def snapshot_key(corpus_path: str, contents: bool) -> Dict[str, Any]:
+    """
+    Identifies the version of the corpus files a snapshot (or anything else
+    built from them, e.g. a lemma index) was made from.
+
+    Args:
+        corpus_path (str): The directory of the corpus, or its path inside an archive.
+        contents (bool): If True, also take the corpusjson/ files into account.
+
+    Returns:
+        Dict[str, Any]: The key, to be compared with `==`.
+    """
+    archive_path = archive_file(corpus_path)
+    if archive_path is not None:
+        # Everything comes from the archive, which is only replaced as a whole
+        archive_stat = os.stat(archive_path)
+        return {
+            "version": _SNAPSHOT_VERSION,
+            "archive": (archive_stat.st_size, archive_stat.st_mtime_ns),
+        }
+
+    catalogue_path = Path(corpus_path) / "catalogue.json"
+    catalogue_stat = os.stat(catalogue_path)
+    key: Dict[str, Any] = {
+        "version": _SNAPSHOT_VERSION,
+        "timestamp": _catalogue_timestamp(str(catalogue_path)),
+        "catalogue": (catalogue_stat.st_size, catalogue_stat.st_mtime_ns),
+    }
+
+    if contents:
+        texts_path = Path(corpus_path) / "corpusjson"
+        num_files = 0
+        latest_mtime = 0
+        with os.scandir(texts_path) as entries:
+            for entry in entries:
+                num_files += 1
+                latest_mtime = max(latest_mtime, entry.stat().st_mtime_ns)
+        key["corpusjson"] = (num_files, latest_mtime)
+
+    return key
+
+
+def _catalogue_timestamp(catalogue_path: str) -> str:
+    with open(catalogue_path, "rb") as f:
+        head = f.read(_TIMESTAMP_SEARCH_BYTES)
+    match = _TIMESTAMP_PATTERN.search(head)
+    return match.group(1).decode("utf-8") if match else ""
@@ -23,13 +23,20 @@ from .cdl import (
     ParaType,
     Para,
     Lemma,
+    CompactLemma,
     LLNode,
     LinkbaseNode,
     CDLNode,
     ChunkType,
     Chunk,
+    parse_cdl_node,
+    construct_cdl_node,
+    iter_lemmas,
+    break_signature,
 )
 
+from .lemma_store import LemmaStore, LemmaView
+from .text_base import load_cdl, read_cdl
 from .enums import (
     Genre,
     Language,
@@ -77,9 +84,20 @@ __all__ = [
     "ParaType",
     "Para",
     "Lemma",
+    "CompactLemma",
     "LLNode",
     "LinkbaseNode",
     "CDLNode",
     "ChunkType",
     "Chunk",
+    "parse_cdl_node",
+    "construct_cdl_node",
+    "iter_lemmas",
+    "break_signature",
+    # Contents
+    "load_cdl",
+    "read_cdl",
+    # Compact lemmas
+    "LemmaStore",
+    "LemmaView",
 ]
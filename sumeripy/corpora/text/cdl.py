@@ -1,6 +1,9 @@
 """
 Functions:
     parse_cdl_node
+    construct_cdl_node
+    iter_lemmas
+    break_signature
 
 Classes:
     DiscontinuityType
@@ -9,6 +12,7 @@ Classes:
     ParaType
     Para
     Lemma
+    CompactLemma
     LLNode
     LinkbaseNode
     CDLNode
@@ -16,12 +20,24 @@ Classes:
     Chunk
 """
 
+from abc import ABC, abstractmethod
 from enum import Enum
-from typing import Any, Dict, List, Literal, Union
-
-from pydantic import BaseModel, ConfigDict, Extra, Field, Tag
+from typing import Any, Dict, Iterator, List, Literal, Optional, Union, overload
+
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Extra,
+    Field,
+    GetCoreSchemaHandler,
+    PrivateAttr,
+    Tag,
+)
+from pydantic_core import PydanticSerializationUnexpectedValue, core_schema
 from typing_extensions import Annotated
 
+from ...construct import make_constructor
+
 # ---------------  CLASSES ---------------
 
 
@@ -137,6 +153,82 @@ class Lemma(BaseModel):
     para: List[Para] = Field("")
     bad: str = Field("")
 
+    # Not part of corpusjson: the brackets the graphemes of `f["gdl"]` should show
+    # (see `break_signature`). Set at parse time; None if the lemma was built otherwise.
+    _break_signature: Optional[str] = PrivateAttr(None)
+
+    @property
+    def break_signature(self) -> Optional[str]:
+        return self._break_signature
+
+
+class CompactLemma(ABC):
+    """
+    Base of the lemmas kept outside of the models of a tree, e.g. `LemmaView`.
+
+    They are valid `CDLNode`s: models holding them validate them as they are,
+    and serialize them as the `Lemma` they stand for (see `to_lemma`).
+    """
+
+    __slots__ = ()
+
+    node = "l"
+
+    # The attributes of `Lemma` read from any lemma of a tree
+
+    @property
+    @abstractmethod
+    def ref(self) -> str:
+        """See `Lemma.ref`."""
+
+    @property
+    @abstractmethod
+    def frag(self) -> str:
+        """See `Lemma.frag`."""
+
+    @property
+    @abstractmethod
+    def f(self) -> Dict[str, Any]:
+        """See `Lemma.f`."""
+
+    @property
+    @abstractmethod
+    def break_signature(self) -> Optional[str]:
+        """See `Lemma.break_signature`."""
+
+    @abstractmethod
+    def to_lemma(self) -> Lemma:
+        """
+        Returns:
+            Lemma: A full `Lemma` model with the same values.
+        """
+
+    @classmethod
+    def __get_pydantic_core_schema__(
+        cls, source: Any, handler: GetCoreSchemaHandler
+    ) -> core_schema.CoreSchema:
+        return core_schema.is_instance_schema(
+            cls,
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                _dump_compact_lemma, info_arg=True
+            ),
+        )
+
+
+def _dump_compact_lemma(node: Any, info: core_schema.SerializationInfo) -> Dict[str, Any]:
+    # Tried on the other members of a union too
+    if not isinstance(node, CompactLemma):
+        raise PydanticSerializationUnexpectedValue(
+            f"Expected CompactLemma, got {type(node).__name__}"
+        )
+    return node.to_lemma().model_dump(
+        mode=info.mode,
+        by_alias=bool(info.by_alias),
+        exclude_unset=info.exclude_unset,
+        exclude_defaults=info.exclude_defaults,
+        exclude_none=info.exclude_none,
+    )
+
 
 # ====================
 # ====   Other    ====
@@ -209,6 +301,7 @@ CDLNode = Annotated[
         Annotated[Chunk, Tag("c")],
         Annotated[Discontinuity, Tag("d")],
         Annotated[Lemma, Tag("l")],
+        Annotated[CompactLemma, Tag("lv")],
         Annotated[LLNode, Tag("ll")],
         Annotated[LinkbaseNode, Tag("linkbase")],
     ],
@@ -221,7 +314,20 @@ Chunk.model_rebuild()
 # ---------------  FUNCTIONS ---------------
 
 
-def parse_cdl_node(node):
+def parse_cdl_node(node, trusted: bool = False):
+    """
+    Parse a node of a corpusjson CDL tree (and its children) into models.
+
+    Args:
+        node (dict): The decoded JSON node. It is modified in place.
+        trusted (bool): If True, skip validation (see `construct_cdl_node`).
+
+    Returns:
+        CDLNode: The parsed node.
+    """
+    if trusted:
+        return construct_cdl_node(node)
+
     node_type = node.get("node", "")
 
     if "cdl" in node:
@@ -232,10 +338,143 @@ def parse_cdl_node(node):
     if node_type == "d":
         return Discontinuity(**node)
     if node_type == "l":
-        return Lemma(**node)
+        lemma = Lemma(**node)
+        lemma._break_signature = break_signature(lemma.f.get("gdl", []))
+        return lemma
     if node_type == "ll":
         return LLNode(**node)
     if "linkbase" in node:
         return LinkbaseNode(**node)
 
     raise ValueError(f"Unknown node type: {node_type}")
+
+
+def construct_cdl_node(node):
+    """
+    Build the same models as `parse_cdl_node`, in a single pass and without validation
+    (see `sumeripy.construct`).
+
+    Only the conversions that the rest of the library relies on are done
+    (enums, booleans, `Para`s); everything else is stored as-is.
+    Meant for trusted Oracc dumps: malformed input is not detected.
+
+    Args:
+        node (dict): The decoded JSON node. It is modified in place.
+
+    Returns:
+        CDLNode: The constructed node.
+    """
+    node_type = node.get("node", "")
+
+    # Ordered by frequency
+    if node_type == "l":
+        if "para" in node:
+            node["para"] = [_construct_para(para) for para in node["para"]]
+        node["_break_signature"] = break_signature(node["f"].get("gdl", []))
+        return _construct_lemma(node)
+    if node_type == "d":
+        node["type"] = _DISCONTINUITY_TYPES[node["type"]]
+        return _construct_discontinuity(node)
+    if node_type == "c":
+        node["cdl"] = [construct_cdl_node(n) for n in node.get("cdl", [])]
+        node["type"] = _CHUNK_TYPES[node["type"]]
+        if "implicit" in node:
+            node["implicit"] = _to_bool(node["implicit"])
+        return _construct_chunk(node)
+    if node_type == "ll":
+        return _construct_ll_node(node)
+    if "linkbase" in node:
+        return _construct_linkbase_node(node)
+
+    raise ValueError(f"Unknown node type: {node_type}")
+
+
+@overload
+def iter_lemmas(
+    cdl: List[CDLNode], discontinuities: Literal[False] = False
+) -> Iterator[Union[Lemma, CompactLemma]]: ...
+
+
+@overload
+def iter_lemmas(
+    cdl: List[CDLNode], discontinuities: bool
+) -> Iterator[Union[Lemma, CompactLemma, Discontinuity]]: ...
+
+
+def iter_lemmas(
+    cdl: List[CDLNode], discontinuities: bool = False
+) -> Iterator[Union[Lemma, CompactLemma, Discontinuity]]:
+    """
+    Walk a CDL tree depth-first, in document order.
+
+    Args:
+        cdl (List[CDLNode]): The contents of a text (or of a chunk).
+        discontinuities (bool): If True, also yield the `Discontinuity` nodes
+            (line starts, columns...) where they occur.
+
+    Yields:
+        Union[Lemma, CompactLemma, Discontinuity]: The lemmas (`Lemma`s or
+            compact lemmas such as `LemmaView`s), and the discontinuities if asked.
+    """
+    stack = [iter(cdl)]
+    while stack:
+        node = next(stack[-1], None)
+        if node is None:
+            stack.pop()
+        elif type(node) == Chunk:
+            stack.append(iter(node.cdl))
+        elif type(node) == Lemma or isinstance(node, CompactLemma):
+            yield node
+        elif discontinuities and type(node) == Discontinuity:
+            yield node
+
+
+def break_signature(gdl: List[Dict[str, Any]]) -> str:
+    """
+    The sequence of brackets that the graphemes of a lemma should show,
+    e.g. "[]" for a form that is broken from start to end.
+
+    Only the graphemes of `f["gdl"]` and those directly in their
+    `seq` or `group` are taken into account.
+
+    Args:
+        gdl (List[Dict[str, Any]]): The `gdl` of the lemma's `f`.
+
+    Returns:
+        str: A string of "[" (`breakStart`) and "]" (`breakEnd`), empty if none.
+    """
+    brackets = []
+    for item in gdl:
+        for subitem in item.get("seq", []) + item.get("group", []):
+            if subitem.get("breakStart"):
+                brackets.append("[")
+            if subitem.get("breakEnd"):
+                brackets.append("]")
+        if item.get("breakStart"):
+            brackets.append("[")
+        if item.get("breakEnd"):
+            brackets.append("]")
+    return "".join(brackets)
+
+
+_construct_chunk = make_constructor(Chunk)
+_construct_discontinuity = make_constructor(Discontinuity)
+_construct_lemma = make_constructor(Lemma)
+_construct_ll_node = make_constructor(LLNode)
+_construct_linkbase_node = make_constructor(LinkbaseNode)
+_construct_para_model = make_constructor(Para)
+
+_CHUNK_TYPES = {chunk_type.value: chunk_type for chunk_type in ChunkType}
+_DISCONTINUITY_TYPES = {d_type.value: d_type for d_type in DiscontinuityType}
+
+
+def _construct_para(para: Dict[str, Any]) -> Para:
+    para["class"] = ParaClass(para["class"])
+    para["type"] = ParaType(para["type"])
+    return _construct_para_model(para)
+
+
+def _to_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.lower() in ("1", "true", "t", "yes", "y", "on")
+    return bool(value)
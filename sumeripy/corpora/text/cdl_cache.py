@@ -0,0 +1,131 @@
+"""
+Classes:
+    CDLCache
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .cdl import CDLNode
+
+
+class CDLCache:
+    """
+    A bounded LRU cache of parsed CDL trees, keyed by text file id.
+
+    Used by lazily-loaded corpora: a text's `cdl` is parsed on first access,
+    kept here while there is room, and transparently re-parsed if it has
+    been evicted in the meantime.
+
+    The budget can be expressed as a number of entries, a number of bytes, or both.
+    The size of an entry is the size of the corpusjson file it was parsed from,
+    which is a cheap (if rough) proxy for the size of the parsed tree.
+
+    Attributes:
+        max_entries (Optional[int]): Maximum number of trees to keep. None for no limit.
+        max_bytes (Optional[int]): Maximum total size of the trees to keep. None for no limit.
+        hits (int): Number of lookups served from the cache.
+        misses (int): Number of lookups that had to parse the file.
+        evictions (int): Number of trees dropped to stay within budget.
+    """
+
+    def __init__(
+        self, max_entries: Optional[int] = 256, max_bytes: Optional[int] = None
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size_bytes = 0
+        self._entries: "OrderedDict[str, Tuple[List[CDLNode], int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def get(
+        self, key: str, loader: Callable[[], Tuple[List[CDLNode], int]]
+    ) -> List[CDLNode]:
+        """
+        Return the tree for `key`, calling `loader` on a miss.
+
+        Args:
+            key (str): The file id of the text.
+            loader (Callable): Returns the parsed tree and its size in bytes.
+
+        Returns:
+            List[CDLNode]: The parsed tree.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # Parse outside of the lock so that other texts can still be served
+        cdl, size = loader()
+        self.put(key, cdl, size)
+        return cdl
+
+    def put(self, key: str, cdl: List[CDLNode], size: int = 0) -> None:
+        """
+        Store a tree, evicting the least recently used ones if over budget.
+
+        Args:
+            key (str): The file id of the text.
+            cdl (List[CDLNode]): The parsed tree.
+            size (int): The size of the tree in bytes.
+        """
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size_bytes -= previous[1]
+            self._entries[key] = (cdl, size)
+            self.size_bytes += size
+            self._evict()
+
+    def clear(self) -> None:
+        """Drop every cached tree. Counters are kept."""
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns:
+            Dict[str, int]: The hit, miss and eviction counters, plus the current size.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self.size_bytes,
+        }
+
+    def fits(self, entries: int, size_bytes: int) -> bool:
+        """
+        Returns:
+            bool: Whether `entries` trees of `size_bytes` bytes in total are within budget.
+        """
+        if self.max_entries is not None and entries > self.max_entries:
+            return False
+        if self.max_bytes is not None and size_bytes > self.max_bytes:
+            return False
+        return True
+
+    def _evict(self) -> None:
+        # Always keep the most recent entry, even if it alone is over budget
+        while len(self._entries) > 1 and not self.fits(
+            len(self._entries), self.size_bytes
+        ):
+            _, (_, size) = self._entries.popitem(last=False)
+            self.size_bytes -= size
+            self.evictions += 1
@@ -0,0 +1,291 @@
+"""
+A compact, struct-of-arrays representation of lemmas.
+
+A `Lemma` model keeps a dozen strings plus the `f` and `props` dicts,
+which adds up to a few kilobytes per token. A `LemmaStore` instead keeps:
+    - one array of string ids per string field, with the strings interned
+      in a table shared by every lemma of the store (`lang` and `form`,
+      from `f`, get their own columns as well);
+    - `f`, `props` and `para` JSON-encoded in one shared buffer,
+      with an array of offsets into it.
+
+Lemmas in a CDL tree can then be replaced by `LemmaView`s, which are
+two-slot objects reading their attributes from the store. Views are
+valid `CDLNode`s (see `CompactLemma`): the models of the tree still
+validate, and dump them as full lemmas.
+
+The `f`, `props` and `para` of recently read lemmas are kept decoded
+by the store, so that reading several of them costs one decode.
+
+Classes:
+    LemmaStore
+    LemmaView
+"""
+
+import json
+from array import array
+from typing import Any, Dict, List
+
+from .cdl import CDLNode, Chunk, CompactLemma, Lemma, Para, break_signature
+
+# Lemma fields stored as interned strings, by field name
+_STRING_FIELDS = (
+    "id_",
+    "ref",
+    "inst",
+    "frag",
+    "sig",
+    "exoprj",
+    "exolng",
+    "exosig",
+    "ftype",
+    "cof_tails",
+    "cof_head",
+    "tail_sig",
+    "bad",
+)
+
+# Interned values pulled out of `f`
+_F_FIELDS = ("lang", "form")
+
+# Interned values derived from the lemma (see `break_signature`)
+_DERIVED_FIELDS = ("break_signature",)
+
+
+class LemmaStore:
+    """
+    Struct-of-arrays storage for the lemmas of one or more texts.
+
+    One store can be shared by a whole corpus, so that strings
+    repeated across texts (languages, forms, signatures...) are only kept once.
+
+    Args:
+        cache_size (int): Number of lemmas whose `f`, `props` and `para`
+            are kept decoded. The memo is cleared when full.
+    """
+
+    def __init__(self, cache_size: int = 4096):
+        self._strings: List[str] = [""]
+        self._string_ids: Dict[str, int] = {"": 0}
+        self._columns: Dict[str, array] = {
+            field: array("I") for field in _STRING_FIELDS + _F_FIELDS + _DERIVED_FIELDS
+        }
+        self._buffer = bytearray()
+        self._offsets = array("Q", [0])
+        self.cache_size = cache_size
+        # Index -> decoded [f, props, para]
+        self._decoded: Dict[int, List[Any]] = {}
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The memo is not worth pickling
+        state = self.__dict__.copy()
+        state["_decoded"] = {}
+        return state
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    @property
+    def num_strings(self) -> int:
+        """The number of distinct strings in the store."""
+        return len(self._strings)
+
+    @property
+    def nbytes(self) -> int:
+        """The size of the arrays and the shared buffer (excluding the string table)."""
+        columns = sum(len(c) * c.itemsize for c in self._columns.values())
+        offsets = len(self._offsets) * self._offsets.itemsize
+        return columns + offsets + len(self._buffer)
+
+    def add(self, lemma: Lemma) -> "LemmaView":
+        """
+        Copy a lemma into the store.
+
+        Args:
+            lemma (Lemma): The lemma to add.
+
+        Returns:
+            LemmaView: A view over the stored lemma.
+        """
+        index = len(self)
+        for field in _STRING_FIELDS:
+            self._columns[field].append(self._intern(getattr(lemma, field)))
+        for field in _F_FIELDS:
+            self._columns[field].append(self._intern(lemma.f.get(field, "")))
+        signature = lemma.break_signature
+        if signature is None:
+            signature = break_signature(lemma.f.get("gdl", []))
+        self._columns["break_signature"].append(self._intern(signature))
+
+        para = lemma.para
+        if isinstance(para, list):
+            para = [p.model_dump(mode="json", by_alias=True) for p in para]
+        blob = json.dumps(
+            [lemma.f, lemma.props, para], ensure_ascii=False, separators=(",", ":")
+        )
+        self._buffer += blob.encode("utf-8")
+        self._offsets.append(len(self._buffer))
+        return LemmaView(self, index)
+
+    def compact(self, cdl: List[CDLNode]) -> List[CDLNode]:
+        """
+        Replace every lemma of a CDL tree by a view over this store.
+
+        Chunks are modified in place.
+
+        Args:
+            cdl (List[CDLNode]): The tree.
+
+        Returns:
+            List[CDLNode]: The top level of the tree, with lemmas replaced.
+        """
+        stack = [cdl]
+        while stack:
+            nodes = stack.pop()
+            for i, node in enumerate(nodes):
+                if type(node) == Lemma:
+                    nodes[i] = self.add(node)
+                elif type(node) == Chunk:
+                    stack.append(node.cdl)
+        return cdl
+
+    def string(self, field: str, index: int) -> str:
+        """Returns the value of a string field (or `lang`/`form`/`break_signature`) of a stored lemma."""
+        return self._strings[self._columns[field][index]]
+
+    def blob(self, index: int) -> List[Any]:
+        """
+        Returns the decoded `[f, props, para]` of a stored lemma, with `para`
+        as `Para` models if it is a list.
+
+        The result is memoised and shared by every reader: it must not be modified.
+        """
+        blob = self._decoded.get(index)
+        if blob is None:
+            blob = self.decode(index)
+            if isinstance(blob[2], list):
+                blob[2] = [Para(**para) for para in blob[2]]
+            if len(self._decoded) >= self.cache_size:
+                self._decoded.clear()
+            self._decoded[index] = blob
+        return blob
+
+    def decode(self, index: int) -> List[Any]:
+        """Returns a new copy of the `[f, props, para]` of a stored lemma, as JSON data."""
+        start, end = self._offsets[index], self._offsets[index + 1]
+        return json.loads(self._buffer[start:end])
+
+    def _intern(self, value: str) -> int:
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = len(self._strings)
+            self._strings.append(value)
+            self._string_ids[value] = string_id
+        return string_id
+
+
+def _string_field(field: str):
+    return property(lambda self: self._store.string(field, self._index))
+
+
+class LemmaView(CompactLemma):
+    """
+    A read-only view over a lemma held in a `LemmaStore`.
+
+    Has the same attributes as `Lemma`. `f`, `props` and `para` are decoded
+    on first access, and shared with the other readers of the lemma while
+    the store keeps them: they must not be modified (see `to_lemma`).
+
+    Views are immutable: copies of a view are the view itself, and views
+    are equal if they read the same lemma of the same store, or to a
+    `Lemma` with the same values.
+    """
+
+    __slots__ = ("_store", "_index")
+
+    node = "l"
+
+    id_ = _string_field("id_")
+    inst = _string_field("inst")
+    sig = _string_field("sig")
+    exoprj = _string_field("exoprj")
+    exolng = _string_field("exolng")
+    exosig = _string_field("exosig")
+    ftype = _string_field("ftype")
+    cof_tails = _string_field("cof_tails")
+    cof_head = _string_field("cof_head")
+    tail_sig = _string_field("tail_sig")
+    bad = _string_field("bad")
+
+    # Shortcuts to `f["lang"]` and `f["form"]` that don't decode `f`
+    lang = _string_field("lang")
+    form = _string_field("form")
+
+    def __init__(self, store: LemmaStore, index: int):
+        self._store = store
+        self._index = index
+
+    def __repr__(self) -> str:
+        return f"LemmaView(ref={self.ref!r}, form={self.form!r})"
+
+    def __eq__(self, other: Any) -> bool:
+        if type(other) == LemmaView:
+            return self._store is other._store and self._index == other._index
+        if type(other) == Lemma:
+            return self.to_lemma() == other
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash((id(self._store), self._index))
+
+    def __copy__(self) -> "LemmaView":
+        return self
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "LemmaView":
+        return self
+
+    # Declared by `CompactLemma`
+
+    @property
+    def ref(self) -> str:
+        return self._store.string("ref", self._index)
+
+    @property
+    def frag(self) -> str:
+        return self._store.string("frag", self._index)
+
+    @property
+    def break_signature(self) -> str:
+        return self._store.string("break_signature", self._index)
+
+    @property
+    def f(self) -> Dict[str, Any]:
+        return self._store.blob(self._index)[0]
+
+    @property
+    def props(self) -> List[Dict[str, str]]:
+        return self._store.blob(self._index)[1]
+
+    @property
+    def para(self) -> Any:
+        return self._store.blob(self._index)[2]
+
+    def to_lemma(self) -> Lemma:
+        """
+        Returns:
+            Lemma: A full `Lemma` model with the same values, which can be modified.
+        """
+        f, props, para = self._store.decode(self._index)
+        data: Dict[str, Any] = {
+            "node": "l",
+            "f": f,
+            "props": props,
+        }
+        if isinstance(para, list):
+            data["para"] = para
+        for field in _STRING_FIELDS:
+            alias = Lemma.model_fields[field].alias or field
+            data[alias] = self._store.string(field, self._index)
+        lemma = Lemma(**data)
+        lemma._break_signature = self.break_signature
+        return lemma
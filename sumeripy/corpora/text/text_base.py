@@ -4,14 +4,28 @@ Defines the base class for all text models.
 These are attributes shared by texts in all corpora.
 """
 
-import json
+import io
 import re
 from enum import Enum
-from typing import List, Optional
-
-from pydantic import BaseModel, ConfigDict
-
-from .cdl import CDLNode, Chunk, Discontinuity, DiscontinuityType, Lemma, parse_cdl_node
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from pydantic import ConfigDict, PrivateAttr
+
+from ...jsonio import loads
+from ...projection import ProjectedModel
+from ..archive import read_bytes
+from .cdl import (
+    CDLNode,
+    Chunk,
+    Discontinuity,
+    DiscontinuityType,
+    Lemma,
+    break_signature,
+    parse_cdl_node,
+)
+from .cdl_cache import CDLCache
+from .lemma_store import LemmaStore, LemmaView
 from .enums import (
     Genre,
     Language,
@@ -23,6 +37,8 @@ from .enums import (
 )
 
 special_token_format = r"#[\S]*?#"
+_SPECIAL_TOKEN_PATTERN = re.compile(special_token_format)
+_SEPARATOR_PATTERN = re.compile(r"([ \n]+)")
 
 
 # can't use <...> because that already represents something in the translits
@@ -33,9 +49,23 @@ class SpecialToken(Enum):
     RULING = "#RULING#"
     SURFACE = "#SURFACE#"
     LINE_START = "\n"
+    # Stands for the tokens left out of a vocabulary
+    UNKNOWN = "#UNKNOWN#"
+
 
+# Written before the words of each surface (without the leading newline for the first one)
+_SURFACE_HEADER = f"\n{SpecialToken.SURFACE.value}\n"
 
-class TextBase(BaseModel):
+# The tokens of the discontinuities, looked up once: reading `.value` off an
+# enum member is slow enough to show up when rendering long texts
+_MISSING_TEXT = f"\n{SpecialToken.MISSING.value}\n"
+_BLANK_SPACE_TEXT = f"\n{SpecialToken.BLANK_SPACE.value}\n"
+_COLUMN_TEXT = f"\n{SpecialToken.COLUMN.value}\n"
+_RULING_TEXT = f"\n{SpecialToken.RULING.value}\n"
+_SURFACE_TEXT = SpecialToken.SURFACE.value
+
+
+class TextBase(ProjectedModel):
     model_config = ConfigDict(extra="forbid")  # TODO add this to other models
     dir_path: str
 
@@ -75,196 +105,371 @@ class TextBase(BaseModel):
     uri: str = ""
     xproject: XProject = XProject.UNSPECIFIED
 
+    # Set when the text belongs to a lazily-loaded corpus
+    _cdl_cache: Optional[CDLCache] = PrivateAttr(None)
+    _trusted_cdl: bool = PrivateAttr(False)
+
     @property
     def file_id(self) -> str:
         return self.id_text
 
+    @property
+    def file_path(self) -> str:
+        return f"{self.dir_path}/{self.file_id}.json"
+
+    def use_cdl_cache(self, cache: CDLCache, trusted: bool = False) -> None:
+        """
+        Switch the text to lazy mode.
+
+        The contents are no longer pinned on the model: `cdl` is left empty,
+        and `contents()` reads the tree from `cache`, which parses the
+        corpusjson file on a miss.
+
+        Args:
+            cache (CDLCache): The cache shared by the texts of the corpus.
+            trusted (bool): If True, skip validation when parsing (see `construct_cdl_node`).
+        """
+        self._cdl_cache = cache
+        self._trusted_cdl = trusted
+        self.cdl = []
+
+    def contents(self) -> List[CDLNode]:
+        """
+        Returns the CDL tree of the text: `cdl`, or in lazy mode the tree
+        held by the cache, parsed from the corpusjson file on a miss.
+
+        Returns:
+            List[CDLNode]: The tree. Empty if the contents were not loaded (outside of lazy mode).
+        """
+        cache = self._cdl_cache
+        if cache is not None:
+            return cache.get(self.file_id, self._read_cdl)
+        return self.cdl
+
     # TODO: are there members in catalogue that aren't in corpusjson/?
     # TODO: are there files in corpusjson/ that aren't in catalogue?
     # TODO: use timestamp
-    def load_contents(self) -> None:
+    def load_contents(self, trusted: bool = False) -> None:
         """
         Load the contents of the text from a JSON file.
 
         If the `id_text` attribute is not set, the `cdl` attribute will be set to an empty list.
 
+        Args:
+            trusted (bool): If True, build the CDL models without validating them
+                (see `construct_cdl_node`). Ignored in lazy mode, which uses the
+                setting passed to `use_cdl_cache`.
+
         Returns:
             None
         """
 
+        if self._cdl_cache is not None:
+            # Lazy mode: warm the cache rather than pinning the tree on the model
+            self._cdl_cache.get(self.file_id, self._read_cdl)
+            return
+
+        self.cdl, _ = load_cdl(self._checked_file_path(), trusted)
+
+    def compact_lemmas(self, store: Optional[LemmaStore] = None) -> LemmaStore:
+        """
+        Move the lemmas of the loaded contents into a compact `LemmaStore`,
+        replacing them in `cdl` by `LemmaView`s.
+
+        Args:
+            store (Optional[LemmaStore]): The store to use, e.g. one shared by the whole corpus.
+                A new one is created if not given.
+
+        Returns:
+            LemmaStore: The store holding the lemmas.
+        """
+        store = store if store is not None else LemmaStore()
+        store.compact(self.cdl)
+        return store
+
+    def _read_cdl(self) -> Tuple[List[CDLNode], int]:
+        return load_cdl(self._checked_file_path(), self._trusted_cdl)
+
+    def _checked_file_path(self) -> str:
         if not self.file_id:
             raise ValueError("no file id: ", self.model_dump())
-
-        text_path = f"{self.dir_path}/{self.file_id}.json"
-        with open(text_path, "r", encoding="utf-8") as f:
-            text_data = json.load(f)
-        self.cdl = [parse_cdl_node(node) for node in text_data["cdl"]]
+        return self.file_path
 
     def transliteration(self) -> str:
         """
         Return the transliteration of the text.
 
+        Also sets `langs` to the languages of the lemmas of the text.
+
         Returns:
             str: The transliteration of the text.
         """
+        text, langs = render_transliteration(self.contents())
+        self.langs = ", ".join(sorted(langs))
+        return text
 
-        def _without_special_tokens(text: str) -> str:
-            text = re.sub(special_token_format, "", text)
-            text = text.replace("\n", "")
-            text = text.replace(" ", "")
-            return text
 
-        tokens, langs = _crawl_cdl_for_text(self.cdl)
-        self.langs = ", ".join(sorted(list(langs)))
-        text = " ".join(tokens)
+def read_cdl(text_path: str) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Read the CDL nodes of a corpusjson file, on disk or in an archive, without parsing them.
 
-        # Only include surfaces if there are non-special tokens
-        surfaces = text.split(SpecialToken.SURFACE.value)
-        surfaces = [surface.strip() for surface in surfaces]
-        surfaces = [surface for surface in surfaces if _without_special_tokens(surface)]
+    Args:
+        text_path (str): The path of the file.
 
-        text = ""
-        if surfaces:
-            join_with = f"\n{SpecialToken.SURFACE.value}\n"
-            text = f"{SpecialToken.SURFACE.value}\n" + join_with.join(surfaces)
+    Returns:
+        Tuple[List[Dict[str, Any]], int]: The decoded JSON nodes, and the size of the file.
+    """
+    data = read_bytes(text_path)
+    return loads(data)["cdl"], len(data)
 
-        text = re.sub(r"\ *\n\ *", "\n", text)  # remove spaces around newlines
-        text = re.sub(r"\n+", "\n", text)  # remove multiple newlines
-        text = re.sub(r"\ +", " ", text)  # remove multiple spaces
-        return text.strip()
 
+def load_cdl(text_path: str, trusted: bool = False) -> Tuple[List[CDLNode], int]:
+    """
+    Parse a corpusjson file, on disk or in an archive.
 
-def _discontinuity_to_text(node: Discontinuity) -> Optional[str]:
-    if node.type_ == DiscontinuityType.OBJECT:
-        return None
-    if node.type_ == DiscontinuityType.LINE_START:
+    Args:
+        text_path (str): The path of the file.
+        trusted (bool): If True, skip validation (see `construct_cdl_node`).
+
+    Returns:
+        Tuple[List[CDLNode], int]: The tree, and the size of the file.
+    """
+    nodes, size = read_cdl(text_path)
+    return [parse_cdl_node(node, trusted) for node in nodes], size
+
+
+def discontinuity_to_text(node: Discontinuity) -> Optional[str]:
+    """
+    Returns:
+        Optional[str]: The token standing for a discontinuity in a transliteration
+            ("\\n" for a line start, or a special token), or None if it has none.
+    """
+    type_ = node.type_
+    if type_ == DiscontinuityType.LINE_START:
         return "\n"
-    if node.type_ == DiscontinuityType.COLUMN:
-        return f"\n{SpecialToken.COLUMN.value}\n"
-    if node.type_ == DiscontinuityType.SURFACE:
-        return SpecialToken.SURFACE.value
-
-    if node.state == "missing":
-        return f"\n{SpecialToken.MISSING.value}\n"
-    if node.state == "blank":
+    if type_ == DiscontinuityType.OBJECT:
+        return None
+    if type_ == DiscontinuityType.COLUMN:
+        return _COLUMN_TEXT
+    if type_ == DiscontinuityType.SURFACE:
+        return _SURFACE_TEXT
+
+    state = node.state
+    if state == "missing":
+        return _MISSING_TEXT
+    if state == "blank":
         if node.scope == "line":
-            return f"\n{SpecialToken.MISSING.value}\n"
+            return _MISSING_TEXT
         if node.scope == "space":
-            return f"\n{SpecialToken.BLANK_SPACE.value}\n"
+            return _BLANK_SPACE_TEXT
         return None
-    if node.state == "ruling":
-        return f"\n{SpecialToken.RULING.value}\n"
+    if state == "ruling":
+        return _RULING_TEXT
 
     return None
 
 
 def _extract_text_from_node(node: CDLNode) -> Optional[str]:
     if type(node) == Discontinuity:
-        return _discontinuity_to_text(node)
+        return discontinuity_to_text(node)
     if type(node) == Lemma:
         text = node.frag if node.frag else node.f.get("form", "")
+        ideal_bracket_seq = node.break_signature
+        if ideal_bracket_seq is None:
+            ideal_bracket_seq = break_signature(node.f.get("gdl", []))
+    elif type(node) == LemmaView:
+        text = node.frag if node.frag else node.form
+        ideal_bracket_seq = node.break_signature
+    else:
+        return None
 
-        # This is not the most precise, but it'll do...
-        # The "text" above often excludes opening or closing brackets
-        # in conjunction with parentheses or 'n', causing them to be unbalanced.
-        # This is a compromise between precision and not introducing more bugs.
-        ideal_bracket_seq = ""
-        for item in node.f.get("gdl", []):
-            for subitem in item.get("seq", []) + item.get("group", []):
-                ideal_bracket_seq += "[" if subitem.get("breakStart") else ""
-                ideal_bracket_seq += "]" if subitem.get("breakEnd") else ""
-            ideal_bracket_seq += "[" if item.get("breakStart") else ""
-            ideal_bracket_seq += "]" if item.get("breakEnd") else ""
-
-        # No brackets
-        if not ideal_bracket_seq:
-            return text
+    # No brackets
+    if not ideal_bracket_seq:
+        return text
+    return _repair_brackets(text, ideal_bracket_seq)
 
-        actual_bracket_seq = "".join([char for char in text if char in "[]"])
 
-        # It's got em all
-        if ideal_bracket_seq == actual_bracket_seq:
-            return text
+# Pairs of (form, break signature) repeat a lot across texts, so the repairs are cached
+@lru_cache(maxsize=65536)
+def _repair_brackets(text: str, ideal_bracket_seq: str) -> str:
+    """Add the brackets that `text` is missing, given the brackets its graphemes should show"""
+    actual_bracket_seq = "".join([char for char in text if char in "[]"])
 
-        # It's missing some
-        # -------------------
-        # 1. Simple open-and-shut
-        if ideal_bracket_seq.startswith("[") and ideal_bracket_seq.endswith("]"):
-            # This is designed to handle seqs like "abc]-def-[ghi]"
-            if not actual_bracket_seq.startswith("["):
-                text = "[" + text
-            if not actual_bracket_seq.endswith("]"):
-                text = text + "]"
-            # But there are still possible seqs like "abc]-[1(diš)-[ghi]"
-            # So if we still don't have it, just throw out all the nuance
-            # and wrap the whole thing.
-            actual_bracket_seq = "".join([char for char in text if char in "[]"])
-            if ideal_bracket_seq == actual_bracket_seq:
-                return text
-            text = text.replace("[", "").replace("]", "")
-            return "[" + text + "]"
-
-        # 2. Starts w/ closing
-        if ideal_bracket_seq.startswith("]") and not actual_bracket_seq.startswith("]"):
-            first_open_bracket_idx = text.find("[")
-            if first_open_bracket_idx == -1:
-                text = text + "]"
-            else:
-                text = (
-                    text[:first_open_bracket_idx] + "]" + text[first_open_bracket_idx:]
-                )
-
-        # 3. Ends w/ opening
-        if ideal_bracket_seq.endswith("[") and not actual_bracket_seq.endswith("["):
-            first_close_bracket_idx = text.find("]")
-            if first_close_bracket_idx == -1:
-                text = "[" + text
-            else:
-                text = (
-                    text[:first_close_bracket_idx]
-                    + "["
-                    + text[first_close_bracket_idx:]
-                )
+    # It's got em all
+    if ideal_bracket_seq == actual_bracket_seq:
+        return text
 
-        # See if we got it now...
+    # This is not the most precise, but it'll do...
+    # The "text" above often excludes opening or closing brackets
+    # in conjunction with parentheses or 'n', causing them to be unbalanced.
+    # This is a compromise between precision and not introducing more bugs.
+
+    # It's missing some
+    # -------------------
+    # 1. Simple open-and-shut
+    if ideal_bracket_seq.startswith("[") and ideal_bracket_seq.endswith("]"):
+        # This is designed to handle seqs like "abc]-def-[ghi]"
+        if not actual_bracket_seq.startswith("["):
+            text = "[" + text
+        if not actual_bracket_seq.endswith("]"):
+            text = text + "]"
+        # But there are still possible seqs like "abc]-[1(diš)-[ghi]"
+        # So if we still don't have it, just throw out all the nuance
+        # and wrap the whole thing.
         actual_bracket_seq = "".join([char for char in text if char in "[]"])
         if ideal_bracket_seq == actual_bracket_seq:
             return text
-
-        # Still no?!
         text = text.replace("[", "").replace("]", "")
-        if "[]" in ideal_bracket_seq:
-            text = "[" + text + "]"
-        if ideal_bracket_seq.startswith("["):
+        return "[" + text + "]"
+
+    # 2. Starts w/ closing
+    if ideal_bracket_seq.startswith("]") and not actual_bracket_seq.startswith("]"):
+        first_open_bracket_idx = text.find("[")
+        if first_open_bracket_idx == -1:
+            text = text + "]"
+        else:
+            text = text[:first_open_bracket_idx] + "]" + text[first_open_bracket_idx:]
+
+    # 3. Ends w/ opening
+    if ideal_bracket_seq.endswith("[") and not actual_bracket_seq.endswith("["):
+        first_close_bracket_idx = text.find("]")
+        if first_close_bracket_idx == -1:
             text = "[" + text
-        if ideal_bracket_seq.endswith("]"):
-            text += "]"
+        else:
+            text = text[:first_close_bracket_idx] + "[" + text[first_close_bracket_idx:]
+
+    # See if we got it now...
+    actual_bracket_seq = "".join([char for char in text if char in "[]"])
+    if ideal_bracket_seq == actual_bracket_seq:
         return text
 
-    return None
+    # Still no?!
+    text = text.replace("[", "").replace("]", "")
+    if "[]" in ideal_bracket_seq:
+        text = "[" + text + "]"
+    if ideal_bracket_seq.startswith("["):
+        text = "[" + text
+    if ideal_bracket_seq.endswith("]"):
+        text += "]"
+    return text
 
 
 def _extract_lang_from_node(node: CDLNode) -> set:
+    if type(node) == LemmaView:
+        return node.lang
     if type(node) == Lemma:
         return node.f.get("lang", "")
     return ""
 
 
-def _crawl_cdl_for_text(cdl: List[CDLNode]) -> List[str]:
-    current_tokens: List[str] = []
-    langs = set()
-
-    for node in cdl:
-        if type(node) == Chunk:
-            tokens, langs_ = _crawl_cdl_for_text(node.cdl)
-            current_tokens += tokens
-            langs |= langs_
+def render_transliteration(cdl: List[CDLNode]) -> Tuple[str, Set[str]]:
+    """
+    Render the transliteration of a CDL tree, and collect the languages of its lemmas.
+
+    The tree is walked once, in document order, and the tokens are written
+    to a single buffer as they come:
+        - tokens are separated by a space, and every run of spaces and newlines
+          is collapsed to a newline if it has one, or to a space otherwise;
+        - each surface is preceded by a `#SURFACE#` line, and surfaces
+          holding only special tokens are dropped (truncated from the buffer);
+        - whitespace at the start and end of each surface is left out.
+    """
+    out = io.StringIO()
+    write = out.write
+    langs: Set[str] = set()
+
+    num_surfaces = 0  # Surfaces written so far
+    surface_start = 0  # Where the current surface starts in `out`
+    started = False  # Whether a token of the current surface was written
+    has_content = False  # Whether it has tokens other than special tokens
+    pending = ""  # Separator to write before the next word
+
+    stack = [iter(cdl)]
+    while stack:
+        for node in stack[-1]:
+            if type(node) == Chunk:
+                stack.append(iter(node.cdl))
+                break
+
+            if type(node) == LemmaView or type(node) == Lemma:
+                token = _extract_text_from_node(node)
+                lang = node.lang if type(node) == LemmaView else node.f.get("lang")
+                if lang:
+                    langs.add(lang)
+            elif type(node) == Discontinuity:
+                if node.type_ == DiscontinuityType.SURFACE:
+                    # Close the current surface, dropping it if it has nothing to show
+                    if has_content:
+                        num_surfaces += 1
+                    else:
+                        out.seek(surface_start)
+                        out.truncate()
+                    surface_start = out.tell()
+                    started = has_content = False
+                    pending = ""
+                    continue
+                token = discontinuity_to_text(node)
+            else:
+                continue
+
+            if not token:
+                continue
+
+            # Fast paths for the most common tokens: line starts, and single words
+            if token == "\n":
+                if started:
+                    pending = "\n"
+                continue
+            if " " not in token and "\n" not in token:
+                if not started:
+                    write(_SURFACE_HEADER if num_surfaces else _SURFACE_HEADER[1:])
+                    started = True
+                else:
+                    write(pending or " ")
+                pending = ""
+                write(token)
+                if not has_content:
+                    has_content = "#" not in token or bool(
+                        _SPECIAL_TOKEN_PATTERN.sub("", token)
+                    )
+                continue
+
+            # Tokens are separated by a space
+            if started and not pending:
+                pending = " "
+
+            pieces = _split_token(token)
+
+            # Words and runs of separators alternate, starting with a (possibly empty) word
+            is_word = False
+            for piece in pieces:
+                is_word = not is_word
+                if not is_word:
+                    if started and pending != "\n":
+                        pending = "\n" if "\n" in piece else " "
+                    continue
+                if not piece:
+                    continue
+                if not started:
+                    write(_SURFACE_HEADER if num_surfaces else _SURFACE_HEADER[1:])
+                    started = True
+                elif pending:
+                    write(pending)
+                pending = ""
+                write(piece)
+                if not has_content:
+                    has_content = "#" not in piece or bool(
+                        _SPECIAL_TOKEN_PATTERN.sub("", piece)
+                    )
         else:
-            text = _extract_text_from_node(node)
-            lang = _extract_lang_from_node(node)
-            if text:
-                current_tokens.append(text)
-            if lang:
-                langs.add(lang)
-
-    return current_tokens, langs
+            stack.pop()
+
+    if not has_content:
+        out.truncate(surface_start)
+    return out.getvalue(), langs
+
+
+@lru_cache(maxsize=256)
+def _split_token(token: str) -> Tuple[str, ...]:
+    """Splits a token into words and runs of spaces and newlines, starting with a word"""
+    return tuple(_SEPARATOR_PATTERN.split(token))
@@ -0,0 +1,440 @@
+"""
+Frequency-ranked vocabularies, and corpora as flat integer-encoded token
+arrays for training models.
+
+Tokens are read from the lemmas of each text, as one of:
+    - `form`: the transliterated form (`f["form"]`);
+    - `lemma`: the citation form, guide word and part of speech (e.g. "lugal[king]N");
+    - `sign`: the sign names of the form (see `sign_sequences.lemma_signs`).
+With `structure`, the surfaces, columns, line starts, rulings and breaks of
+the text are tokens too, as the special tokens of `Text.transliteration()`.
+
+A `Vocabulary` starts with the tokens of `SpecialToken`, so that they have
+the same codes in every vocabulary, followed by the other tokens by
+decreasing count. Tokens rarer than `min_count` are left out, and encoded
+as `#UNKNOWN#`.
+
+`export_token_arrays` writes each corpus as one flat array of `uint32`
+codes, its texts one after the other, and an array of `uint64` offsets:
+text `i` is `tokens[offsets[i] : offsets[i + 1]]`. `TokenArrays`
+memory-maps both files, so that texts are slices of the file, not copies.
+
+Classes:
+    TokenEncoder
+    Vocabulary
+    TokenArrays
+
+Functions:
+    export_token_arrays
+    read_vocabulary
+    write_vocabulary
+"""
+
+import json
+import mmap
+import os
+import sys
+from array import array
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Literal,
+    Mapping,
+    Optional,
+    Tuple,
+)
+
+from ..fileio import atomic_write
+from .sign_sequences import Encoder, SignEncoder
+from .text import CDLNode, Discontinuity, LemmaView, iter_lemmas
+from .text.text_base import SpecialToken, discontinuity_to_text
+
+if TYPE_CHECKING:
+    from ..glossary.sign_resolver import SignResolver
+
+TOKEN_TYPES = ("form", "lemma", "sign")
+
+SPECIAL_TOKENS = tuple(token.value for token in SpecialToken)
+
+_VOCABULARY_FILE = "vocabulary.json"
+
+# Bump when the file layout changes
+_ARRAYS_VERSION = 1
+
+
+class TokenEncoder(Encoder):
+    """
+    Encodes texts as token codes, in order of first occurrence.
+
+    Args:
+        token_type (str): `form`, `lemma` or `sign`.
+        resolver (Optional[SignResolver]): Resolves values to sign names. Needed for `sign`.
+        structure (bool): If True, the surfaces, columns, line starts... are tokens too.
+
+    Raises:
+        ValueError: If the token type is invalid, or `sign` is asked for without a resolver.
+    """
+
+    def __init__(
+        self,
+        token_type: str = "form",
+        resolver: Optional["SignResolver"] = None,
+        structure: bool = True,
+    ):
+        if token_type not in TOKEN_TYPES:
+            raise ValueError(
+                f"Invalid token type: {token_type}. Valid options: {TOKEN_TYPES}"
+            )
+        if token_type == "sign" and resolver is None:
+            raise ValueError("Sign tokens need a resolver (see `SignResolver`)")
+        super().__init__()
+        self.token_type = token_type
+        self.structure = structure
+        self._signs: Optional[SignEncoder] = None
+        if resolver is not None and token_type == "sign":
+            # Codes the signs of each form into this vocabulary, with its memo of forms
+            self._signs = SignEncoder(resolver)
+            self._signs.share_vocabulary(self)
+
+    def encode(self, cdl: List[CDLNode]) -> array:
+        """
+        Args:
+            cdl (List[CDLNode]): The contents of a text.
+
+        Returns:
+            array: The codes of the tokens of the text, in document order.
+        """
+        codes = array("I")
+        code = self.code
+        missing = SpecialToken.MISSING.value
+        for node in iter_lemmas(cdl, discontinuities=self.structure):
+            if isinstance(node, Discontinuity):
+                text = discontinuity_to_text(node)
+                if text is not None:
+                    # e.g. "\n#COLUMN#\n"; a line start is only "\n"
+                    codes.append(code(text.strip() or SpecialToken.LINE_START.value))
+            elif self._signs is not None:
+                codes.extend(self._signs.lemma_codes(node))
+            elif self.token_type == "form":
+                # `LemmaView.form` doesn't decode `f`
+                form = node.form if type(node) == LemmaView else node.f.get("form")
+                codes.append(code(form or missing))
+            else:
+                f = node.f
+                cf = f.get("cf")
+                token = f"{cf}[{f.get('gw', '')}]{f.get('pos', '')}" if cf else missing
+                codes.append(code(token))
+        return codes
+
+
+class Vocabulary:
+    """
+    Tokens and their codes: the special tokens first, then by decreasing count.
+    Built with `Vocabulary.build()`.
+
+    Args:
+        tokens (List[str]): The tokens, by code.
+        counts (List[int]): The number of occurrences of each token, by code.
+    """
+
+    def __init__(self, tokens: List[str], counts: List[int]):
+        self.tokens = tokens
+        self.counts = counts
+        self._codes = {token: code for code, token in enumerate(tokens)}
+        self.unknown = self._codes[SpecialToken.UNKNOWN.value]
+
+    @classmethod
+    def build(
+        cls,
+        counts: Mapping[str, int],
+        min_count: int = 1,
+        max_size: Optional[int] = None,
+    ) -> "Vocabulary":
+        """
+        Args:
+            counts (Mapping[str, int]): The number of occurrences of each token.
+            min_count (int): Leave out rarer tokens.
+            max_size (Optional[int]): Leave out the rarest tokens past this size,
+                special tokens included.
+
+        Returns:
+            Vocabulary: The vocabulary. The occurrences of the tokens left out
+                are counted as `#UNKNOWN#`.
+
+        Raises:
+            ValueError: If `min_count` or `max_size` is invalid.
+        """
+        if min_count < 1:
+            raise ValueError(f"Invalid min_count: {min_count}. Expected at least 1")
+        if max_size is not None and max_size < len(SPECIAL_TOKENS):
+            raise ValueError(
+                f"Invalid max_size: {max_size}. Expected at least {len(SPECIAL_TOKENS)}"
+            )
+
+        specials = set(SPECIAL_TOKENS)
+        ranked = sorted(
+            (
+                t
+                for t, count in counts.items()
+                if count >= min_count and t not in specials
+            ),
+            # Ties are broken by the token, so that builds are reproducible
+            key=lambda t: (-counts[t], t),
+        )
+        if max_size is not None:
+            ranked = ranked[: max_size - len(SPECIAL_TOKENS)]
+
+        tokens = list(SPECIAL_TOKENS) + ranked
+        token_counts = [counts.get(token, 0) for token in tokens]
+        left_out = sum(counts.values()) - sum(token_counts)
+        token_counts[tokens.index(SpecialToken.UNKNOWN.value)] += left_out
+        return cls(tokens, token_counts)
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def __contains__(self, token: str) -> bool:
+        return token in self._codes
+
+    def code(self, token: str) -> int:
+        """Returns the code of a token, or that of `#UNKNOWN#` if it is not in the vocabulary."""
+        return self._codes.get(token, self.unknown)
+
+    def encode(self, tokens: Iterable[str]) -> array:
+        """Returns the codes of tokens, as a `uint32` array."""
+        codes, unknown = self._codes, self.unknown
+        return array("I", [codes.get(token, unknown) for token in tokens])
+
+    def decode(self, codes: Iterable[int]) -> List[str]:
+        """Returns the tokens of codes."""
+        tokens = self.tokens
+        return [tokens[code] for code in codes]
+
+
+def write_vocabulary(path: str, vocabulary: Vocabulary, token_type: str) -> None:
+    """
+    Save a vocabulary as JSON.
+
+    Args:
+        path (str): The file to write.
+        vocabulary (Vocabulary): The vocabulary.
+        token_type (str): The type of its tokens, recorded with it.
+    """
+    data = json.dumps(
+        {
+            "version": _ARRAYS_VERSION,
+            "token_type": token_type,
+            "tokens": vocabulary.tokens,
+            "counts": vocabulary.counts,
+        },
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+    with atomic_write(path) as f:
+        f.write(data)
+
+
+def read_vocabulary(path: str) -> Vocabulary:
+    """
+    Load a vocabulary saved with `write_vocabulary` (or `export_token_arrays`,
+    as `vocabulary.json` in its directory).
+    """
+    if os.path.isdir(path):
+        path = os.path.join(path, _VOCABULARY_FILE)
+    with open(path, "rb") as f:
+        data = json.loads(f.read())
+    return Vocabulary(data["tokens"], data["counts"])
+
+
+def export_token_arrays(
+    corpora: Mapping[str, Any],
+    path: str,
+    token_type: str = "form",
+    min_count: int = 1,
+    max_size: Optional[int] = None,
+    resolver: Optional["SignResolver"] = None,
+    structure: bool = True,
+    workers: Optional[int] = None,
+    chunksize: int = 16,
+    trusted: bool = False,
+    failures: Optional[Dict[str, str]] = None,
+) -> Vocabulary:
+    """
+    Build one vocabulary over several corpora, and write each corpus as a
+    flat token array with its offsets (see the module docstring).
+
+    Each text is parsed once (see `CorpusBase.encode_texts`): its tokens are
+    encoded in order of first occurrence, then recoded once the vocabulary is known.
+
+    Files written to `path`:
+        - `vocabulary.json` (see `read_vocabulary`);
+        - for each corpus, `<name>.tokens`, `<name>.offsets` and `<name>.json`,
+          the file ids of its texts (see `TokenArrays`).
+
+    Example usage:
+        vocabulary = export_token_arrays(
+            {"ed3b": ed3b, "ur3": ur3}, "arrays/", token_type="form", min_count=2
+        )
+        with TokenArrays("arrays/", "ur3") as arrays:
+            codes = arrays[0]
+
+    Args:
+        corpora (Mapping[str, CorpusBase]): The corpora, keyed by the name of their files.
+        path (str): The directory to write to, created if needed.
+        token_type (str): `form`, `lemma` or `sign`.
+        min_count (int): Leave out tokens rarer than this across all the corpora.
+        max_size (Optional[int]): Leave out the rarest tokens past this size.
+        resolver (Optional[SignResolver]): Resolves values to sign names. Needed for `sign`.
+        structure (bool): If True, the surfaces, columns, line starts... are tokens too.
+        workers (Optional[int]): Number of worker processes.
+            None for one per CPU; 1 to parse in the current process.
+        chunksize (int): Number of texts sent to a worker at a time.
+        trusted (bool): If True, skip validation when parsing (see `construct_cdl_node`).
+        failures (Optional[Dict[str, str]]): If given, filled with the error messages
+            of the texts that failed to load (and were left out), keyed by file id.
+
+    Returns:
+        Vocabulary: The vocabulary the arrays are encoded with.
+
+    Raises:
+        ValueError: If the token type, `min_count` or `max_size` is invalid.
+    """
+    encoder = TokenEncoder(token_type, resolver, structure)
+    # Fail before parsing anything
+    Vocabulary.build({}, min_count, max_size)
+
+    encoded = {
+        name: corpus.encode_texts(encoder, workers, chunksize, trusted, failures)
+        for name, corpus in corpora.items()
+    }
+    counts = [0] * len(encoder.vocabulary)
+    for sequences in encoded.values():
+        for codes in sequences.values():
+            for code in codes:
+                counts[code] += 1
+    vocabulary = Vocabulary.build(
+        dict(zip(encoder.vocabulary, counts)), min_count, max_size
+    )
+
+    os.makedirs(path, exist_ok=True)
+    # First-occurrence code -> vocabulary code
+    remap = [vocabulary.code(token) for token in encoder.vocabulary]
+    for name, sequences in encoded.items():
+        _write_arrays(path, name, token_type, sequences, remap)
+    write_vocabulary(os.path.join(path, _VOCABULARY_FILE), vocabulary, token_type)
+    return vocabulary
+
+
+def _write_arrays(
+    path: str,
+    name: str,
+    token_type: str,
+    sequences: Dict[str, array],
+    remap: List[int],
+) -> None:
+    offsets = array("Q", [0])
+    for codes in sequences.values():
+        offsets.append(offsets[-1] + len(codes))
+
+    with atomic_write(os.path.join(path, f"{name}.tokens")) as f:
+        for codes in sequences.values():
+            array("I", [remap[code] for code in codes]).tofile(f)
+    with atomic_write(os.path.join(path, f"{name}.offsets")) as f:
+        offsets.tofile(f)
+    header = json.dumps(
+        {
+            "version": _ARRAYS_VERSION,
+            "byteorder": sys.byteorder,
+            "token_type": token_type,
+            "text_ids": list(sequences),
+        },
+        separators=(",", ":"),
+    ).encode("utf-8")
+    # Written last, so that the arrays it describes are complete
+    with atomic_write(os.path.join(path, f"{name}.json")) as f:
+        f.write(header)
+
+
+class TokenArrays:
+    """
+    The token array of a corpus, memory-mapped (see `export_token_arrays`).
+
+    Texts are read as `memoryview`s of `uint32` codes, which are slices of
+    the mapped file: nothing is copied until they are converted (e.g. with
+    `list()`, or `numpy.frombuffer` for a zero-copy array). Can be used as
+    a context manager; `close()` needs the slices to have been released.
+
+    Args:
+        path (str): The directory written by `export_token_arrays`.
+        name (str): The name of the corpus.
+
+    Raises:
+        ValueError: If the arrays were written by another version of this module,
+            or on a machine of another byte order.
+    """
+
+    def __init__(self, path: str, name: str):
+        with open(os.path.join(path, f"{name}.json"), "rb") as f:
+            header = json.loads(f.read())
+        if header.get("version") != _ARRAYS_VERSION:
+            raise ValueError(
+                f"Invalid token arrays version: {header.get('version')}. "
+                f"Valid options: {[_ARRAYS_VERSION]}"
+            )
+        if header["byteorder"] != sys.byteorder:
+            # Mapped codes can't be byte-swapped without a copy
+            raise ValueError(
+                f"Invalid byte order: {header['byteorder']}. Valid options: {[sys.byteorder]}"
+            )
+        self.token_type: str = header["token_type"]
+        self.text_ids: List[str] = header["text_ids"]
+        self._positions = {file_id: i for i, file_id in enumerate(self.text_ids)}
+        self._maps: List[mmap.mmap] = []
+        self.tokens = self._map(os.path.join(path, f"{name}.tokens"), "I")
+        self.offsets = self._map(os.path.join(path, f"{name}.offsets"), "Q")
+
+    def __enter__(self) -> "TokenArrays":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        """The number of texts."""
+        return len(self.text_ids)
+
+    def __getitem__(self, i: int) -> memoryview:
+        """Returns the codes of the `i`-th text."""
+        if not -len(self) <= i < len(self):
+            raise IndexError(f"Invalid text index: {i}. Expected less than {len(self)}")
+        i %= len(self)
+        return self.tokens[self.offsets[i] : self.offsets[i + 1]]
+
+    def text(self, file_id: str) -> memoryview:
+        """Returns the codes of a text, by file id."""
+        return self[self._positions[file_id]]
+
+    def spans(self) -> List[Tuple[int, int]]:
+        """Returns the (start, end) of each text in `tokens`."""
+        offsets = self.offsets
+        return [(offsets[i], offsets[i + 1]) for i in range(len(self))]
+
+    def close(self) -> None:
+        """Unmap the files."""
+        self.tokens.release()
+        self.offsets.release()
+        for mapped in self._maps:
+            mapped.close()
+        self._maps = []
+
+    def _map(self, file_path: str, format: Literal["I", "Q"]) -> memoryview:
+        with open(file_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # Empty files can't be mapped
+                return memoryview(b"").cast(format)
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        return memoryview(mapped).cast(format)
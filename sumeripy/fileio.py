@@ -0,0 +1,112 @@
+"""
+Files written by sumeripy: the cache files of the loaders (lemma indexes,
+glossary indexes, instance stores...), and the exports and download states.
+
+Each of the cache files starts with a JSON object holding the version of
+its layout and a key identifying the data it was built from, so that stale
+files can be detected and rebuilt. The object is either the whole file, or
+a header preceded by its length and followed by binary data.
+
+All of the files are written with `atomic_write`, so that readers never see a
+partial file.
+
+Functions:
+    atomic_write
+    read_keyed_json
+    write_keyed_json
+"""
+
+import json
+import os
+import struct
+from contextlib import contextmanager
+from typing import IO, Any, Dict, Iterator, Optional
+
+from .jsonio import loads
+
+
+@contextmanager
+def atomic_write(path: str, mode: str = "wb") -> Iterator[IO[Any]]:
+    """
+    Open a temporary file in place of `path`, which replaces `path` once the
+    block exits without error. The temporary file is removed otherwise.
+
+    Args:
+        path (str): The path of the file to write.
+        mode (str): "wb" or "w" (UTF-8).
+
+    Yields:
+        IO: The temporary file.
+    """
+    # Tagged with the process id, so that concurrent writers don't clash
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, mode, encoding=None if "b" in mode else "utf-8") as f:
+            yield f
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def read_keyed_json(
+    f: IO[bytes], version: int, key: Any, length: Optional[struct.Struct] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Read a JSON object written by `write_keyed_json`, if it is current.
+
+    Args:
+        f (IO[bytes]): The file, at the start of the object (or of its length).
+        version (int): The version of the layout the object must have been written with.
+        key (Any): Identifies the data the object must have been built from.
+        length (Optional[struct.Struct]): The format of the length written before the
+            object, if any. Without it, the object is the rest of the file.
+
+    Returns:
+        Optional[Dict[str, Any]]: The object, or None if it was written with
+            another version or key.
+
+    Raises:
+        ValueError: If the object is not valid JSON.
+        struct.error: If the length is truncated.
+    """
+    size = -1
+    if length is not None:
+        (size,) = length.unpack(f.read(length.size))
+    data = loads(f.read(size))
+    # Compare through JSON, which turns tuples into lists
+    if (
+        not isinstance(data, dict)
+        or data.get("version") != version
+        or data.get("key") != json.loads(json.dumps(key))
+    ):
+        return None
+    return data
+
+
+def write_keyed_json(
+    f: IO[bytes],
+    version: int,
+    key: Any,
+    data: Dict[str, Any],
+    length: Optional[struct.Struct] = None,
+) -> None:
+    """
+    Write a JSON object along with a version and a key (see `read_keyed_json`).
+
+    Args:
+        f (IO[bytes]): The file.
+        version (int): The version of the layout of the file.
+        key (Any): JSON-serialisable. Identifies the data the file was built from.
+        data (Dict[str, Any]): The other members of the object. JSON-serialisable.
+        length (Optional[struct.Struct]): If given, the length of the object is
+            written first, in this format.
+    """
+    encoded = json.dumps(
+        {"version": version, "key": key, **data},
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+    if length is not None:
+        f.write(length.pack(len(encoded)))
+    f.write(encoded)
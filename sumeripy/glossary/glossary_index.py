@@ -0,0 +1,265 @@
+"""
+Hash indexes over the entries of a glossary.
+
+Finding an entry, a form or a sense otherwise means scanning every entry
+(and every sense of every entry). A `GlossaryIndex` maps:
+    - citation form + guide word + POS to an entry;
+    - form `n` to the entries with this form;
+    - signature (`_Signature.sig`) to a sense;
+    - `id`, `xis` and `oid` to any object of an entry (entry, sense, form, base...).
+
+Locations are stored as numbers rather than references to the models,
+so that the index can be built from the raw JSON, saved, and used with
+either a `Glossary` or a `MappedGlossary`.
+
+Classes:
+    GlossaryIndex
+
+Functions:
+    normalize_sig
+    entry_key
+    iter_objects
+    resolve_object
+    read_index
+    write_index
+"""
+
+from functools import lru_cache
+from inspect import isclass
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Type, Union
+from typing import get_args, get_origin
+
+from pydantic import BaseModel
+
+from ..fileio import atomic_write, read_keyed_json, write_keyed_json
+from .models.glossary import Entry
+
+# Objects of an entry are numbered in the order of `iter_objects`.
+# Both numbers are packed in one int: (entry << _SHIFT) | object number
+_SHIFT = 20
+
+_ID_FIELDS = ("id", "xis", "oid")
+
+# Bump when the layout of the index changes
+_INDEX_VERSION = 1
+
+
+def normalize_sig(sig: str) -> str:
+    """
+    Drop the project from a signature, so that the signatures of lemmas
+    (e.g. "@epsd2/admin/ed3b%sux:...") match those of the glossary ("@epsd2%sux:...").
+    """
+    index = sig.find("%")
+    return sig[index:] if index != -1 else sig
+
+
+def entry_key(citation_form: str, guide_word: str, part_of_speech: str) -> str:
+    """The key of an entry, e.g. "kaskal[way]N"."""
+    return f"{citation_form}[{guide_word}]{part_of_speech}"
+
+
+@lru_cache(maxsize=None)
+def _child_fields(model: Type[BaseModel]) -> List[Tuple[str, str, Type[BaseModel]]]:
+    """The (name, alias, model) of the fields of `model` holding other models"""
+    children = []
+    for name, field in model.model_fields.items():
+        annotation = field.annotation
+        if get_origin(annotation) in (list, List):
+            annotation = get_args(annotation)[0]
+        if isclass(annotation) and issubclass(annotation, BaseModel):
+            children.append((name, field.alias or name, annotation))
+    return children
+
+
+def iter_objects(entry: Union[Entry, Dict[str, Any]]) -> Iterator[Any]:
+    """
+    Yield an entry and every object nested in it, depth-first, in the order
+    of the fields of the models.
+
+    Works the same on an `Entry` and on its JSON data, so that
+    object numbers computed on one can be resolved on the other.
+    """
+    is_model = isinstance(entry, BaseModel)
+    stack: List[Tuple[Any, Type[BaseModel]]] = [(entry, Entry)]
+    while stack:
+        obj, model = stack.pop()
+        yield obj
+        children = []
+        for name, alias, child_model in _child_fields(model):
+            value = getattr(obj, name) if is_model else obj.get(alias)
+            if isinstance(value, list):
+                children.extend((item, child_model) for item in value)
+            elif value:
+                children.append((value, child_model))
+        stack.extend(reversed(children))
+
+
+def _get(obj: Any, field: str) -> Any:
+    if isinstance(obj, dict):
+        return obj.get(field, "")
+    return getattr(obj, field, "")
+
+
+class GlossaryIndex:
+    """
+    Lookup tables over the entries of a glossary. Built with `GlossaryIndex.build()`.
+
+    Entries are identified by their position in the glossary, senses by
+    (entry position, sense position) and nested objects by
+    (entry position, object number), see `iter_objects`.
+    """
+
+    def __init__(
+        self,
+        keys: Dict[str, int],
+        forms: Dict[str, List[int]],
+        sigs: Dict[str, int],
+        ids: Dict[str, int],
+    ):
+        self._keys = keys
+        self._forms = forms
+        self._sigs = sigs
+        self._ids = ids
+
+    @classmethod
+    def build(cls, entries: Sequence[Union[Entry, Dict[str, Any]]]) -> "GlossaryIndex":
+        """
+        Index the entries of a glossary.
+
+        Where several objects share a key, the first one is kept.
+
+        Args:
+            entries (Sequence[Union[Entry, Dict[str, Any]]]): The entries,
+                as models or as JSON data (with the JSON aliases).
+
+        Returns:
+            GlossaryIndex: The index.
+        """
+        keys: Dict[str, int] = {}
+        forms: Dict[str, List[int]] = {}
+        sigs: Dict[str, int] = {}
+        ids: Dict[str, int] = {}
+
+        for i, entry in enumerate(entries):
+            is_model = isinstance(entry, BaseModel)
+            if is_model:
+                key = entry_key(
+                    entry.citation_form, entry.guide_word, entry.part_of_speech
+                )
+                senses = entry.senses
+                entry_forms = entry.forms
+            else:
+                key = entry_key(
+                    entry.get("cf", ""), entry.get("gw", ""), entry.get("pos", "")
+                )
+                senses = entry.get("senses", [])
+                entry_forms = entry.get("forms", [])
+            keys.setdefault(key, i)
+
+            for form in entry_forms:
+                entries_with_form = forms.setdefault(_get(form, "n"), [])
+                if not entries_with_form or entries_with_form[-1] != i:
+                    entries_with_form.append(i)
+
+            for j, sense in enumerate(senses):
+                for signature in _get(sense, "sigs") or []:
+                    sig = _get(signature, "sig")
+                    if sig:
+                        sigs.setdefault(normalize_sig(sig), _pack(i, j))
+
+            for number, obj in enumerate(iter_objects(entry)):
+                for field in _ID_FIELDS:
+                    id_ = _get(obj, field)
+                    if id_:
+                        ids.setdefault(id_, _pack(i, number))
+
+        return cls(keys, forms, sigs, ids)
+
+    def entry(
+        self, citation_form: str, guide_word: str, part_of_speech: str
+    ) -> Optional[int]:
+        """Returns the position of the entry with this citation form, guide word and POS."""
+        return self._keys.get(entry_key(citation_form, guide_word, part_of_speech))
+
+    def entries_for_form(self, form: str) -> List[int]:
+        """Returns the positions of the entries with this form (e.g. "kas-kal")."""
+        return self._forms.get(form, [])
+
+    def sense(self, sig: str) -> Optional[Tuple[int, int]]:
+        """Returns the (entry, sense) positions of the sense with this signature."""
+        location = self._sigs.get(normalize_sig(sig))
+        return None if location is None else _unpack(location)
+
+    def object(self, id_: str) -> Optional[Tuple[int, int]]:
+        """Returns the (entry position, object number) of the object with this `id`, `xis` or `oid`."""
+        location = self._ids.get(id_)
+        return None if location is None else _unpack(location)
+
+    def to_json(self) -> Dict[str, Any]:
+        """Returns the index as JSON-serialisable data."""
+        return {
+            "keys": self._keys,
+            "forms": self._forms,
+            "sigs": self._sigs,
+            "ids": self._ids,
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "GlossaryIndex":
+        """Returns the index saved with `to_json()`."""
+        return cls(data["keys"], data["forms"], data["sigs"], data["ids"])
+
+
+def resolve_object(entry: Union[Entry, Dict[str, Any]], number: int) -> Any:
+    """Returns the object of an entry with this number (see `iter_objects`)."""
+    for i, obj in enumerate(iter_objects(entry)):
+        if i == number:
+            return obj
+    raise IndexError(f"Entry has no object number {number}")
+
+
+def _pack(entry: int, number: int) -> int:
+    """Packs the position of an entry and the number of one of its objects"""
+    if not 0 <= number < 1 << _SHIFT:
+        raise ValueError(
+            f"Invalid object number: {number}. Valid options: 0 to {(1 << _SHIFT) - 1}"
+        )
+    return (entry << _SHIFT) | number
+
+
+def _unpack(location: int) -> Tuple[int, int]:
+    return location >> _SHIFT, location & ((1 << _SHIFT) - 1)
+
+
+def read_index(index_path: str, key: Any) -> Optional[GlossaryIndex]:
+    """
+    Load an index, if it was written for the same glossary.
+
+    Args:
+        index_path (str): The index file.
+        key (Any): Identifies the version of the glossary the index must have been built from.
+
+    Returns:
+        Optional[GlossaryIndex]: The index, or None if it is missing or stale.
+    """
+    try:
+        with open(index_path, "rb") as f:
+            data = read_keyed_json(f, _INDEX_VERSION, key)
+    except (OSError, ValueError):
+        return None
+    if data is None:
+        return None
+    return GlossaryIndex.from_json(data["index"])
+
+
+def write_index(index_path: str, key: Any, index: GlossaryIndex) -> None:
+    """
+    Save an index.
+
+    Args:
+        index_path (str): The index file.
+        key (Any): JSON-serialisable. Identifies the version of the glossary (see `read_index`).
+        index (GlossaryIndex): The index to save.
+    """
+    with atomic_write(index_path) as f:
+        write_keyed_json(f, _INDEX_VERSION, key, {"index": index.to_json()})
@@ -0,0 +1,268 @@
+"""
+Queries over the Oracc search-engine indexes (index-cat.json, index-lem.json,
+index-sux.json...).
+
+Each index lists keys (e.g. "lugal[king]n" in index-lem.json) with the
+instances where they occur, which `map` may translate to locations
+("epsd2/admin/ur3:P137994.3.1"). `IndexSearch` keeps, for each index:
+    - the keys in a sorted list, so that prefixes and ranges are bisections;
+    - the postings of each key as sorted integer codes of locations,
+      all held in one array, with an array of offsets into it.
+Locations are interned in one table shared by all the indexes, along with
+the text they belong to, so that postings of different indexes can be
+intersected or merged, per location or per text.
+
+Terms are written `index:key` (e.g. `lem:lugal[king]n`), or `index:prefix*`
+to match every key starting with the prefix.
+
+Classes:
+    KeyIndex
+    IndexSearch
+"""
+
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union, cast
+
+from pydantic import BaseModel
+
+from .instance_store import StringTable
+from .models.index import IndexCat, IndexLem, IndexSux
+from .utils import load_json
+
+LEVELS = ("text", "location")
+
+
+class KeyIndex:
+    """The sorted keys of one index, with the postings of each key."""
+
+    def __init__(self, name: str, keys: List[str], offsets: array, postings: array):
+        self.name = name
+        self._keys = keys
+        # The postings of key `i` are `_postings[_offsets[i] : _offsets[i + 1]]`
+        self._offsets = offsets
+        self._postings = postings
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        i = bisect_left(self._keys, key)
+        return i < len(self._keys) and self._keys[i] == key
+
+    @property
+    def keys(self) -> List[str]:
+        """The keys, sorted."""
+        return self._keys
+
+    def keys_with_prefix(self, prefix: str) -> List[str]:
+        """Returns the keys starting with `prefix`, sorted."""
+        return self._keys[slice(*self._prefix_bounds(prefix))]
+
+    def keys_in_range(self, start: str, end: Optional[str] = None) -> List[str]:
+        """Returns the keys `k` with `start <= k < end`, sorted. No upper bound if `end` is None."""
+        low = bisect_left(self._keys, start)
+        high = len(self._keys) if end is None else bisect_left(self._keys, end)
+        return self._keys[low:high]
+
+    def postings(self, key: str) -> array:
+        """Returns the location codes of a key, sorted. Empty if the key is not in the index."""
+        i = bisect_left(self._keys, key)
+        if i == len(self._keys) or self._keys[i] != key:
+            return array("I")
+        return self._postings[self._offsets[i] : self._offsets[i + 1]]
+
+    def prefix_postings(self, prefix: str) -> Set[int]:
+        """Returns the location codes of every key starting with `prefix`."""
+        low, high = self._prefix_bounds(prefix)
+        # The postings of consecutive keys are contiguous
+        return set(self._postings[self._offsets[low] : self._offsets[high]])
+
+    def _prefix_bounds(self, prefix: str) -> Tuple[int, int]:
+        low = bisect_left(self._keys, prefix)
+        # Sorts after every key starting with the prefix
+        high = bisect_left(self._keys, prefix + "\U0010ffff", low)
+        return low, high
+
+
+class IndexSearch:
+    """
+    Several Oracc indexes, with their locations interned in one table.
+    Built with `IndexSearch.build()` or `IndexSearch.load()`.
+    """
+
+    def __init__(
+        self,
+        indexes: Dict[str, KeyIndex],
+        locations: List[str],
+        texts: List[str],
+        text_codes: array,
+    ):
+        self.indexes = indexes
+        self._locations = StringTable(locations)
+        self._texts = StringTable(texts)
+        # The text code of each location code
+        self._text_codes = text_codes
+
+    @classmethod
+    def build(
+        cls, indexes: Iterable[Union[IndexCat, IndexLem, IndexSux, Dict[str, Any]]]
+    ) -> "IndexSearch":
+        """
+        Build the query structures of indexes.
+
+        Args:
+            indexes (Iterable[Union[IndexCat, IndexLem, IndexSux, Dict[str, Any]]]):
+                The index models, or their JSON data.
+
+        Returns:
+            IndexSearch: The indexes.
+        """
+        location_codes: Dict[str, int] = {}
+        text_ids: Dict[str, int] = {}
+        text_codes = array("I")
+        key_indexes: Dict[str, KeyIndex] = {}
+
+        for index in indexes:
+            if isinstance(index, BaseModel):
+                name, mapping = index.name, index.map
+                entries = [(key.key, key.instances) for key in index.keys]
+            else:
+                name, mapping = index["name"], index.get("map") or {}
+                entries = [
+                    (key.get("key", ""), key.get("instances", []))
+                    for key in index["keys"]
+                ]
+
+            # The same key can be listed more than once
+            postings_by_key: Dict[str, Set[int]] = {}
+            for key, instances in entries:
+                codes = postings_by_key.setdefault(key, set())
+                for instance in instances:
+                    location = mapping.get(instance, instance)
+                    code = location_codes.get(location)
+                    if code is None:
+                        code = location_codes[location] = len(location_codes)
+                        # "epsd2/admin/ur3:P137994.3.1" is in "epsd2/admin/ur3:P137994"
+                        text = location.split(".", 1)[0]
+                        text_code = text_ids.get(text)
+                        if text_code is None:
+                            text_code = text_ids[text] = len(text_ids)
+                        text_codes.append(text_code)
+                    codes.add(code)
+
+            keys = sorted(postings_by_key)
+            offsets = array("I", [0])
+            postings = array("I")
+            for key in keys:
+                postings.extend(sorted(postings_by_key[key]))
+                offsets.append(len(postings))
+            key_indexes[name] = KeyIndex(name, keys, offsets, postings)
+
+        return cls(key_indexes, list(location_codes), list(text_ids), text_codes)
+
+    @classmethod
+    def load(cls, names: Iterable[str] = ("cat", "lem", "sux")) -> "IndexSearch":
+        """
+        Build the query structures from the index-<name>.json files of the ./json/ directory.
+
+        The JSON data is used as is, which is much faster than validating the models.
+
+        Args:
+            names (Iterable[str]): The names of the indexes.
+
+        Returns:
+            IndexSearch: The indexes.
+        """
+        return cls.build(
+            cast(Dict[str, Any], load_json(f"index-{name}.json")) for name in names
+        )
+
+    def index(self, name: str) -> KeyIndex:
+        """
+        Raises:
+            ValueError: If there is no index with this name.
+        """
+        try:
+            return self.indexes[name]
+        except KeyError:
+            raise ValueError(
+                f"Invalid index: {name}. Valid options: {list(self.indexes)}"
+            ) from None
+
+    def locations(self, term: str) -> List[str]:
+        """
+        Args:
+            term (str): `index:key` or `index:prefix*`.
+
+        Returns:
+            List[str]: The locations of the term, in index order.
+
+        Raises:
+            ValueError: If the term is invalid.
+        """
+        return [self._locations[code] for code in sorted(self._codes(term))]
+
+    def search(
+        self,
+        all_of: Iterable[str] = (),
+        any_of: Iterable[str] = (),
+        level: str = "text",
+    ) -> List[str]:
+        """
+        Find the texts (or locations) matching a query. The conditions that are given must all hold.
+
+        Example usage:
+            search.search(all_of=["lem:lugal[king]n", "cat:ur iii"])
+            search.search(any_of=["sux:lugal*", "sux:ensi2*"], level="location")
+
+        Args:
+            all_of (Iterable[str]): Terms that must all match.
+            any_of (Iterable[str]): Terms of which at least one must match.
+            level (str): `text` to match texts (e.g. "epsd2/admin/ur3:P137994"),
+                which can be combined across all indexes, or `location` to match locations.
+
+        Returns:
+            List[str]: The matching texts or locations, in index order.
+
+        Raises:
+            ValueError: If no condition is given, a term is invalid, or the level is invalid.
+        """
+        if level not in LEVELS:
+            raise ValueError(f"Invalid level: {level}. Valid options: {LEVELS}")
+        all_of, any_of = list(all_of), list(any_of)
+        if not (all_of or any_of):
+            raise ValueError("Empty query: pass all_of or any_of")
+
+        conditions = [self._matches(term, level) for term in all_of]
+        if any_of:
+            conditions.append(set().union(*(self._matches(t, level) for t in any_of)))
+
+        # Start from the condition with the fewest matches
+        conditions.sort(key=len)
+        matches = conditions[0]
+        for condition in conditions[1:]:
+            matches = matches & condition
+            if not matches:
+                break
+
+        table = self._texts if level == "text" else self._locations
+        return [table[code] for code in sorted(matches)]
+
+    def _matches(self, term: str, level: str) -> Set[int]:
+        codes = self._codes(term)
+        if level == "location":
+            return codes
+        text_codes = self._text_codes
+        return {text_codes[code] for code in codes}
+
+    def _codes(self, term: str) -> Set[int]:
+        name, sep, key = term.partition(":")
+        if not sep:
+            raise ValueError(
+                f"Invalid search term: {term}. Expected `index:key` or `index:prefix*`"
+            )
+        index = self.index(name)
+        if key.endswith("*"):
+            return index.prefix_postings(key[:-1])
+        return set(index.postings(key))
@@ -0,0 +1,348 @@
+"""
+A compact store of the occurrences of the glossary (`Glossary.instances`).
+
+`instances` maps the `xis` of a sense, form, base... to the places where it
+occurs in the corpora, as `project:text.line.word` strings
+(e.g. "epsd2/admin/ur3:P120803.5.5"). Kept as Python strings, these are
+most of the memory used by a glossary. `InstanceStore` interns the projects
+and text ids (held as one string), and packs each occurrence into four integers held in arrays
+of the smallest type that fits them.
+
+On disk, the store is a small JSON header (the projects, text ids and keys)
+followed by the arrays, in the byte order recorded in the header.
+
+Classes:
+    StringTable
+    Occurrence
+    InstanceStore
+
+Functions:
+    read_store
+    write_store
+"""
+
+import struct
+import sys
+from array import array
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from ..fileio import atomic_write, read_keyed_json, write_keyed_json
+
+_MAGIC = b"SPYINST1"
+_HEADER_LENGTH = struct.Struct("<Q")
+
+# Bump when the file layout changes
+_STORE_VERSION = 1
+
+# The arrays of the store, in file order
+_ARRAYS = ("_offsets", "_projects_codes", "_texts_codes", "_lines", "_words")
+
+
+class StringTable:
+    """A list of strings held as one string, for the many short text ids"""
+
+    __slots__ = ("_chars", "_offsets")
+
+    def __init__(self, strings: List[str]):
+        offsets = array("I", [0])
+        for string in strings:
+            offsets.append(offsets[-1] + len(string))
+        self._chars = "".join(strings)
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self._chars[self._offsets[i] : self._offsets[i + 1]]
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self[i]
+
+
+class Occurrence(NamedTuple):
+    """A place where a glossary item occurs."""
+
+    project: str
+    text_id: str
+    line: int
+    word: int
+    ref: str
+
+    @property
+    def line_ref(self) -> str:
+        """The ref of the line, e.g. "P120803.5"."""
+        return self.ref.rsplit(".", 1)[0]
+
+
+class InstanceStore:
+    """
+    The occurrences of each glossary item, keyed by `xis`.
+    Built with `InstanceStore.build()` from `Glossary.instances`.
+    """
+
+    def __init__(
+        self,
+        keys: List[str],
+        projects: List[str],
+        text_ids: List[str],
+        irregular: Dict[int, str],
+        arrays: Dict[str, array],
+    ):
+        self._keys = keys
+        self._key_positions = {key: i for i, key in enumerate(keys)}
+        self._projects = projects
+        self._text_ids = StringTable(text_ids)
+        # The refs that are not `text.line.word` with integer line and word
+        # (without leading zeros), by occurrence. Their line and word are 0
+        self._irregular = irregular
+        # The occurrences of key `i` are `[_offsets[i], _offsets[i + 1])`
+        # in the four parallel arrays of codes
+        self._offsets: array = arrays["_offsets"]
+        self._projects_codes: array = arrays["_projects_codes"]
+        self._texts_codes: array = arrays["_texts_codes"]
+        self._lines: array = arrays["_lines"]
+        self._words: array = arrays["_words"]
+
+    @classmethod
+    def build(cls, instances: Mapping[str, Iterable[str]]) -> "InstanceStore":
+        """
+        Pack the occurrences of a glossary.
+
+        Args:
+            instances (Mapping[str, Iterable[str]]): `xis` -> `project:text.line.word` refs,
+                as in `Glossary.instances`.
+
+        Returns:
+            InstanceStore: The store.
+        """
+        projects: Dict[str, int] = {}
+        text_ids: Dict[str, int] = {}
+        irregular: Dict[int, str] = {}
+        offsets = array("I", [0])
+        projects_codes = array("I")
+        texts_codes = array("I")
+        lines = array("L")
+        words = array("L")
+
+        for refs in instances.values():
+            for instance in refs:
+                project, _, ref = instance.rpartition(":")
+                text_id, _, rest = ref.partition(".")
+                line, _, word = rest.partition(".")
+
+                project_code = projects.get(project)
+                if project_code is None:
+                    project_code = projects[project] = len(projects)
+                text_code = text_ids.get(text_id)
+                if text_code is None:
+                    text_code = text_ids[text_id] = len(text_ids)
+                projects_codes.append(project_code)
+                texts_codes.append(text_code)
+
+                if _is_packable(line) and _is_packable(word):
+                    lines.append(int(line))
+                    words.append(int(word))
+                else:
+                    irregular[len(lines)] = ref
+                    lines.append(0)
+                    words.append(0)
+            offsets.append(len(texts_codes))
+
+        return cls(
+            list(instances),
+            list(projects),
+            list(text_ids),
+            irregular,
+            {
+                "_offsets": offsets,
+                "_projects_codes": _narrow(projects_codes),
+                "_texts_codes": _narrow(texts_codes),
+                "_lines": _narrow(lines),
+                "_words": _narrow(words),
+            },
+        )
+
+    def __len__(self) -> int:
+        """The number of keys."""
+        return len(self._keys)
+
+    def __contains__(self, xis: str) -> bool:
+        return xis in self._key_positions
+
+    @property
+    def keys(self) -> List[str]:
+        """The `xis` with occurrences, in glossary order."""
+        return self._keys
+
+    @property
+    def projects(self) -> List[str]:
+        """The projects of the occurrences, by code."""
+        return self._projects
+
+    @property
+    def text_ids(self) -> StringTable:
+        """The text ids of the occurrences, by code."""
+        return self._text_ids
+
+    @property
+    def irregular_refs(self) -> Mapping[int, str]:
+        """The refs that are not `text.line.word`, by occurrence."""
+        return self._irregular
+
+    @property
+    def arrays(self) -> Dict[str, array]:
+        """The arrays of codes, keyed by name as in the constructor."""
+        return {name: getattr(self, name) for name in _ARRAYS}
+
+    def count(self, xis: str) -> int:
+        """Returns the number of occurrences of a glossary item."""
+        i = self._key_positions.get(xis)
+        return 0 if i is None else self._offsets[i + 1] - self._offsets[i]
+
+    def occurrences(self, xis: str) -> Iterator[Occurrence]:
+        """
+        Yield the occurrences of a glossary item, in glossary order.
+
+        Args:
+            xis (str): The `xis` of a sense, form, base... (e.g. "sux.r00f237").
+
+        Yields:
+            Occurrence: Decoded one at a time.
+        """
+        i = self._key_positions.get(xis)
+        if i is None:
+            return
+        projects, text_ids, irregular = self._projects, self._text_ids, self._irregular
+        for j in range(self._offsets[i], self._offsets[i + 1]):
+            text_id = text_ids[self._texts_codes[j]]
+            line, word = self._lines[j], self._words[j]
+            if irregular and j in irregular:
+                ref = irregular[j]
+                line_part, _, word_part = ref.partition(".")[2].partition(".")
+                line = int(line_part) if line_part.isdigit() else -1
+                word = int(word_part) if word_part.isdigit() else -1
+            else:
+                ref = f"{text_id}.{line}.{word}"
+            yield Occurrence(
+                projects[self._projects_codes[j]], text_id, line, word, ref
+            )
+
+    def join_texts(
+        self, xis: str, texts: Union[Mapping[str, Any], Iterable[Any]]
+    ) -> Iterator[Tuple[Occurrence, Any]]:
+        """
+        Yield the occurrences of a glossary item with the text they occur in.
+
+        Occurrences in texts that are not given are skipped.
+
+        Args:
+            xis (str): The `xis` of a sense, form, base...
+            texts (Union[Mapping[str, Any], Iterable[Any]]): Texts keyed by `file_id`,
+                or the texts themselves (e.g. `corpus.texts`). Pass a mapping
+                when joining many items, so that it is only built once.
+
+        Yields:
+            Tuple[Occurrence, Any]: Each occurrence with its text.
+        """
+        if not isinstance(texts, Mapping):
+            texts = {text.file_id: text for text in texts}
+        for occurrence in self.occurrences(xis):
+            text = texts.get(occurrence.text_id)
+            if text is not None:
+                yield occurrence, text
+
+    def to_dict(self) -> Dict[str, List[str]]:
+        """Returns the occurrences as in `Glossary.instances`."""
+        return {
+            xis: [
+                f"{o.project}:{o.ref}" if o.project else o.ref
+                for o in self.occurrences(xis)
+            ]
+            for xis in self._keys
+        }
+
+
+def _is_packable(number: str) -> bool:
+    # Decoding must give back the same string
+    return number.isdigit() and str(int(number)) == number and int(number) <= 0xFFFFFFFF
+
+
+def _narrow(values: array) -> array:
+    """Copy to the smallest unsigned array type that can hold the values"""
+    largest = max(values, default=0)
+    for typecode in ("B", "H", "I"):
+        if largest < 1 << (8 * array(typecode).itemsize):
+            return array(typecode, values)
+    return values
+
+
+def read_store(path: str, key: Any) -> Optional[InstanceStore]:
+    """
+    Load a store, if it was written for the same glossary.
+
+    Args:
+        path (str): The store file.
+        key (Any): Identifies the version of the glossary the store must have been built from.
+
+    Returns:
+        Optional[InstanceStore]: The store, or None if it is missing or stale.
+    """
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                return None
+            header = read_keyed_json(f, _STORE_VERSION, key, _HEADER_LENGTH)
+            if header is None:
+                return None
+            arrays = {}
+            for name, (typecode, count) in zip(_ARRAYS, header["arrays"]):
+                arrays[name] = values = array(typecode)
+                values.frombytes(f.read(count * values.itemsize))
+                if header["byteorder"] != sys.byteorder:
+                    values.byteswap()
+    except (OSError, ValueError, KeyError, struct.error):
+        return None
+
+    irregular = {int(j): ref for j, ref in header["irregular"].items()}
+    return InstanceStore(
+        header["keys"], header["projects"], header["texts"], irregular, arrays
+    )
+
+
+def write_store(path: str, key: Any, store: InstanceStore) -> None:
+    """
+    Save a store.
+
+    Args:
+        path (str): The store file.
+        key (Any): JSON-serialisable. Identifies the version of the glossary (see `read_store`).
+        store (InstanceStore): The store to save.
+    """
+    arrays = list(store.arrays.values())
+    header = {
+        "byteorder": sys.byteorder,
+        "keys": store.keys,
+        "projects": store.projects,
+        "texts": list(store.text_ids),
+        "irregular": store.irregular_refs,
+        "arrays": [(values.typecode, len(values)) for values in arrays],
+    }
+
+    with atomic_write(path) as f:
+        f.write(_MAGIC)
+        write_keyed_json(f, _STORE_VERSION, key, header, _HEADER_LENGTH)
+        for values in arrays:
+            f.write(values.tobytes())
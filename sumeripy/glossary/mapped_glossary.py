@@ -0,0 +1,338 @@
+"""
+A compact, memory-mapped copy of a glossary (e.g. gloss-sux.json).
+
+`Glossary.load()` validates every entry of the glossary, with all of its
+senses, forms and signatures, before anything can be looked up.
+`MappedGlossary.convert()` instead writes the glossary once into an indexed
+binary file, which `MappedGlossary.open()` memory-maps: only the lookup keys
+are read when opening, and each `Entry` is decoded when it is accessed.
+
+File layout (integers are in the byte order recorded in the header):
+    - magic bytes and the length of the header;
+    - a JSON header: the metadata of the glossary, the keys of each entry
+      (id, headword, citation form) and the ids of the summaries;
+    - the offsets of the entries and of the summaries (uint64 arrays);
+    - the entries (zlib-compressed JSON), the summaries (UTF-8) and the
+      lookup indexes of `GlossaryIndex` (zlib-compressed JSON, read on first use).
+
+`instances` are not included.
+
+Classes:
+    MappedGlossary
+
+Functions:
+    write_glossary
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from typing import Any, Dict, Iterator, List, Optional
+
+from pydantic import BaseModel
+
+from ..fileio import atomic_write
+from ..jsonio import load_file, loads
+from .glossary_index import GlossaryIndex, resolve_object
+from .models.glossary import Entry, _Sense
+from .utils import json_path
+
+_MAGIC = b"SPYGLOS1"
+_HEADER_LENGTH = struct.Struct("<Q")
+
+# Bump when the file layout changes
+_FORMAT_VERSION = 2
+
+# Keys of gloss-*.json that are not part of the metadata
+_CONTENT_KEYS = {"entries", "instances", "summaries"}
+
+
+class MappedGlossary:
+    """
+    A glossary converted with `MappedGlossary.convert()`, opened with `MappedGlossary.open()`.
+
+    Entries are looked up by `id`, `headword` or citation form (`cf`), and
+    through the lookup indexes (see `GlossaryIndex`) by citation form + guide word
+    + POS, form, signature, or the `id`/`xis`/`oid` of any nested object.
+    They are decoded into `Entry` models on access. Can be used as a context manager.
+
+    Attributes:
+        metadata (Dict[str, Any]): The top-level fields of the glossary
+            (`project`, `lang`, `UTC-timestamp`...).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty file
+            self._file.close()
+            raise ValueError(f"{path} is not a converted glossary") from None
+
+        try:
+            header = self._read_header()
+        except Exception:
+            self.close()
+            raise
+
+        self.metadata: Dict[str, Any] = header["metadata"]
+        self._ids: List[str] = header["ids"]
+        self._ids_by_key = {id_: i for i, id_ in enumerate(self._ids)}
+        self._by_headword = {hw: i for i, hw in enumerate(header["headwords"])}
+        self._by_citation_form: Dict[str, List[int]] = {}
+        for i, cf in enumerate(header["cfs"]):
+            self._by_citation_form.setdefault(cf, []).append(i)
+        self._summary_ids = {id_: i for i, id_ in enumerate(header["summary_ids"])}
+
+        self._entry_offsets = self._offsets(header["entry_offsets"], len(self._ids) + 1)
+        self._summary_offsets = self._offsets(
+            header["summary_offsets"], len(self._summary_ids) + 1
+        )
+        self._data_start = header["data_start"]
+        self._index_location = header["index"]
+        self._index: Optional[GlossaryIndex] = None
+
+    @classmethod
+    def open(cls, path: Optional[str] = None) -> "MappedGlossary":
+        """
+        Open a converted glossary.
+
+        Args:
+            path (Optional[str]): The converted file. Defaults to json/gloss-sux.bin.
+
+        Returns:
+            MappedGlossary: The glossary.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            ValueError: If the file is not a converted glossary, or was converted by an incompatible version.
+        """
+        return cls(path or json_path("gloss-sux.bin"))
+
+    @classmethod
+    def convert(
+        cls, source: str = "gloss-sux.json", path: Optional[str] = None
+    ) -> "MappedGlossary":
+        """
+        Convert a glossary to the binary format, and open it.
+
+        Args:
+            source (str): The JSON glossary, as a path or as a file name in the ./json/ directory.
+            path (Optional[str]): Where to write the converted file.
+                Defaults to the source path with a .bin extension.
+
+        Returns:
+            MappedGlossary: The converted glossary.
+        """
+        source_path = source if os.path.exists(source) else json_path(source)
+        path = path or f"{os.path.splitext(source_path)[0]}.bin"
+        write_glossary(load_file(source_path), path)
+        return cls.open(path)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, id_: str) -> bool:
+        return id_ in self._ids_by_key
+
+    def __iter__(self) -> Iterator[Entry]:
+        """Decodes the entries one at a time, in glossary order."""
+        for i in range(len(self._ids)):
+            yield self._entry(i)
+
+    def __enter__(self) -> "MappedGlossary":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def ids(self) -> List[str]:
+        """The ids of the entries, in glossary order."""
+        return self._ids
+
+    def get(self, id_: str) -> Optional[Entry]:
+        """Returns the entry with this `id` (e.g. "o0031651"), if any."""
+        i = self._ids_by_key.get(id_)
+        return None if i is None else self._entry(i)
+
+    def by_headword(self, headword: str) -> Optional[Entry]:
+        """Returns the entry with this headword (e.g. "kaskal[way]N"), if any."""
+        i = self._by_headword.get(headword)
+        return None if i is None else self._entry(i)
+
+    def by_citation_form(self, citation_form: str) -> List[Entry]:
+        """Returns the entries with this citation form (e.g. "kaskal")."""
+        return [self._entry(i) for i in self._by_citation_form.get(citation_form, [])]
+
+    @property
+    def index(self) -> GlossaryIndex:
+        """The lookup indexes over the entries, read on first use."""
+        if self._index is None:
+            start, end = self._index_location
+            data = loads(zlib.decompress(self._slice(start, end)))
+            self._index = GlossaryIndex.from_json(data)
+        return self._index
+
+    def entry(
+        self, citation_form: str, guide_word: str, part_of_speech: str
+    ) -> Optional[Entry]:
+        """Returns the entry with this citation form, guide word and POS (e.g. "kaskal", "way", "N"), if any."""
+        i = self.index.entry(citation_form, guide_word, part_of_speech)
+        return None if i is None else self._entry(i)
+
+    def entries_for_form(self, form: str) -> List[Entry]:
+        """Returns the entries with this written form (e.g. "kas-kal")."""
+        return [self._entry(i) for i in self.index.entries_for_form(form)]
+
+    def sense(self, sig: str) -> Optional[_Sense]:
+        """Returns the sense with this signature, if any. The project of the signature is ignored."""
+        location = self.index.sense(sig)
+        if location is None:
+            return None
+        i, j = location
+        return self._entry(i).senses[j]
+
+    def find(self, id_: str) -> Optional[BaseModel]:
+        """Returns the entry, sense, form... with this `id`, `xis` or `oid`, if any."""
+        location = self.index.object(id_)
+        if location is None:
+            return None
+        i, number = location
+        return resolve_object(self._entry(i), number)
+
+    def raw(self, id_: str) -> Optional[Dict[str, Any]]:
+        """Returns the JSON data of the entry with this `id`, without validating it."""
+        i = self._ids_by_key.get(id_)
+        return None if i is None else loads(self._entry_bytes(i))
+
+    def summary(self, id_: str) -> Optional[str]:
+        """Returns the HTML summary of an entry or sense (by `oid`/`id`), if any."""
+        i = self._summary_ids.get(id_)
+        if i is None:
+            return None
+        start, end = self._summary_offsets[i], self._summary_offsets[i + 1]
+        return self._slice(start, end).decode("utf-8")
+
+    def close(self) -> None:
+        """Unmaps the file. Entries already decoded remain usable."""
+        # Views over the map must be released before it can be closed
+        for name in ("_entry_offsets", "_summary_offsets"):
+            offsets = getattr(self, name, None)
+            if isinstance(offsets, memoryview):
+                offsets.release()
+        if not self._map.closed:
+            self._map.close()
+        self._file.close()
+
+    def _read_header(self) -> Dict[str, Any]:
+        if self._map[: len(_MAGIC)] != _MAGIC:
+            raise ValueError(f"{self.path} is not a converted glossary")
+        start = len(_MAGIC) + _HEADER_LENGTH.size
+        (header_length,) = _HEADER_LENGTH.unpack(self._map[len(_MAGIC) : start])
+        header = json.loads(self._map[start : start + header_length])
+        if header.get("version") != _FORMAT_VERSION:
+            raise ValueError(
+                f"{self.path} was converted by an incompatible version. Convert it again."
+            )
+        self._byteorder = header["byteorder"]
+        return header
+
+    def _offsets(self, position: int, count: int):
+        size = count * 8
+        if self._byteorder == sys.byteorder:
+            # Zero-copy view over the map
+            return memoryview(self._map)[position : position + size].cast("Q")
+        offsets = array("Q", self._map[position : position + size])
+        offsets.byteswap()
+        return offsets
+
+    def _slice(self, start: int, end: int) -> bytes:
+        return self._map[self._data_start + start : self._data_start + end]
+
+    def _entry_bytes(self, i: int) -> bytes:
+        start, end = self._entry_offsets[i], self._entry_offsets[i + 1]
+        return zlib.decompress(self._slice(start, end))
+
+    def _entry(self, i: int) -> Entry:
+        return Entry(**loads(self._entry_bytes(i)))
+
+
+def write_glossary(data: Dict[str, Any], path: str) -> None:
+    """
+    Write a glossary in the format read by `MappedGlossary`.
+
+    Args:
+        data (Dict[str, Any]): The decoded JSON glossary (e.g. gloss-sux.json).
+        path (str): The file to write.
+    """
+    entries = data.get("entries") or []
+    summaries = data.get("summaries") or {}
+
+    blobs = bytearray()
+    entry_offsets = array("Q", [0])
+    for entry in entries:
+        blob = json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+        blobs += zlib.compress(blob.encode("utf-8"))
+        entry_offsets.append(len(blobs))
+    summary_offsets = array("Q", [len(blobs)])
+    for summary in summaries.values():
+        blobs += summary.encode("utf-8")
+        summary_offsets.append(len(blobs))
+    index = GlossaryIndex.build(entries).to_json()
+    index_location = [len(blobs)]
+    blobs += zlib.compress(
+        json.dumps(index, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    )
+    index_location.append(len(blobs))
+
+    def _header(entry_offsets_at: int, summary_offsets_at: int, data_start: int):
+        return json.dumps(
+            {
+                "version": _FORMAT_VERSION,
+                "byteorder": sys.byteorder,
+                "metadata": {
+                    key: value
+                    for key, value in data.items()
+                    if key not in _CONTENT_KEYS
+                },
+                "ids": [entry.get("id", "") for entry in entries],
+                "headwords": [entry.get("headword", "") for entry in entries],
+                "cfs": [entry.get("cf", "") for entry in entries],
+                "summary_ids": list(summaries),
+                "entry_offsets": entry_offsets_at,
+                "summary_offsets": summary_offsets_at,
+                "data_start": data_start,
+                "index": index_location,
+            },
+            ensure_ascii=False,
+        ).encode("utf-8")
+
+    # The positions are part of the header, so its length must be known first.
+    # Pad them to a fixed width so that the length doesn't depend on their values.
+    placeholder = 10**15
+    header_length = len(_header(placeholder, placeholder, placeholder))
+    entry_offsets_at = _align(len(_MAGIC) + _HEADER_LENGTH.size + header_length)
+    summary_offsets_at = entry_offsets_at + len(entry_offsets) * 8
+    data_start = summary_offsets_at + len(summary_offsets) * 8
+    header = _header(entry_offsets_at, summary_offsets_at, data_start)
+    header += b" " * (header_length - len(header))
+
+    with atomic_write(path) as f:
+        f.write(_MAGIC)
+        f.write(_HEADER_LENGTH.pack(len(header)))
+        f.write(header)
+        f.write(b"\0" * (entry_offsets_at - f.tell()))
+        f.write(entry_offsets.tobytes())
+        f.write(summary_offsets.tobytes())
+        f.write(blobs)
+
+
+def _align(position: int, alignment: int = 8) -> int:
+    return (position + alignment - 1) // alignment * alignment
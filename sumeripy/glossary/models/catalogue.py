@@ -1,12 +1,13 @@
 """
 """
-from typing import Dict, List
+from typing import Any, Dict, Iterable, List, Optional, cast
 from pydantic import Field
-from pyoracc.epsd2.models.utils import BaseModel, OraccFileBase
-from pyoracc.epsd2.utils import load_json
+from .utils import BaseModel, OraccFileBase
+from ..utils import load_json
+from ...projection import ProjectedModel, project_all
 
 
-class _CatalogueItem(BaseModel):
+class _CatalogueItem(ProjectedModel, BaseModel):
     """ """
 
     accession_no: str = Field(
@@ -755,10 +756,27 @@ class Catalogue(OraccFileBase):
     )
 
     @classmethod
-    def load(cls) -> "Catalogue":
-        """Loads the JSON data and instantiates the class."""
-        data = load_json("catalogue.json")
-        return cls(**data)
+    def load(cls, fields: Optional[Iterable[str]] = None) -> "Catalogue":
+        """
+        Loads the JSON data and instantiates the class.
+
+        Args:
+            fields (Optional[Iterable[str]]): If given, only validate these fields of
+                the members (e.g. {"id_text", "period", "genre"}), which is much faster.
+                The other fields are validated when first read (see `sumeripy.projection`).
+
+        Raises:
+            ValueError: If one of `fields` is not a field of the members.
+        """
+        data = cast(Dict[str, Any], load_json("catalogue.json"))
+        if fields is None:
+            return cls(**data)
+
+        members = data.pop("members")
+        catalogue = cls(**data, members={})
+        items = project_all(_CatalogueItem, fields, members.values())
+        catalogue.members = dict(zip(members, items))
+        return catalogue
 
 
 __all__ = ["Catalogue"]
@@ -1,9 +1,9 @@
 """
 """
-from typing import Dict
+from typing import Any, Dict, cast
 from pydantic import Field
-from pyoracc.epsd2.models.utils import OraccFileBase
-from pyoracc.epsd2.utils import load_json
+from .utils import OraccFileBase
+from ..utils import load_json
 
 
 class Corpus(OraccFileBase):
@@ -16,7 +16,7 @@ class Corpus(OraccFileBase):
     @classmethod
     def load(cls) -> "Corpus":
         """Loads the JSON data and instantiates the class."""
-        data = load_json("corpus.json")
+        data = cast(Dict[str, Any], load_json("corpus.json"))
         return cls(**data)
 
 
@@ -1,15 +1,20 @@
 """
 """
-from typing import Any, Dict, List
-from pydantic import Field, model_validator
-from pyoracc.epsd2.models.utils import (
+import os
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Optional, cast
+from pydantic import Field, PrivateAttr, model_validator
+from .utils import (
     BaseModel,
     OraccFileBase,
     PeriodEnum,
     PartOfSpeechEnum,
     OccurrenceStatsMixin,
 )
-from pyoracc.epsd2.utils import load_json
+from ..utils import load_json, load_json_lazy
+
+if TYPE_CHECKING:
+    from ..glossary_index import GlossaryIndex
+    from ..instance_store import InstanceStore
 
 
 class _Base(BaseModel, OccurrenceStatsMixin):
@@ -602,11 +607,123 @@ class Glossary(OraccFileBase):
         },
     )
 
+    _index: Optional["GlossaryIndex"] = PrivateAttr(None)
+    _instance_store: Optional["InstanceStore"] = PrivateAttr(None)
+
     @classmethod
-    def load(cls) -> "Glossary":
-        """Loads the JSON data and instantiates the class."""
-        data = load_json("gloss-sux.json")
-        return cls(**data)
+    def load(
+        cls, compact_instances: bool = False, cache_dir: Optional[str] = None
+    ) -> "Glossary":
+        """
+        Loads the JSON data and instantiates the class.
+
+        Args:
+            compact_instances (bool): Keep the occurrences only in `instance_store`,
+                which takes a fraction of the memory, and leave `instances` empty.
+            cache_dir (Optional[str]): A directory where the lookup indexes (and the
+                instance store, with `compact_instances`) are saved, and read back on
+                later loads of the same glossary (gloss-sux.index.json and
+                gloss-sux.instances.bin). By default, they are built on each load.
+
+        Raises:
+            OSError: If the cache can't be written to `cache_dir`.
+        """
+        from ..glossary_index import GlossaryIndex, read_index, write_index
+        from ..instance_store import InstanceStore, read_store, write_store
+
+        # Lazy, so that the occurrences need not be decoded when the store is up to date
+        data: Mapping[str, Any] = (
+            load_json_lazy("gloss-sux.json")
+            if compact_instances
+            else cast(Dict[str, Any], load_json("gloss-sux.json"))
+        )
+        # Identifies the version of the glossary the indexes were built from
+        key = {
+            "timestamp": data.get("UTC-timestamp"),
+            "entries": len(data.get("entries") or []),
+        }
+        index_path = store_path = None
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            index_path = os.path.join(cache_dir, "gloss-sux.index.json")
+            store_path = os.path.join(cache_dir, "gloss-sux.instances.bin")
+
+        index = read_index(index_path, key) if index_path else None
+        if index is None:
+            # Indexing the raw data is much faster than walking the models
+            index = GlossaryIndex.build(data.get("entries") or [])
+            if index_path:
+                write_index(index_path, key, index)
+
+        store = None
+        if compact_instances:
+            store = read_store(store_path, key) if store_path else None
+            if store is None:
+                store = InstanceStore.build(data.get("instances") or {})
+                if store_path:
+                    write_store(store_path, key, store)
+            data = {name: data[name] for name in data if name != "instances"}
+            data["instances"] = {}
+
+        glossary = cls(**data)
+        glossary._index = index
+        glossary._instance_store = store
+        return glossary
+
+    @property
+    def index(self) -> "GlossaryIndex":
+        """The lookup indexes over the entries, built on first use unless loaded with `load()`."""
+        if self._index is None:
+            from ..glossary_index import GlossaryIndex
+
+            self._index = GlossaryIndex.build(self.entries)
+        return self._index
+
+    @property
+    def instance_store(self) -> "InstanceStore":
+        """The occurrences of `instances`, packed. Built on first use unless loaded with `load()`."""
+        if self._instance_store is None:
+            from ..instance_store import InstanceStore
+
+            self._instance_store = InstanceStore.build(self.instances)
+        return self._instance_store
+
+    def entry(
+        self, citation_form: str, guide_word: str, part_of_speech: str
+    ) -> Optional[Entry]:
+        """
+        Returns the entry with this citation form, guide word and POS
+        (e.g. "kaskal", "way", "N"), if any. Matches the `cf`, `gw` and `pos` of a lemma.
+        """
+        i = self.index.entry(citation_form, guide_word, part_of_speech)
+        return None if i is None else self.entries[i]
+
+    def entries_for_form(self, form: str) -> List[Entry]:
+        """Returns the entries with this written form (e.g. "kas-kal")."""
+        return [self.entries[i] for i in self.index.entries_for_form(form)]
+
+    def sense(self, sig: str) -> Optional[_Sense]:
+        """
+        Returns the sense with this signature, if any.
+
+        The project of the signature is ignored, so that the `sig` of a lemma
+        (e.g. "@epsd2/admin/ed3b%sux:...") finds the sense of the glossary ("@epsd2%sux:...").
+        """
+        location = self.index.sense(sig)
+        if location is None:
+            return None
+        i, j = location
+        return self.entries[i].senses[j]
+
+    def find(self, id_: str) -> Optional[BaseModel]:
+        """Returns the entry, sense, form... with this `id`, `xis` or `oid`, if any."""
+        from ..glossary_index import resolve_object
+
+        location = self.index.object(id_)
+        if location is None:
+            return None
+        i, number = location
+        return resolve_object(self.entries[i], number)
 
 
 __all__ = ["Glossary"]
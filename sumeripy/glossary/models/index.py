@@ -1,9 +1,9 @@
 """
 """
-from typing import Dict, List
+from typing import Any, Dict, List, cast
 from pydantic import Field
-from pyoracc.epsd2.models.utils import BaseModel, OraccFileBase
-from pyoracc.epsd2.utils import load_json
+from .utils import BaseModel, OraccFileBase
+from ..utils import load_json
 
 
 # _IndexKey class
@@ -42,7 +42,7 @@ class IndexCat(OraccFileBase):
     @classmethod
     def load(cls) -> "IndexCat":
         """Loads the JSON data and instantiates the class."""
-        data = load_json("index-cat.json")
+        data = cast(Dict[str, Any], load_json("index-cat.json"))
         return cls(**data)
 
 
@@ -65,7 +65,7 @@ class IndexLem(OraccFileBase):
     @classmethod
     def load(cls) -> "IndexLem":
         """Loads the JSON data and instantiates the class."""
-        data = load_json("index-lem.json")
+        data = cast(Dict[str, Any], load_json("index-lem.json"))
         return cls(**data)
 
 
@@ -88,7 +88,7 @@ class IndexSux(OraccFileBase):
     @classmethod
     def load(cls) -> "IndexSux":
         """Loads the JSON data and instantiates the class."""
-        data = load_json("index-sux.json")
+        data = cast(Dict[str, Any], load_json("index-sux.json"))
         return cls(**data)
 
 
@@ -1,9 +1,9 @@
 """
 """
-from typing import Dict
+from typing import Any, Dict, cast
 from pydantic import Field
-from pyoracc.epsd2.models.utils import BaseModel, OraccFileBase
-from pyoracc.epsd2.utils import load_json
+from .utils import BaseModel, OraccFileBase
+from ..utils import load_json
 
 
 # Config class
@@ -57,7 +57,7 @@ class Metadata(OraccFileBase):
     @classmethod
     def load(cls) -> "Metadata":
         """Loads the JSON data and instantiates the class."""
-        data = load_json("metadata.json")
+        data = cast(Dict[str, Any], load_json("metadata.json"))
         return cls(**data)
 
 
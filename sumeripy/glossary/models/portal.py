@@ -1,9 +1,9 @@
 """
 """
-from typing import List
+from typing import Any, Dict, List, cast
 from pydantic import Field
-from pyoracc.epsd2.models.utils import BaseModel, OraccFileBase
-from pyoracc.epsd2.utils import load_json
+from .utils import BaseModel, OraccFileBase
+from ..utils import load_json
 
 
 class Chunk(BaseModel):
@@ -28,7 +28,7 @@ class Portal(OraccFileBase):
     @classmethod
     def load(cls) -> "Portal":
         """Loads the JSON data and instantiates the class."""
-        data = load_json("epsd2-portal.json")
+        data = cast(Dict[str, Any], load_json("epsd2-portal.json"))
         return cls(**data)
 
 
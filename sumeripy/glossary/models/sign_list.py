@@ -1,9 +1,9 @@
 """
 """
-from typing import Dict, List
+from typing import Any, Dict, List, cast
 from pydantic import Field
-from pyoracc.epsd2.models.utils import BaseModel, OraccFileBase
-from pyoracc.epsd2.utils import load_json
+from .utils import BaseModel, OraccFileBase
+from ..utils import load_json
 
 
 class _Modifier(BaseModel):
@@ -86,7 +86,7 @@ class SignList(OraccFileBase):
     @classmethod
     def load(cls) -> "SignList":
         """Loads the JSON data and instantiates the class."""
-        data = load_json("epsd2-sl.json")
+        data = cast(Dict[str, Any], load_json("epsd2-sl.json"))
         return cls(**data)
 
 
@@ -1,9 +1,9 @@
 """
 """
-from typing import Dict
+from typing import Any, Dict, cast
 from pydantic import Field
-from pyoracc.epsd2.models.utils import BaseModel
-from pyoracc.epsd2.utils import load_json
+from .utils import BaseModel
+from ..utils import load_json
 
 
 class Sortvals(BaseModel):
@@ -37,7 +37,7 @@ class Sortcodes(BaseModel):
     @classmethod
     def load(cls) -> "Sortcodes":
         """Loads the JSON data and instantiates the class."""
-        data = load_json("sortcodes.json")
+        data = cast(Dict[str, Any], load_json("sortcodes.json"))
         return cls(**data)
 
 
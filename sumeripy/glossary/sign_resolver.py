@@ -0,0 +1,260 @@
+"""
+Resolution of sign values and transliterated forms to sign names,
+using the sign list (epsd2-sl.json).
+
+Values are normalised before being looked up, so that the common ways of
+writing them find the same sign:
+    - index numbers as subscripts: "du3" -> "du₃", "lux" -> "luₓ";
+    - accents as index numbers: "ú" -> "u₂", "ù" -> "u₃";
+    - ASCII transliteration: "sz" -> "š", "s," -> "ṣ", "t," -> "ṭ", "h," -> "ḫ", "j" -> "ŋ".
+Resolved values and forms are memoised, so that the cost of a value or
+form seen before is one dictionary lookup.
+
+The compound signs of the sign list (e.g. "|GIŠ.LU₂|") are also flattened
+once into the tuple of their component signs.
+
+Classes:
+    SignResolver
+
+Functions:
+    normalize_value
+    split_form
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Union, cast
+
+from pydantic import BaseModel
+
+from .models.sign_list import SignList
+from .utils import load_json
+
+_SUBSCRIPTS = str.maketrans("0123456789x", "₀₁₂₃₄₅₆₇₈₉ₓ")
+
+_ASCII = (("sz", "š"), ("SZ", "Š"), ("s,", "ṣ"), ("S,", "Ṣ"), ("t,", "ṭ"), ("T,", "Ṭ"))
+_ASCII += (("h,", "ḫ"), ("H,", "Ḫ"), ("g̃", "ŋ"), ("G̃", "Ŋ"), ("j", "ŋ"), ("J", "Ŋ"))
+
+# Accented vowel -> (vowel, index): "ú" is u₂ and "ù" is u₃
+_ACCENTS = {
+    unicodedata.normalize("NFC", vowel + accent): (vowel, index)
+    for vowel in "aeiuAEIU"
+    for accent, index in (("\u0301", "₂"), ("\u0300", "₃"))
+}
+
+# An ASCII index number (or `x`) at the end of a value
+_INDEX_PATTERN = re.compile(r"(?<=[^\d])(\d+|x)$")
+
+# Brackets, half-brackets and flags, which don't change the sign
+_EDITORIAL_PATTERN = re.compile(r"[\[\]⸢⸣<>«»#?!*]")
+
+# A compound sign, or a value (with an optional number, e.g. "3(diš)")
+_TOKEN_PATTERN = re.compile(r"\|[^|]*\||[^\s\-.:+{}|]+")
+
+# A number sign, e.g. "3(diš)" or "n(U)"
+_NUMBER_PATTERN = re.compile(r"^(\d+|n)\((.+)\)$")
+
+# Separators between the components of a compound sign, e.g. "|GIŠ.LU₂|", "|A×HA|"
+_COMPOUND_SEPARATORS = re.compile(r"[.+×&%@:]")
+
+
+@lru_cache(maxsize=65536)
+def normalize_value(value: str) -> str:
+    """
+    Normalise the writing of a sign value or sign name (see the module docstring).
+
+    Args:
+        value (str): e.g. "du3", "ú", "sza3".
+
+    Returns:
+        str: e.g. "du₃", "u₂", "ša₃".
+    """
+    for ascii_, unicode_ in _ASCII:
+        if ascii_ in value:
+            value = value.replace(ascii_, unicode_)
+    for accented, (vowel, index) in _ACCENTS.items():
+        if accented in value:
+            value = value.replace(accented, vowel)
+            if value[-1:] not in "₀₁₂₃₄₅₆₇₈₉ₓ":
+                value += index
+            break
+    return _INDEX_PATTERN.sub(lambda m: m.group(1).translate(_SUBSCRIPTS), value)
+
+
+def split_form(form: str) -> List[str]:
+    """
+    Split a transliterated form into its values, dropping brackets and flags.
+
+    Args:
+        form (str): e.g. "{d}en-lil₂", "[kas]-kal#", "|GIŠ.LU₂|-e".
+
+    Returns:
+        List[str]: e.g. ["d", "en", "lil₂"], ["kas", "kal"], ["|GIŠ.LU₂|", "e"].
+    """
+    return _TOKEN_PATTERN.findall(_EDITORIAL_PATTERN.sub("", form))
+
+
+class SignResolver:
+    """
+    Value -> sign and sign -> values resolution over a sign list.
+    Built with `SignResolver.build()` or `SignResolver.load()`.
+
+    Args:
+        index (Dict[str, str]): Values mapped to sign names, as in `SignList.index`.
+        values (Dict[str, List[str]]): Sign names mapped to their values.
+        components (Dict[str, Tuple[str, ...]]): Sign names mapped to their component signs.
+        cache_size (int): Number of values, and of forms, memoised.
+            The memo is cleared when full.
+    """
+
+    def __init__(
+        self,
+        index: Dict[str, str],
+        values: Dict[str, List[str]],
+        components: Dict[str, Tuple[str, ...]],
+        cache_size: int = 1_000_000,
+    ):
+        self._index = index
+        self._values = values
+        self._components = components
+        self.cache_size = cache_size
+        # Raw value -> sign name (or None), and form -> sign names
+        self._resolved: Dict[str, Optional[str]] = {}
+        self._forms: Dict[str, Tuple[str, ...]] = {}
+
+    @classmethod
+    def build(
+        cls, sign_list: Union[SignList, Dict[str, Any]], cache_size: int = 1_000_000
+    ) -> "SignResolver":
+        """
+        Args:
+            sign_list (Union[SignList, Dict[str, Any]]): A sign list, or its JSON data.
+            cache_size (int): Number of values, and of forms, memoised.
+
+        Returns:
+            SignResolver: The resolver.
+        """
+        if isinstance(sign_list, BaseModel):
+            index = dict(sign_list.index)
+            signs = {
+                name: (
+                    sign.values,
+                    [gdl.model_dump(include={"s", "form", "seq"}) for gdl in sign.gdl],
+                )
+                for name, sign in sign_list.signs.items()
+            }
+        else:
+            index = dict(sign_list["index"])
+            signs = {
+                name: (sign.get("values", []), sign.get("gdl", []))
+                for name, sign in sign_list["signs"].items()
+            }
+
+        values = {name: list(sign_values) for name, (sign_values, _) in signs.items()}
+        components = {name: _components(name, gdl) for name, (_, gdl) in signs.items()}
+        # The values of the signs are not always all in the index
+        for name, sign_values in values.items():
+            for value in sign_values:
+                index.setdefault(value, name)
+        return cls(index, values, components, cache_size)
+
+    @classmethod
+    def load(cls, cache_size: int = 1_000_000) -> "SignResolver":
+        """
+        Build the resolver from epsd2-sl.json in the ./json/ directory.
+
+        The JSON data is used as is, which is much faster than validating `SignList`.
+        """
+        # The top-level value of the sign list is an object
+        sign_list = cast(Dict[str, Any], load_json("epsd2-sl.json"))
+        return cls.build(sign_list, cache_size)
+
+    def __len__(self) -> int:
+        """The number of signs."""
+        return len(self._values)
+
+    def __contains__(self, sign_name: str) -> bool:
+        return sign_name in self._values
+
+    def resolve(self, value: str) -> Optional[str]:
+        """
+        Returns the name of the sign of a value (e.g. "kas" -> "KASKAL"),
+        or of a sign name written in any case, if any.
+        """
+        resolved = self._resolved
+        if value in resolved:
+            return resolved[value]
+
+        normalized = normalize_value(value)
+        sign = self._index.get(normalized)
+        if sign is None:
+            number = _NUMBER_PATTERN.match(normalized)
+            if number:
+                # "3(diš)": the sign is that of the unit
+                sign = self._index.get(number.group(2)) or self._sign_name(
+                    number.group(2)
+                )
+            else:
+                sign = self._sign_name(normalized)
+        if len(resolved) >= self.cache_size:
+            resolved.clear()
+        resolved[value] = sign
+        return sign
+
+    def resolve_form(self, form: str) -> Tuple[str, ...]:
+        """
+        Returns the sign names of the values of a form (e.g. "{d}en-lil₂" -> ("AN", "EN", "E₂")).
+        Values that can't be resolved are kept as they are.
+        """
+        signs = self._forms.get(form)
+        if signs is None:
+            resolve = self.resolve
+            signs = tuple(resolve(value) or value for value in split_form(form))
+            if len(self._forms) >= self.cache_size:
+                self._forms.clear()
+            self._forms[form] = signs
+        return signs
+
+    def values(self, sign_name: str) -> List[str]:
+        """Returns the values of a sign (e.g. "KASKAL" -> ["kas", "kaskal", ...])."""
+        return self._values.get(sign_name, [])
+
+    def components(self, sign_name: str) -> Tuple[str, ...]:
+        """
+        Returns the component signs of a compound sign, flattened
+        (e.g. "|GIŠ.LU₂|" -> ("GIŠ", "LU₂")), or the sign itself for a simple sign.
+        """
+        return self._components.get(sign_name) or (sign_name,)
+
+    def _sign_name(self, value: str) -> Optional[str]:
+        # Sign names are upper case: "KASKAL", "kaskal" and "Kaskal" are the same sign
+        if value in self._values:
+            return value
+        upper = value.upper()
+        if upper in self._values:
+            return upper
+        # An upper case value (e.g. "LUGAL" for lugal) stands for its sign
+        return self._index.get(value.lower())
+
+
+def _components(name: str, gdl: List[Dict[str, Any]]) -> Tuple[str, ...]:
+    """The leaf signs of the GDL of a sign, in order"""
+    leaves: List[str] = []
+    stack = [iter(gdl)]
+    while stack:
+        item = next(stack[-1], None)
+        if item is None:
+            stack.pop()
+            continue
+        seq = item.get("seq")
+        if seq:
+            stack.append(iter(seq))
+        elif item.get("s"):
+            leaves.append(item["s"])
+        elif item.get("form"):
+            leaves.append(item["form"])
+    if not leaves and name.startswith("|") and name.endswith("|"):
+        # No sequence in the GDL: split the name itself
+        leaves = [part for part in _COMPOUND_SEPARATORS.split(name[1:-1]) if part]
+    return tuple(leaves) or (name,)
@@ -1,12 +1,13 @@
 """
 """
-import json
 import os
 import zipfile
 from typing import Union, Dict, List, Any
 
 import requests
 
+from ..jsonio import LazyJSON, load_file, load_lazy
+
 JSONType = Union[Dict[str, Any], List[Any]]
 
 
@@ -62,15 +63,37 @@ def download_json():
     os.rename(extracted_folder_path, downloads_folder_path)
 
 
-def load_json(filename: str) -> JSONType:
-    """Load a JSON file from the ./json/ directory"""
+def json_path(filename: str) -> str:
+    """The path of a file in the ./json/ directory"""
     cur_dir = os.path.dirname(os.path.abspath(__file__))
-    file_path = os.path.join(cur_dir, "json/", filename)
+    return os.path.join(cur_dir, "json/", filename)
+
+
+def load_json(filename: str) -> JSONType:
+    """
+    Load a JSON file from the ./json/ directory (see `sumeripy.jsonio`).
+
+    Args:
+        filename (str): e.g. "gloss-sux.json".
+    """
+    return load_file(_existing_json_path(filename))
+
+
+def load_json_lazy(filename: str) -> LazyJSON:
+    """
+    Load a JSON file from the ./json/ directory as a `LazyJSON`, whose
+    members are decoded when they are read (see `sumeripy.jsonio`).
+
+    Args:
+        filename (str): e.g. "gloss-sux.json". Its top-level value must be an object.
+    """
+    return load_lazy(_existing_json_path(filename))
+
+
+def _existing_json_path(filename: str) -> str:
+    file_path = json_path(filename)
 
     # Check if the file exists
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"File {filename} not found in sibling directory.")
-
-    # Read the file and instantiate the class
-    with open(file_path, "r", encoding="utf-8") as infile:
-        return json.load(infile)  # Assuming the file contains JSON data
+    return file_path
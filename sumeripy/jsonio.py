@@ -0,0 +1,222 @@
+"""
+The JSON decoding layer used by the loaders (catalogue.json, corpusjson/,
+the glossary and sign-list files...).
+
+Files are read as bytes, and decoded with the backend in use:
+    - `orjson`, if installed, several times faster than the standard library;
+    - `simdjson` (pysimdjson), if installed, which can also decode on demand;
+    - `json`, the standard library, otherwise.
+The backend is the first of these that is installed, unless one is chosen
+with `set_backend()` or the SUMERIPY_JSON_BACKEND environment variable.
+Other parsers can be added with `register_backend()`.
+
+Large files of which only some members are needed can be opened with
+`load_lazy()`: members of the top-level object are only decoded when read
+(with simdjson; other backends decode the whole file on the first read).
+
+Classes:
+    LazyJSON
+
+Functions:
+    available_backends
+    get_backend
+    set_backend
+    register_backend
+    loads
+    load_file
+    load_lazy
+"""
+
+import importlib
+import json
+import os
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Union
+
+JSONBytes = Union[bytes, bytearray, memoryview, str]
+
+_ENV_VARIABLE = "SUMERIPY_JSON_BACKEND"
+
+
+def _stdlib_loads(data: JSONBytes) -> Any:
+    # `json.loads` takes bytes, but not memoryviews
+    return json.loads(bytes(data) if isinstance(data, memoryview) else data)
+
+
+def _orjson_loads() -> Callable[[JSONBytes], Any]:
+    return importlib.import_module("orjson").loads
+
+
+def _simdjson_loads() -> Callable[[JSONBytes], Any]:
+    simdjson = importlib.import_module("simdjson")
+
+    def loads(data: JSONBytes) -> Any:
+        return simdjson.loads(bytes(data) if isinstance(data, memoryview) else data)
+
+    return loads
+
+
+# Backend name -> function importing the parser and returning its `loads`,
+# in order of preference
+_BACKENDS: Dict[str, Callable[[], Callable[[JSONBytes], Any]]] = {
+    "orjson": _orjson_loads,
+    "simdjson": _simdjson_loads,
+    "json": lambda: _stdlib_loads,
+}
+
+_backend: Optional[str] = None
+_loads: Callable[[JSONBytes], Any] = _stdlib_loads
+
+
+def available_backends() -> List[str]:
+    """Returns the backends that can be used, in order of preference."""
+    available = []
+    for name, factory in _BACKENDS.items():
+        try:
+            factory()
+        except ImportError:
+            continue
+        available.append(name)
+    return available
+
+
+def get_backend() -> str:
+    """Returns the name of the backend in use."""
+    if _backend is None:
+        _select_default()
+    return _backend  # type: ignore[return-value]
+
+
+def set_backend(name: str) -> None:
+    """
+    Decode with another backend, in this process.
+
+    Args:
+        name (str): `orjson`, `simdjson`, `json`, or a backend added with `register_backend`.
+
+    Raises:
+        ValueError: If there is no backend with this name.
+        ImportError: If its parser is not installed.
+    """
+    global _backend, _loads
+    if name not in _BACKENDS:
+        raise ValueError(
+            f"Invalid JSON backend: {name}. Valid options: {list(_BACKENDS)}"
+        )
+    _loads = _BACKENDS[name]()
+    _backend = name
+
+
+def register_backend(name: str, loads: Callable[[JSONBytes], Any]) -> None:
+    """
+    Add a backend, to be chosen with `set_backend`.
+
+    Args:
+        name (str): The name of the backend.
+        loads (Callable[[JSONBytes], Any]): Decodes a document given as bytes (or str),
+            raising a `ValueError` if it is invalid.
+    """
+    _BACKENDS[name] = lambda: loads
+
+
+def _select_default() -> None:
+    requested = os.environ.get(_ENV_VARIABLE)
+    if requested:
+        set_backend(requested)
+        return
+    for name in _BACKENDS:
+        try:
+            set_backend(name)
+            return
+        except ImportError:
+            continue
+
+
+def loads(data: JSONBytes) -> Any:
+    """
+    Decode a JSON document with the backend in use.
+
+    Raises:
+        ValueError: If the document is invalid (`json.JSONDecodeError` or the backend's own error).
+    """
+    if _backend is None:
+        _select_default()
+    return _loads(data)
+
+
+def load_file(path: str) -> Any:
+    """Read a JSON file as bytes, and decode it with the backend in use."""
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def load_lazy(path: str) -> "LazyJSON":
+    """Read a JSON file holding an object, to be decoded when its members are read."""
+    with open(path, "rb") as f:
+        return LazyJSON(f.read())
+
+
+class LazyJSON(Mapping[str, Any]):
+    """
+    A JSON object, decoded on demand.
+
+    With simdjson installed, the document is parsed into a tape once, and each
+    member of the object is only turned into Python objects when it is first
+    read. Otherwise the whole document is decoded on the first read.
+    Decoded members are kept.
+
+    Args:
+        data (bytes): The document. Its top-level value must be an object.
+    """
+
+    def __init__(self, data: bytes):
+        self._data: Optional[bytes] = data
+        self._members: Dict[str, Any] = {}
+        self._decoded = False
+        self._document: Any = None
+        self._parser: Any = None
+        try:
+            simdjson = importlib.import_module("simdjson")
+        except ImportError:
+            return
+        # The document is only valid as long as its parser is kept
+        self._parser = simdjson.Parser()
+        self._document = self._parser.parse(data)
+        if not isinstance(self._document, simdjson.Object):
+            raise ValueError("Invalid JSON document: expected an object")
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._members or self._decoded:
+            return self._members[key]
+        if self._document is None:
+            self._decode_all()
+            return self._members[key]
+        value = self._document[key]
+        # Arrays and objects are proxies into the tape
+        if hasattr(value, "as_dict"):
+            value = value.as_dict()
+        elif hasattr(value, "as_list"):
+            value = value.as_list()
+        self._members[key] = value
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        if self._document is not None:
+            return iter(list(self._document.keys()))
+        self._decode_all()
+        return iter(self._members)
+
+    def __len__(self) -> int:
+        if self._document is not None:
+            return len(self._document)
+        self._decode_all()
+        return len(self._members)
+
+    def _decode_all(self) -> None:
+        if self._decoded:
+            return
+        members = loads(self._data)  # type: ignore[arg-type]
+        if not isinstance(members, dict):
+            raise ValueError("Invalid JSON document: expected an object")
+        self._members = members
+        self._decoded = True
+        self._data = None
@@ -0,0 +1,230 @@
+"""
+Projections of pydantic models: instances built by validating only some of
+their fields, the others being decoded from the raw data on first access.
+
+Catalogue records have many fields, of which most callers only read a few.
+A projector validates the fields asked for with a model holding only those
+fields (built once per set of fields), and keeps the raw record on the
+instance. The model must derive from `ProjectedModel`, whose `__getattr__`
+decodes the fields missing from `__dict__`, i.e. not decoded yet. Fields
+decoded later are validated the same way, and kept on the instance. Records
+with keys that a model forbidding extra keys doesn't know are validated in
+full instead, which rejects them.
+
+Classes:
+    ProjectedModel
+
+Functions:
+    check_fields
+    make_projector
+    project_all
+    decode_field
+    decode_all
+"""
+
+from functools import lru_cache
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Optional,
+    Type,
+    TypeVar,
+)
+
+from pydantic import BaseModel, ConfigDict, PrivateAttr, create_model
+from typing_extensions import Self
+
+from .construct import new_instance
+
+P = TypeVar("P", bound="ProjectedModel")
+
+
+class ProjectedModel(BaseModel):
+    """
+    Base for models whose instances can be built by a projector (see `make_projector`).
+
+    pydantic reads `__dict__` as a whole in `model_dump`, `model_dump_json`,
+    `model_copy`, `__eq__` and `__repr_args__`, so these decode the fields of a
+    projected instance that are not decoded yet first (see `decode_all`).
+    """
+
+    # The raw record, when only some fields were validated
+    _raw: Optional[Dict[str, Any]] = PrivateAttr(None)
+
+    def __getattr__(self, name: str) -> Any:
+        # Only reached for fields not in __dict__: those of a projected
+        # instance that are not decoded yet
+        if name in type(self).model_fields:
+            return decode_field(self, name)
+        return super().__getattr__(name)  # type: ignore
+
+    def model_dump(self, **kwargs: Any) -> Dict[str, Any]:
+        decode_all(self)
+        return super().model_dump(**kwargs)
+
+    def model_dump_json(self, **kwargs: Any) -> str:
+        decode_all(self)
+        return super().model_dump_json(**kwargs)
+
+    def model_copy(self, **kwargs: Any) -> Self:
+        decode_all(self)
+        return super().model_copy(**kwargs)
+
+    def __eq__(self, other: Any) -> bool:
+        decode_all(self)
+        if isinstance(other, BaseModel):
+            decode_all(other)
+        return super().__eq__(other)
+
+    def __repr_args__(self) -> Any:
+        decode_all(self)
+        return super().__repr_args__()
+
+
+def check_fields(model: Type[BaseModel], fields: Iterable[str]) -> FrozenSet[str]:
+    """
+    Raises:
+        ValueError: If a field is not a field of the model.
+    """
+    fields = frozenset(fields)
+    for field in fields:
+        if field not in model.model_fields:
+            raise ValueError(
+                f"Invalid field: {field}. Valid options: {list(model.model_fields)}"
+            )
+    return fields
+
+
+@lru_cache(maxsize=None)
+def _projection_model(
+    model: Type[BaseModel], fields: FrozenSet[str]
+) -> Type[BaseModel]:
+    """A model with only `fields` of `model`, which ignores the other keys"""
+    definitions: Dict[str, Any] = {
+        name: (info.annotation, info)
+        for name, info in model.model_fields.items()
+        if name in fields
+    }
+    return create_model(
+        f"{model.__name__}Projection",
+        __config__=ConfigDict(extra="ignore"),
+        **definitions,
+    )
+
+
+@lru_cache(maxsize=None)
+def _known_keys(model: Type[BaseModel]) -> Optional[FrozenSet[str]]:
+    """The keys `model` accepts, or None if it doesn't forbid extra keys"""
+    config = model.model_config
+    if config.get("extra") != "forbid":
+        return None
+    by_name = config.get("populate_by_name") or config.get("validate_by_name")
+    keys = set()
+    for name, field in model.model_fields.items():
+        keys.add(field.alias or name)
+        if by_name:
+            keys.add(name)
+    return frozenset(keys)
+
+
+def make_projector(
+    model: Type[P], fields: Iterable[str]
+) -> Callable[[Dict[str, Any]], P]:
+    """
+    Returns a function building instances of `model` from raw records
+    (keyed by alias), validating only `fields`.
+
+    Args:
+        model (Type[ProjectedModel]): The model.
+        fields (Iterable[str]): The names of the fields to validate.
+
+    Returns:
+        Callable[[Dict[str, Any]], BaseModel]: Raises pydantic's `ValidationError`
+            if one of `fields` is invalid, or if the record has keys the model
+            forbids. The record is kept, not copied.
+
+    Raises:
+        ValueError: If a field is not a field of the model.
+    """
+    validate = _projection_model(
+        model, check_fields(model, fields)
+    ).__pydantic_validator__.validate_python
+    known_keys = _known_keys(model)
+    # Mutable defaults of private attributes would be shared between instances
+    private_template = {
+        name: attr.get_default() for name, attr in model.__private_attributes__.items()
+    }
+
+    def project(data: Dict[str, Any]) -> P:
+        if known_keys is not None and not known_keys.issuperset(data):
+            # Raises on the unknown keys
+            return model.model_validate(data)
+        projected = validate(data)
+        private = private_template.copy()
+        private["_raw"] = data
+        return new_instance(
+            model, vars(projected), projected.__pydantic_fields_set__, private
+        )
+
+    return project
+
+
+def project_all(
+    model: Type[P], fields: Iterable[str], records: Iterable[Dict[str, Any]]
+) -> List[P]:
+    """
+    Build instances of `model` from raw records, validating only `fields`
+    (see `make_projector`).
+    """
+    project = make_projector(model, fields)
+    return [project(record) for record in records]
+
+
+def decode_field(instance: BaseModel, name: str) -> Any:
+    """
+    Validate a field from the raw record of a projected instance, and keep it.
+
+    Raises:
+        AttributeError: If the instance was not built by a projector.
+        ValidationError: If the value is invalid, or missing for a required field.
+    """
+    raw = (instance.__pydantic_private__ or {}).get("_raw")
+    if raw is None:
+        raise AttributeError(
+            f"{type(instance).__name__!r} object has no attribute {name!r}"
+        )
+    projected = _projection_model(
+        type(instance), frozenset((name,))
+    ).__pydantic_validator__.validate_python(raw)
+    value = vars(instance)[name] = vars(projected)[name]
+    instance.__pydantic_fields_set__.update(projected.__pydantic_fields_set__)
+    return value
+
+
+def decode_all(instance: BaseModel) -> BaseModel:
+    """
+    Decode the fields of a projected instance that are not decoded yet,
+    e.g. before `model_dump()`. Returns the instance. Other instances are
+    returned as they are.
+
+    Fields are read through the model's `__getattr__`, which may handle
+    some of them itself. Once they are all in `__dict__`, the instance is
+    laid out like a fully validated one (fields in order, no raw record),
+    so that it compares, dumps and prints the same.
+    """
+    private = instance.__pydantic_private__
+    if not private or private.get("_raw") is None:
+        return instance
+    values = vars(instance)
+    for name in type(instance).model_fields:
+        if name not in values:
+            getattr(instance, name)
+    if values.keys() == type(instance).model_fields.keys():
+        ordered = {name: values[name] for name in type(instance).model_fields}
+        object.__setattr__(instance, "__dict__", ordered)
+        private["_raw"] = None
+    return instance
@@ -0,0 +1,212 @@
+import json
+import os
+from typing import Any, Dict, List
+
+import pytest
+
+CORPUS = "admin_ed3b"
+PROJECT = "epsd2/admin/ed3b"
+WORDS = [
+    ("lugal", "king", "N"),
+    ("dumu", "child", "N"),
+    ("e", "house", "N"),
+    ("du", "go", "V/i"),
+    ("kaskal", "way", "N"),
+]
+TIMESTAMP = "2021-12-21T03:21:44"
+
+
+def _lemma(text_id: str, line: int, position: int) -> Dict[str, Any]:
+    cf, gw, pos = WORDS[(line + position) % len(WORDS)]
+    form = f"{cf}-ra" if position % 2 else cf
+    ref = f"{text_id}.{line}.{position}"
+    return {
+        "node": "l",
+        "frag": form,
+        "id": f"{text_id}.l{line}{position}",
+        "ref": ref,
+        "inst": f"%sux:{form}={cf}[{gw}]{pos}",
+        "sig": f"@{PROJECT}%sux:{form}={cf}[{gw}//{gw}]{pos}'{pos}$",
+        "f": {
+            "lang": "sux",
+            "form": form,
+            "delim": " ",
+            "gdl": [
+                {"v": v, "id": f"{ref}.{i}"} for i, v in enumerate(form.split("-"))
+            ],
+            "cf": cf,
+            "gw": gw,
+            "pos": pos,
+            "sense": gw,
+            "norm": cf,
+            "epos": pos,
+        },
+        "props": [],
+    }
+
+
+def _text_cdl(text_id: str, num_lines: int) -> List[Dict[str, Any]]:
+    nodes: List[Dict[str, Any]] = [
+        {
+            "node": "d",
+            "type": "surface",
+            "ref": text_id,
+            "subtype": "obverse",
+            "label": "o",
+        }
+    ]
+    for line in range(1, num_lines + 1):
+        nodes.append(
+            {
+                "node": "d",
+                "type": "line-start",
+                "ref": f"{text_id}.{line}",
+                "n": str(line),
+                "label": f"o {line}",
+            }
+        )
+        nodes.append(
+            {
+                "node": "c",
+                "type": "sentence",
+                "id": f"{text_id}.{line}.s",
+                "cdl": [_lemma(text_id, line, position) for position in range(1, 4)],
+            }
+        )
+    return [{"node": "c", "type": "text", "id": f"{text_id}.U0", "cdl": nodes}]
+
+
+@pytest.fixture
+def corpus_dir(tmp_path, monkeypatch):
+    """
+    A small corpus in ./.corpusdata/admin_ed3b, with the working directory
+    set to `tmp_path`. The last text's corpusjson file is invalid.
+    """
+    base = tmp_path / ".corpusdata" / CORPUS / "epsd2" / "admin" / "ed3b"
+    os.makedirs(base / "corpusjson")
+    members = {}
+    for i in range(8):
+        text_id = f"P{10000 + i:06d}"
+        members[text_id] = {
+            "id_text": text_id,
+            "designation": f"Text {i}",
+            "project": PROJECT,
+            "period": ["Early Dynastic IIIb", "Ur III"][i % 2],
+            "provenience": ["Girsu", "Nippur", "Umma"][i % 3],
+            "genre": "Administrative",
+        }
+        data = {"type": "cdl", "project": PROJECT, "textid": text_id}
+        if i < 7:
+            data["cdl"] = _text_cdl(text_id, num_lines=i % 3 + 1)
+        with open(base / "corpusjson" / f"{text_id}.json", "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    catalogue = {
+        "type": "catalogue",
+        "project": PROJECT,
+        "source": f"http://oracc.org/{PROJECT}",
+        "license": "CC0",
+        "license-url": "x",
+        "more-info": "x",
+        "UTC-timestamp": TIMESTAMP,
+        "members": members,
+        "summaries": {},
+    }
+    with open(base / "catalogue.json", "w", encoding="utf-8") as f:
+        json.dump(catalogue, f, ensure_ascii=False)
+
+    monkeypatch.chdir(tmp_path)
+    return base
+
+
+def _stats(**values: Any) -> Dict[str, Any]:
+    return {"icount": 10, "ipct": 100, **values}
+
+
+@pytest.fixture
+def glossary_data() -> Dict[str, Any]:
+    """A small gloss-sux.json, as JSON data."""
+    entries, instances, summaries = [], {}, {}
+    for i, (cf, gw, pos) in enumerate(WORDS):
+        oid = f"o{i:07d}"
+        headword = f"{cf}[{gw}]{pos}"
+        forms = [
+            _stats(n=n, id=f"{oid}.{k}", xis=f"sux.r{i:05x}{k}", type="form")
+            for k, n in enumerate((cf, f"{cf}-ra"))
+        ]
+        sigs = [
+            _stats(
+                sig=f"@epsd2%sux:{form['n']}={cf}[{gw}//{gw}]{pos}'{pos}$",
+                id=f"{oid}.s{k}",
+                xis=f"sux.r{i:05x}s{k}",
+                type="sig",
+            )
+            for k, form in enumerate(forms)
+        ]
+        sense = _stats(
+            bases=[_stats(n=cf, xis=f"sux.r{i:05x}b0", type="base")],
+            forms=[
+                _stats(n=form["n"], ref=form["id"], xis=f"{form['xis']}s", type="form")
+                for form in forms
+            ],
+            conts=[],
+            mng=gw,
+            morphs=[],
+            n=f"{cf}[{gw}//{gw}]{pos}'{pos}",
+            norms=[],
+            num="1.",
+            pos=pos,
+            sigs=sigs,
+            id=f"sux.x{i:06d}",
+            xis=f"sux.r{i:05x}x",
+            type="sense",
+            oid=f"{oid}x",
+            **{"form-sanss": []},
+        )
+        entries.append(
+            _stats(
+                cf=cf,
+                gw=gw,
+                headword=headword,
+                pos=pos,
+                bases=[_stats(n=cf, xis=f"sux.r{i:05x}b", type="base")],
+                conts=[],
+                forms=forms,
+                morphs=[],
+                stems=[],
+                norms=[],
+                periods=[_stats(p="Ur III")],
+                prefixs=[],
+                senses=[sense],
+                id=oid,
+                dc_title=f"epsd2/sux/{headword}",
+                xis=f"sux.o{i:05x}",
+                oid=oid,
+                **{"form-sanss": [], "morph2s": []},
+            )
+        )
+        summaries[oid] = f'<p class="summary" id="{oid}"><span>{headword}</span></p>'
+        instances[f"sux.r{i:05x}x"] = [
+            f"epsd2/admin/ur3:P{120000 + i}.{line}.{word}"
+            for line in range(1, 4)
+            for word in range(1, 3)
+        ]
+        # Occurrences that don't follow the text.line.word layout
+        instances[f"sux.r{i:05x}0"] = [
+            f"{PROJECT}:P{10000 + i:06d}",
+            f"{PROJECT}:X{i}.a.b",
+        ]
+
+    return {
+        "type": "glossary",
+        "project": "epsd2",
+        "source": "http://oracc.org/epsd2",
+        "license": "CC0",
+        "license-url": "x",
+        "more-info": "x",
+        "UTC-timestamp": TIMESTAMP,
+        "lang": "sux",
+        "entries": entries,
+        "instances": instances,
+        "summaries": summaries,
+    }
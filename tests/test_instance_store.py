@@ -0,0 +1,42 @@
+from sumeripy.glossary.instance_store import (
+    InstanceStore,
+    Occurrence,
+    read_store,
+    write_store,
+)
+
+
+def test_instance_store_round_trip(glossary_data, tmp_path):
+    instances = glossary_data["instances"]
+    store = InstanceStore.build(instances)
+    assert store.to_dict() == instances
+
+    path = str(tmp_path / "instances.bin")
+    write_store(path, {"timestamp": "t1"}, store)
+    reloaded = read_store(path, {"timestamp": "t1"})
+    assert reloaded is not None
+    assert reloaded.to_dict() == instances
+    for xis in instances:
+        assert reloaded.count(xis) == len(instances[xis])
+        assert list(reloaded.occurrences(xis)) == list(store.occurrences(xis))
+
+    # Written for another version of the glossary
+    assert read_store(path, {"timestamp": "t2"}) is None
+    assert read_store(str(tmp_path / "missing.bin"), {"timestamp": "t1"}) is None
+
+
+def test_irregular_refs_are_kept_as_they_are():
+    refs = [
+        "p:X1",
+        "p:X2.05.1",
+        "a:b:X3.1.2.3",
+        "P4.x.1",
+        "q:P6.1.1",
+    ]
+    store = InstanceStore.build({"sux.r1": refs})
+    assert store.to_dict() == {"sux.r1": refs}
+    assert list(store.occurrences("sux.r1"))[-1] == Occurrence(
+        "q", "P6", 1, 1, "P6.1.1"
+    )
+    assert store.count("sux.missing") == 0
+    assert list(store.occurrences("sux.missing")) == []
@@ -0,0 +1,49 @@
+import warnings
+
+import sumeripy.corpora as corpora
+from sumeripy.corpora.lemma_index import read_index, write_index
+
+
+def _load(**kwargs):
+    with warnings.catch_warnings():
+        # The invalid text is reported on every load
+        warnings.simplefilter("ignore")
+        return corpora.load("admin_ed3b", **kwargs)
+
+
+def test_lemma_index_round_trip(corpus_dir, tmp_path):
+    corpus = _load(workers=1)
+    failures = corpus.build_lemma_index(workers=1)
+    assert list(failures) == ["P010007"]
+    index = corpus.lemma_index
+    assert index is not None
+
+    path = str(tmp_path / "lemma-index.bin")
+    write_index(path, {"version": 1}, index)
+    reloaded = read_index(path, {"version": 1})
+    assert reloaded is not None
+    assert reloaded.text_ids == index.text_ids
+    assert reloaded.line_refs == index.line_refs
+    assert dict(reloaded.term_spans) == dict(index.term_spans)
+    assert reloaded.flat_postings == index.flat_postings
+    for term in ("cf:lugal", "pos:N", "form:dumu-ra"):
+        assert reloaded.postings(term) == index.postings(term)
+
+    # Written for another version of the corpus
+    assert read_index(path, {"version": 2}) is None
+    assert read_index(str(tmp_path / "missing.bin"), {"version": 1}) is None
+
+
+def test_search_with_a_saved_index(corpus_dir):
+    corpus = _load(workers=1)
+    corpus.build_lemma_index(workers=1)
+    query = {"all_of": ["cf:lugal"], "phrase": ["cf:lugal", "cf:dumu"]}
+    expected = corpus.search(**query)
+    # "lugal dumu-ra" is on line 3, which only the texts with 3 lines have
+    assert list(expected) == ["P010002", "P010005"]
+
+    # load(index=True) writes the index next to the corpus, then reuses it
+    for _ in range(2):
+        indexed = _load(index=True, workers=1)
+        assert indexed.lemma_index is not None
+        assert indexed.search(**query) == expected
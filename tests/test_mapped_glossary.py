@@ -0,0 +1,49 @@
+import pytest
+
+from sumeripy.glossary.mapped_glossary import MappedGlossary, write_glossary
+from sumeripy.glossary.models.glossary import Entry
+
+
+@pytest.fixture
+def mapped(glossary_data, tmp_path):
+    path = str(tmp_path / "gloss-sux.bin")
+    write_glossary(glossary_data, path)
+    with MappedGlossary.open(path) as glossary:
+        yield glossary
+
+
+def test_mapped_glossary_round_trip(glossary_data, mapped):
+    entries = glossary_data["entries"]
+    assert len(mapped) == len(entries)
+    assert mapped.ids == [entry["id"] for entry in entries]
+    assert mapped.metadata["UTC-timestamp"] == glossary_data["UTC-timestamp"]
+
+    for entry in entries:
+        assert mapped.raw(entry["id"]) == entry
+        assert mapped.get(entry["id"]) == Entry(**entry)
+        assert mapped.by_headword(entry["headword"]) == Entry(**entry)
+        assert mapped.summary(entry["oid"]) == glossary_data["summaries"][entry["oid"]]
+    assert list(mapped) == [Entry(**entry) for entry in entries]
+    assert mapped.get("o9999999") is None
+
+
+def test_mapped_glossary_lookups(glossary_data, mapped):
+    entry = glossary_data["entries"][0]
+    sense = entry["senses"][0]
+
+    assert mapped.entry(entry["cf"], entry["gw"], entry["pos"]) == Entry(**entry)
+    assert [e.id for e in mapped.by_citation_form(entry["cf"])] == [entry["id"]]
+    assert [e.id for e in mapped.entries_for_form(f"{entry['cf']}-ra")] == [entry["id"]]
+    assert mapped.sense(sense["sigs"][0]["sig"]) == Entry(**entry).senses[0]
+    found = mapped.find(sense["xis"])
+    assert (
+        found is not None
+        and found.model_dump() == Entry(**entry).senses[0].model_dump()
+    )
+
+
+def test_open_rejects_other_files(tmp_path):
+    path = tmp_path / "not-a-glossary.bin"
+    path.write_bytes(b"{}")
+    with pytest.raises(ValueError):
+        MappedGlossary.open(str(path))
@@ -0,0 +1,75 @@
+import os
+import warnings
+
+import pytest
+
+import sumeripy.corpora as corpora
+from sumeripy.corpora.sign_sequences import (
+    SignSequences,
+    read_sequences,
+    write_sequences,
+)
+from sumeripy.glossary.sign_resolver import SignResolver
+
+
+@pytest.fixture
+def resolver():
+    return SignResolver.build(
+        {
+            "index": {
+                "lugal": "LUGAL",
+                "ra": "RA",
+                "kas": "KASKAL",
+                "kaskal": "KASKAL",
+            },
+            "signs": {"LUGAL": {}, "RA": {}, "KASKAL": {}},
+        }
+    )
+
+
+def _load(**kwargs):
+    with warnings.catch_warnings():
+        # The invalid text is reported on every load
+        warnings.simplefilter("ignore")
+        return corpora.load("admin_ed3b", **kwargs)
+
+
+def test_sign_sequences_round_trip(corpus_dir, tmp_path, resolver):
+    path = str(tmp_path / "signs")
+    failures = {}
+    sequences = _load().sign_sequences(resolver, path, workers=1, failures=failures)
+    assert list(failures) == ["P010007"]
+    # "e-ra du kaskal-ra"
+    assert sequences.decode("P010000") == ["e", "RA", "du", "KASKAL", "RA"]
+
+    reloaded = read_sequences(path)
+    assert reloaded.vocabulary == sequences.vocabulary
+    assert list(reloaded) == list(sequences)
+    for file_id in sequences:
+        assert reloaded[file_id] == sequences[file_id]
+        assert reloaded.decode(file_id) == sequences.decode(file_id)
+    assert reloaded.counts() == sequences.counts()
+
+
+def test_rewriting_removes_the_texts_left_out(tmp_path):
+    path = str(tmp_path / "signs")
+    write_sequences(path, SignSequences(["A", "B"], {"P1": [0, 1], "P2": [1]}))
+    write_sequences(path, SignSequences(["A"], {"P1": [0]}))
+    assert sorted(os.listdir(path)) == ["P1.bin", "signs.json"]
+    assert read_sequences(path).decode("P1") == ["A"]
+
+
+def test_sign_sequences_do_not_depend_on_the_pool(corpus_dir, resolver):
+    # Half of the texts have their contents loaded, and are encoded in this process
+    corpus = _load()
+    loaded = _load(contents=True, snapshot=False)
+    for text, loaded_text in list(zip(corpus.texts, loaded.texts))[::2]:
+        text.cdl = loaded_text.cdl
+
+    expected = corpus.sign_sequences(resolver, workers=1)
+    for workers, chunksize in ((1, 3), (2, 1), (2, 3)):
+        sequences = corpus.sign_sequences(
+            resolver, workers=workers, chunksize=chunksize
+        )
+        assert sequences.vocabulary == expected.vocabulary
+        assert sequences.sequences == expected.sequences
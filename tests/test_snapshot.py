@@ -0,0 +1,56 @@
+import os
+import warnings
+
+import pytest
+
+import sumeripy.corpora as corpora
+from sumeripy.corpora.snapshot import read_snapshot, write_snapshot
+
+
+def _load(**kwargs):
+    with warnings.catch_warnings():
+        # The invalid text is reported on every load
+        warnings.simplefilter("ignore")
+        return corpora.load("admin_ed3b", **kwargs)
+
+
+def _snapshots(corpus_dir):
+    return sorted(
+        name for name in os.listdir(corpus_dir.parents[2]) if "snapshot" in name
+    )
+
+
+@pytest.mark.parametrize("contents", [False, True])
+def test_snapshot_round_trip(corpus_dir, contents):
+    built = _load(contents=contents, workers=1)
+    assert _snapshots(corpus_dir)
+
+    cached = read_snapshot(str(corpus_dir.parents[2]), str(corpus_dir), contents)
+    assert cached is not None
+    reloaded, failures = cached
+    assert reloaded.texts == built.texts
+    assert [text.cdl for text in reloaded.texts] == [text.cdl for text in built.texts]
+    assert list(failures) == (["P010007"] if contents else [])
+
+
+def test_stale_snapshot_is_rebuilt(corpus_dir):
+    _load(workers=1)
+    snapshot_dir = str(corpus_dir.parents[2])
+    catalogue = corpus_dir / "catalogue.json"
+    catalogue.write_text(catalogue.read_text().replace("Text 0", "Text zero"))
+
+    assert read_snapshot(snapshot_dir, str(corpus_dir), False) is None
+    assert _load(workers=1).texts[0].designation == "Text zero"
+    assert read_snapshot(snapshot_dir, str(corpus_dir), False) is not None
+
+
+def test_trusted_contents_go_to_their_own_snapshot(corpus_dir):
+    corpus = _load(contents=True, trusted=True, workers=1)
+    snapshot_dir = str(corpus_dir.parents[2])
+
+    # Validated loads never read contents built without validation
+    assert read_snapshot(snapshot_dir, str(corpus_dir), True) is None
+    assert read_snapshot(snapshot_dir, str(corpus_dir), True, trusted=True) is not None
+
+    write_snapshot(snapshot_dir, str(corpus_dir), True, corpus)
+    assert read_snapshot(snapshot_dir, str(corpus_dir), True) is not None